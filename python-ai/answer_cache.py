@@ -0,0 +1,209 @@
+"""
+Answer Cache for Ubuzima Hub AI System
+Caches LLM answers for identical and near-identical questions
+"""
+
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s.%-]", " ", query.lower()).split()).strip(" .")
+
+
+class AnswerCache:
+    """
+    Bounded LRU cache of chatbot answers with TTL expiry
+
+    Exact hits are keyed by (normalised query, retrieved document IDs, scope).
+    Near-duplicate questions are matched by cosine similarity of their
+    (normalised) query embeddings within the same scope, and only when the
+    cached answer was grounded on (nearly) the same retrieved documents:
+    the Jaccard overlap of the two doc-ID sets must reach `min_doc_overlap`,
+    so "stunting in Musanze" never reuses the answer for "stunting in
+    Rubavu" however close the questions embed. Every entry is
+    tagged with the vector index version it was produced from; when the
+    version changes the whole cache is dropped.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        similarity_threshold: float = 0.95,
+        min_doc_overlap: float = 0.8
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.min_doc_overlap = min_doc_overlap
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, frozenset, str], Dict[str, Any]]" = OrderedDict()
+        self._version: Optional[str] = None
+
+        # Embedding matrix for near-duplicate search, rebuilt lazily after changes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[Tuple[str, frozenset, str]] = []
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.latency_saved = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _check_version(self, version: str) -> None:
+        """Drop every entry if the index was rebuilt since they were stored"""
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+
+    def _expire(self) -> None:
+        """Remove entries older than the TTL (oldest are at the front)"""
+        cutoff = time.time() - self.ttl_seconds
+        expired = [key for key, entry in self._entries.items() if entry["stored_at"] < cutoff]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _nearest(
+        self,
+        embedding: np.ndarray,
+        doc_ids: frozenset,
+        scope: str
+    ) -> Optional[Tuple[str, frozenset, str]]:
+        """Key of the most similar cached query in `scope` over the same documents, if above the threshold"""
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries)
+            self._matrix = (
+                np.vstack([self._entries[key]["embedding"] for key in self._matrix_keys])
+                if self._matrix_keys else None
+            )
+        if self._matrix is None:
+            return None
+
+        scores = self._matrix @ embedding
+        for row in np.argsort(-scores):
+            if scores[row] < self.similarity_threshold:
+                break
+            key = self._matrix_keys[row]
+            if key[2] == scope and key in self._entries and self._overlap(key[1], doc_ids) >= self.min_doc_overlap:
+                return key
+        return None
+
+    def _hit(self, key: Tuple[str, frozenset, str], kind: str) -> Dict[str, Any]:
+        entry = self._entries[key]
+        self._entries.move_to_end(key)
+        self.latency_saved += entry["latency"]
+        response = copy.deepcopy(entry["response"])
+        response["cache_hit"] = kind
+        return response
+
+    def get(
+        self,
+        query: str,
+        embedding: np.ndarray,
+        doc_ids: Iterable[str],
+        version: str,
+        scope: str = ""
+    ) -> Optional[Dict[str, Any]]:
+        """Cached response for a query, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        key = (normalize_query(query), frozenset(doc_ids), scope)
+        embedding = self._unit(embedding)
+
+        with self._lock:
+            self._check_version(version)
+            self._expire()
+
+            if key in self._entries:
+                self.exact_hits += 1
+                return self._hit(key, "exact")
+
+            similar = self._nearest(embedding, key[1], scope)
+            if similar is not None:
+                self.semantic_hits += 1
+                return self._hit(similar, "semantic")
+
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        query: str,
+        embedding: np.ndarray,
+        doc_ids: Iterable[str],
+        version: str,
+        response: Dict[str, Any],
+        latency: float,
+        scope: str = ""
+    ) -> None:
+        """Store a successful LLM response and how long it took to produce"""
+        if not self.enabled:
+            return
+
+        key = (normalize_query(query), frozenset(doc_ids), scope)
+
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = {
+                "response": copy.deepcopy(response),
+                "embedding": self._unit(embedding),
+                "latency": latency,
+                "stored_at": time.time()
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    @staticmethod
+    def _overlap(cached: frozenset, current: frozenset) -> float:
+        """Jaccard overlap of two retrieved doc-ID sets"""
+        if not cached and not current:
+            return 1.0
+        return len(cached & current) / len(cached | current)
+
+    @staticmethod
+    def _unit(embedding: np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit counters, size and estimated LLM time saved"""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "invalidations": self.invalidations,
+            "latency_saved_seconds": round(self.latency_saved, 3)
+        }
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
@@ -3,22 +3,51 @@ FastAPI Server for NISR AI Chatbot
 REST API endpoint for integration with Next.js frontend
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Annotated, Literal, Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import copy
+import json
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from chatbot import NISRAIChatbot
+from chatbot import NISRAIChatbot, RetrievalOptions
+from answer_cache import normalize_query
+from indicator_cube import IndicatorCube, default_cube_path, etag_matches
+import metrics
 
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load and warm up the chatbot in the background while the server starts"""
+    warmup = None
+    if warmup_on_startup():
+        loop = asyncio.get_running_loop()
+        warmup = loop.run_in_executor(None, initialize_chatbot)
+        loop.run_in_executor(None, initialize_indicator_cube)
+    yield
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    if chatbot is not None:
+        await chatbot.llm.aclose()
+        chatbot.llm.close()
+    chat_executor.shutdown(wait=False)
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="NISR AI API - Ubuzima Hub",
     description="AI-powered insights based on NISR Rwanda datasets",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -30,23 +59,265 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize chatbot (lazy loading)
+
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    """Count requests and time them (to the first response byte) per route"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    except Exception as e:
+        metrics.ERRORS.inc(type=type(e).__name__)
+        raise
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        metrics.HTTP_REQUESTS.inc(route=path, status=str(status))
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - started, route=path)
+
+
+# Chatbot singleton, built once at startup (or by the first request if warm-up is off)
 chatbot: Optional[NISRAIChatbot] = None
+chatbot_lock = threading.Lock()
+startup_state: Dict[str, Any] = {
+    "ready": False,
+    "error": None,
+    "model_load_seconds": None,
+    "warmup_seconds": None,
+    "cold_start_seconds": None
+}
+
+# Worker pool for CPU-bound embedding/search so the event loop stays responsive
+chat_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CHAT_WORKERS", "4")),
+    thread_name_prefix="chat-worker"
+)
+
+
+class ConcurrencyLimiter:
+    """Bounds in-flight chat requests, queues a limited backlog, rejects the rest"""
+    
+    def __init__(self, max_concurrent: int, max_queued: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+        
+    def _reject(self, reason: str) -> HTTPException:
+        self.rejected += 1
+        return HTTPException(status_code=503, detail=reason, headers={"Retry-After": "1"})
+        
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one concurrency slot for the duration of a request"""
+        if self._semaphore is None:
+            # Created lazily so it binds to the server's event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        if self.queued >= self.max_queued and self._semaphore.locked():
+            raise self._reject("Server busy: too many queued requests")
+        
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("Server busy: timed out waiting for a worker")
+        finally:
+            self.queued -= 1
+            
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued
+        }
+
+
+class SingleFlight:
+    """
+    Runs one computation per key at a time; concurrent callers share it
+    
+    The first caller for a key starts the work as its own task; callers
+    arriving while it runs wait for the same result (each gets a copy).
+    The task is shielded, so a disconnecting caller does not cancel the
+    work for the others.
+    """
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        
+    async def run(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            return await work()
+        
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return copy.deepcopy(await asyncio.shield(task))
+        
+        self.leaders += 1
+        task = asyncio.ensure_future(work())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return copy.deepcopy(await asyncio.shield(task))
+    
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+            
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._in_flight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced
+        }
+
+
+chat_limiter = ConcurrencyLimiter(
+    max_concurrent=int(os.getenv("MAX_CONCURRENT_CHATS", "16")),
+    max_queued=int(os.getenv("MAX_QUEUED_CHATS", "64")),
+    queue_timeout=float(os.getenv("CHAT_QUEUE_TIMEOUT", "10"))
+)
+
+# Concurrent identical questions (same normalised query and options) share one answer
+chat_flights = SingleFlight(enabled=os.getenv("COALESCE_REQUESTS", "true").lower() == "true")
+
+
+# Indicator cube for the dashboards: built from the CSV alone, no models or index
+indicator_cube: Optional[IndicatorCube] = None
+indicator_cube_lock = threading.Lock()
+INDICATOR_CACHE_CONTROL = (
+    f"public, max-age={int(os.getenv('INDICATOR_CACHE_MAX_AGE', '300'))}, "
+    f"stale-while-revalidate={int(os.getenv('INDICATOR_STALE_WHILE_REVALIDATE', '86400'))}"
+)
+
+
+def get_indicator_cube() -> IndicatorCube:
+    """Get the indicator cube, rebuilding it when the CSV has changed"""
+    global indicator_cube
+    if indicator_cube is None or indicator_cube.is_stale():
+        with indicator_cube_lock:
+            if indicator_cube is None or indicator_cube.is_stale():
+                started = time.perf_counter()
+                indicator_cube = IndicatorCube.from_csv(default_cube_path())
+                print(f"✓ Indicator cube built in {time.perf_counter() - started:.2f}s "
+                      f"({len(indicator_cube.indicators)} indicators)")
+    return indicator_cube
+
+
+def initialize_indicator_cube() -> None:
+    """Build the indicator cube at startup (errors surface again on the first request)"""
+    try:
+        get_indicator_cube()
+    except Exception as e:
+        print(f"✗ Indicator cube failed: {e}")
+
+
+def warmup_on_startup() -> bool:
+    """Whether the chatbot is built and warmed up at startup (else by the first request)"""
+    return os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
 
 
 def get_chatbot() -> NISRAIChatbot:
-    """Get or initialize chatbot instance"""
+    """Get or initialize chatbot instance (constructed at most once)"""
     global chatbot
     if chatbot is None:
-        chatbot = NISRAIChatbot()
+        with chatbot_lock:
+            if chatbot is None:
+                started = time.perf_counter()
+                try:
+                    bot = NISRAIChatbot(llm_timeout=float(os.getenv("LLM_TIMEOUT", "30")))
+                except Exception as e:
+                    startup_state["error"] = str(e)
+                    raise
+                startup_state["model_load_seconds"] = round(time.perf_counter() - started, 3)
+                chatbot = bot
+                if not warmup_on_startup():
+                    # Built lazily by a request: nothing else to wait for
+                    startup_state["cold_start_seconds"] = startup_state["model_load_seconds"]
+                    startup_state["error"] = None
+                    startup_state["ready"] = True
     return chatbot
 
 
+def initialize_chatbot() -> None:
+    """Build the chatbot, run a warm-up encode and search, then mark the server ready"""
+    started = time.perf_counter()
+    try:
+        bot = get_chatbot()
+        startup_state["warmup_seconds"] = round(bot.warm_up(), 3)
+    except Exception as e:
+        startup_state["error"] = str(e)
+        print(f"✗ Startup failed: {e}")
+        return
+    startup_state["cold_start_seconds"] = round(time.perf_counter() - started, 3)
+    startup_state["error"] = None
+    startup_state["ready"] = True
+    print(f"✓ Ready after {startup_state['cold_start_seconds']:.2f}s")
+
+
+async def aget_chatbot() -> NISRAIChatbot:
+    """get_chatbot for endpoints: waits for a build in progress without blocking the loop"""
+    if chatbot is not None:
+        return chatbot
+    return await asyncio.get_running_loop().run_in_executor(None, get_chatbot)
+
+
 # Request/Response models
-class ChatRequest(BaseModel):
+class RetrievalRequest(BaseModel):
+    """Retrieval settings shared by the chat request models"""
+    max_context_docs: Optional[int] = Field(5, ge=1, le=10, description="Max context documents")
+    filters: Optional[Dict[str, Any]] = Field(
+        None, description="Metadata filter, e.g. {\"year\": \"2015\"}"
+    )
+    doc_type: Optional[Literal["nutrition_data", "survey_metadata"]] = Field(
+        None, description="Only retrieve documents of this type"
+    )
+    max_distance: Optional[float] = Field(
+        None, ge=0, description="Ignore documents farther than this from the question"
+    )
+    
+    def retrieval_options(self) -> RetrievalOptions:
+        return RetrievalOptions(
+            k=self.max_context_docs,
+            filters=self.filters,
+            max_distance=self.max_distance,
+            doc_type=self.doc_type
+        )
+
+
+class ChatRequest(RetrievalRequest):
     """Chat request model"""
     query: str = Field(..., min_length=1, max_length=1000, description="User question")
-    max_context_docs: Optional[int] = Field(5, ge=1, le=10, description="Max context documents")
+    include_timings: bool = Field(False, description="Add per-stage timings to the response")
+
+
+class BatchChatRequest(RetrievalRequest):
+    """Batch chat request model"""
+    queries: List[Annotated[str, Field(min_length=1, max_length=1000)]] = Field(
+        ..., min_length=1, max_length=100, description="User questions"
+    )
 
 
 class Source(BaseModel):
@@ -63,6 +334,17 @@ class ChatResponse(BaseModel):
     context_used: bool
     is_relevant: bool
     retrieved_docs: Optional[int] = None
+    answered_by: Optional[str] = None
+    cache_hit: Optional[str] = None
+    scope_reason: Optional[str] = None
+    timings: Optional[Dict[str, float]] = Field(
+        None, description="Seconds spent per stage (only with include_timings)"
+    )
+
+
+class BatchChatResponse(BaseModel):
+    """Batch chat response model"""
+    results: List[ChatResponse]
 
 
 class HealthResponse(BaseModel):
@@ -85,7 +367,7 @@ async def root():
 async def health_check():
     """Health check endpoint"""
     try:
-        bot = get_chatbot()
+        bot = await aget_chatbot()
         return {
             "status": "healthy",
             "message": "API is operational and chatbot initialized"
@@ -94,6 +376,23 @@ async def health_check():
         raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
 
 
+@app.get("/live")
+async def live():
+    """Liveness probe: the process is up and serving HTTP"""
+    return {"status": "alive"}
+
+
+@app.get("/ready")
+async def ready(response: Response):
+    """Readiness probe: 200 once models and index are loaded and warmed up"""
+    if startup_state["ready"]:
+        return {"status": "ready", "cold_start_seconds": startup_state["cold_start_seconds"]}
+    response.status_code = 503
+    if startup_state["error"]:
+        return {"status": "failed", "error": startup_state["error"]}
+    return {"status": "starting"}
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """
@@ -103,32 +402,224 @@ async def chat(request: ChatRequest):
     ```json
     {
         "query": "What is the stunting rate in Rwanda?",
-        "max_context_docs": 5
+        "max_context_docs": 5,
+        "doc_type": "nutrition_data",
+        "filters": {"year": "2015"},
+        "max_distance": 1.2
     }
     ```
+    Only `query` is required; set `include_timings` to see where the time went.
     """
-    try:
-        bot = get_chatbot()
-        
-        # Override max_context_docs if provided
-        if request.max_context_docs:
-            bot.max_context_docs = request.max_context_docs
-        
-        # Get response
-        result = bot.chat(request.query)
+    started = time.perf_counter()
+    with metrics.track_timings() as timings:
+        try:
+            bot = await aget_chatbot()
+            
+            # Out-of-scope and structured answers skip the queue entirely
+            result = bot.answer_without_llm(request.query)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
         
+        if result is None:
+            options = request.retrieval_options()
+            
+            async def answer() -> Dict[str, Any]:
+                # Timings travel with the result, so coalesced requests see them too
+                with metrics.track_timings() as work_timings:
+                    queued = time.perf_counter()
+                    async with chat_limiter.slot():
+                        metrics.record_stage("queue", time.perf_counter() - queued)
+                        try:
+                            # Get response (search runs on the worker pool, LLM call is async)
+                            response = await bot.achat(request.query, executor=chat_executor, options=options)
+                        except Exception as e:
+                            raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+                return {**response, "timings": work_timings}
+            
+            # Only the first of several identical in-flight requests takes a slot and does the work
+            result = await chat_flights.run(f"{normalize_query(request.query)}|{options.cache_scope()}", answer)
+            timings.update(result.pop("timings"))
+    
+    if not request.include_timings:
         return ChatResponse(**result)
-        
+    timings["total"] = time.perf_counter() - started
+    return ChatResponse(**result, timings={stage: round(seconds, 6) for stage, seconds in timings.items()})
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    """Format a chatbot stream event as a Server-Sent Event"""
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat endpoint (Server-Sent Events)
+    
+    Emits a `sources` event as soon as retrieval finishes, then `token`
+    events as the answer is generated, then `done`. An `error` event is
+    sent if the LLM fails mid-answer.
+    
+    Example stream:
+    ```
+    event: sources
+    data: {"sources": [...], "context_used": true, "is_relevant": true, "retrieved_docs": 5}
+    
+    event: token
+    data: {"text": "According to"}
+    
+    event: done
+    data: {}
+    ```
+    """
+    try:
+        bot = await aget_chatbot()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+    
+    options = request.retrieval_options()
+    
+    async def events():
+        # The slot is held (and always released) by the body itself, for the whole stream
+        try:
+            async with chat_limiter.slot():
+                async for event in bot.achat_stream(request.query, executor=chat_executor, options=options):
+                    yield _sse(event)
+        except HTTPException as e:
+            # Rejected by the limiter after the 200 headers went out: report it in the stream
+            yield _sse({"event": "error", "data": {"error": e.detail}})
+            yield _sse({"event": "done", "data": {}})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest):
+    """
+    Batch chat endpoint - Ask many questions in one request
+    
+    Retrieval for all questions runs as one batched search. Results are
+    returned in the same order as `queries`.
+    
+    Example request:
+    ```json
+    {
+        "queries": [
+            "What is the stunting rate in Rwanda?",
+            "What surveys has NISR conducted about nutrition?"
+        ],
+        "max_context_docs": 5
+    }
+    ```
+    """
+    async with chat_limiter.slot():
+        try:
+            bot = await aget_chatbot()
+            
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(
+                chat_executor,
+                lambda: bot.chat_many(request.queries, options=request.retrieval_options())
+            )
+            
+            return BatchChatResponse(results=[ChatResponse(**result) for result in results])
+            
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Batch chat error: {str(e)}")
+
+
+def _cached_json(body: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    """JSON body with its ETag and Cache-Control, or 304 if the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": INDICATOR_CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def aget_indicator_cube() -> IndicatorCube:
+    if indicator_cube is not None and not indicator_cube.is_stale():
+        return indicator_cube
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, get_indicator_cube)
+    except OSError as e:
+        raise HTTPException(status_code=503, detail=f"Indicator data unavailable: {str(e)}")
+
+
+@app.get("/indicators")
+async def list_indicators(if_none_match: Optional[str] = Header(None)):
+    """
+    Nutrition indicators with their years and dimensions
+    
+    Served from a cube precomputed from `nutrition_indicators_rwa.csv`
+    (no LLM). Responses carry a strong ETag tied to the data file's hash and
+    a public Cache-Control header; send `If-None-Match` to get a 304.
+    """
+    cube = await aget_indicator_cube()
+    return _cached_json(cube.catalog_body, cube.etag, if_none_match)
+
+
+@app.get("/indicators/{code}/series")
+async def indicator_series(
+    code: str,
+    dimension: Optional[str] = None,
+    name: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Time series of one indicator, one series per dimension
+    
+    Example: `/indicators/NUTSTUNTINGPREV/series?dimension=SEX&name=Female`.
+    Without `dimension` every series of the indicator is returned. Each
+    point has `year`, `value`, `low`, `high` and the published `display`
+    text. Cached like `/indicators`.
+    """
+    cube = await aget_indicator_cube()
+    try:
+        body = cube.series_body(code, dimension, name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _cached_json(body, cube.etag, if_none_match)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: stage latencies, LLM tokens, retrieval distances, errors"""
+    for phase in ("model_load", "warmup", "cold_start"):
+        if startup_state[f"{phase}_seconds"] is not None:
+            metrics.STARTUP_SECONDS.set(startup_state[f"{phase}_seconds"], phase=phase)
+    metrics.record_stats("concurrency", chat_limiter.stats())
+    metrics.record_stats("coalescing", chat_flights.stats())
+    if indicator_cube is not None:
+        metrics.record_stats("indicator_cube", indicator_cube.stats())
+    # Component stats only once the chatbot exists; scraping never loads it
+    if chatbot is not None:
+        metrics.record_stats("answer_cache", chatbot.answer_cache.stats())
+        metrics.record_stats("relevance", chatbot.relevance_stats())
+        metrics.record_stats("llm", chatbot.llm.stats())
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.get("/stats")
 async def get_stats():
     """Get statistics about indexed data"""
     try:
-        bot = get_chatbot()
+        bot = await aget_chatbot()
         stats = bot.indexer.get_collection_stats()
+        stats["concurrency"] = chat_limiter.stats()
+        stats["coalescing"] = chat_flights.stats()
+        stats["answer_cache"] = bot.answer_cache.stats()
+        stats["context"] = bot.context_builder.stats()
+        stats["relevance"] = bot.relevance_stats()
+        stats["llm"] = bot.llm.stats()
+        if indicator_cube is not None:
+            stats["indicator_cube"] = indicator_cube.stats()
+        stats["startup"] = dict(startup_state)
         return {
             "status": "ok",
             "data": stats
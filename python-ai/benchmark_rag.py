@@ -0,0 +1,226 @@
+"""
+RAG Benchmark for Ubuzima Hub AI System
+Offline, deterministic timings of loading, indexing, search, context building and chat
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+from answer_cache import AnswerCache
+from chatbot import NISRAIChatbot, RetrievalOptions
+from data_loader import NISRDataLoader
+from offline_stubs import HASHING_MODEL, StubLLM, make_indexer
+import metrics
+from test_chatbot import TEST_CASES
+
+# Filters searched at every k
+SEARCH_FILTERS = {
+    "none": RetrievalOptions(),
+    "nutrition_data": RetrievalOptions(doc_type="nutrition_data"),
+    "year_2015": RetrievalOptions(filters={"year": "2015"})
+}
+SEARCH_K = (1, 5, 10)
+
+
+def summarize(seconds: List[float]) -> Dict[str, Any]:
+    """Median, min, mean and p95 of a list of timings, in milliseconds"""
+    ms = sorted(value * 1000 for value in seconds)
+    return {
+        "runs": len(ms),
+        "median_ms": round(statistics.median(ms), 4),
+        "min_ms": round(ms[0], 4),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "p95_ms": round(ms[max(0, math.ceil(0.95 * len(ms)) - 1)], 4)
+    }
+
+
+def timed(fn: Callable[[], Any]) -> float:
+    """Seconds taken by one call of `fn`, with its console output suppressed"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        fn()
+        return time.perf_counter() - started
+
+
+def quietly(fn: Callable[[], Any]) -> Any:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn()
+
+
+def run_benchmarks(
+    data_folder: str,
+    backend: str,
+    repeat: int,
+    index_repeat: int,
+    model: Optional[str] = None
+) -> Dict[str, Any]:
+    """Time every pipeline stage; returns the JSON-ready report"""
+    results: Dict[str, Dict[str, Any]] = {}
+    queries = [case["query"] for case in TEST_CASES]
+    in_scope = [case["query"] for case in TEST_CASES if case["expected_relevant"]]
+
+    def record(name: str, seconds: List[float], **extra) -> None:
+        results[name] = {**summarize(seconds), **extra}
+        print(f"✓ {name:<42} median {results[name]['median_ms']:>10.3f} ms")
+
+    with tempfile.TemporaryDirectory(prefix="ubuzima-bench-") as workdir:
+        # Loading: CSV parsing, then the columnar dataset cache
+        def load_uncached() -> None:
+            loader = NISRDataLoader(data_folder=data_folder)
+            loader.cache = None
+            loader.load_datasets()
+        record("load_datasets", [timed(load_uncached) for _ in range(repeat)])
+
+        cache_dir = os.path.join(workdir, "dataset_cache")
+        quietly(lambda: NISRDataLoader(data_folder, cache_dir=cache_dir).load_datasets())
+        record("load_datasets[cached]", [
+            timed(lambda: NISRDataLoader(data_folder, cache_dir=cache_dir).load_datasets())
+            for _ in range(repeat)
+        ])
+
+        loader = NISRDataLoader(data_folder, cache_dir=cache_dir)
+        quietly(loader.load_datasets)
+        record("prepare_documents", [timed(loader.prepare_documents) for _ in range(repeat)])
+        documents = loader.documents
+
+        # Indexing: full builds into fresh folders, then a no-op incremental pass
+        build_times = []
+        for run in range(index_repeat):
+            indexer = make_indexer(os.path.join(workdir, f"index_{run}"), backend, model)
+            build_times.append(timed(lambda: indexer.index_documents(documents, incremental=False)))
+        record("index_documents", build_times, documents=len(documents))
+        record("index_documents[unchanged]", [
+            timed(lambda: indexer.index_documents(documents)) for _ in range(repeat)
+        ])
+
+        # Search at several k and filters (query embeddings come from the cache after the first pass)
+        for filter_name, options in SEARCH_FILTERS.items():
+            for k in SEARCH_K:
+                seconds = [
+                    timed(lambda: indexer.search(query, n_results=k, filter_metadata=options.where()))
+                    for _ in range(repeat)
+                    for query in in_scope
+                ]
+                record(f"search[k={k},filter={filter_name}]", seconds)
+
+        # End-to-end chat with the stub LLM, sharing the index built above.
+        # The chatbot's own loader must use the temporary dataset cache, not ./vectordb
+        with mock.patch.dict(os.environ, {"DATA_FOLDER": data_folder, "DATASET_CACHE_DIR": cache_dir}):
+            bot = quietly(lambda: NISRAIChatbot(indexer=indexer, llm=StubLLM()))
+
+        for k in (5, 10):
+            retrieved = [indexer.search(query, n_results=k) for query in in_scope]
+            record(f"format_context[k={k}]", [
+                timed(lambda: bot._format_context(docs)) for _ in range(repeat) for docs in retrieved
+            ])
+
+        def chat_timings(label: str) -> None:
+            seconds = []
+            stages: Dict[str, List[float]] = {}
+            for _ in range(repeat):
+                for query in queries:
+                    with metrics.track_timings() as timings:
+                        seconds.append(timed(lambda: bot.chat(query)))
+                    for stage, value in timings.items():
+                        stages.setdefault(stage, []).append(value)
+            # Mean time per call spent in each stage
+            record(label, seconds, stages_ms={
+                stage: round(sum(values) * 1000 / len(seconds), 4) for stage, values in sorted(stages.items())
+            })
+
+        bot.answer_cache = AnswerCache(max_entries=0)
+        chat_timings("chat")
+        bot.answer_cache = AnswerCache()
+        chat_timings("chat[answer_cache]")
+
+        asyncio.run(bot.llm.aclose())
+        indexer.close()
+
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": backend,
+            "embedding_model": model or HASHING_MODEL,
+            "hybrid_search": indexer.hybrid_search,
+            "documents": len(documents),
+            "repeat": repeat
+        },
+        "results": results
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float, min_delta_ms: float) -> List[str]:
+    """
+    Print current vs. baseline medians and return the regressed benchmarks
+
+    A benchmark regresses when its median grew by more than `threshold`
+    (0.2 = 20%) and by more than `min_delta_ms`, which keeps microsecond
+    noise from failing the comparison.
+    """
+    for key in ("backend", "embedding_model", "documents"):
+        if current["meta"].get(key) != baseline["meta"].get(key):
+            print(f"✗ Warning: {key} differs from the baseline "
+                  f"({baseline['meta'].get(key)} -> {current['meta'].get(key)})")
+
+    regressions = []
+    print(f"\n{'benchmark':<42} {'baseline':>12} {'current':>12}  change")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"  {name:<40} {'-':>12} {result['median_ms']:>9.3f} ms  new")
+            continue
+        delta = result["median_ms"] - base["median_ms"]
+        ratio = delta / base["median_ms"] if base["median_ms"] > 0 else 0.0
+        regressed = ratio > threshold and delta > min_delta_ms
+        if regressed:
+            regressions.append(name)
+        print(f"{'✗' if regressed else '✓'} {name:<40} {base['median_ms']:>9.3f} ms "
+              f"{result['median_ms']:>9.3f} ms  {ratio:+.1%}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the RAG pipeline")
+    parser.add_argument("--data-folder", default=os.getenv("DATA_FOLDER", "../data"))
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default=os.getenv("VECTOR_BACKEND", "chroma"))
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark")
+    parser.add_argument("--index-repeat", type=int, default=2, help="Full index builds to time")
+    parser.add_argument("--model", default=None,
+                        help="Time a locally cached SentenceTransformer instead of the hashing embedder")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results")
+    parser.add_argument("--compare", metavar="BASELINE", default=None,
+                        help="Compare with an earlier results file; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Ignore slowdowns smaller than this many milliseconds")
+    args = parser.parse_args()
+
+    print("=== RAG Pipeline Benchmark ===\n")
+    report = run_benchmarks(args.data_folder, args.backend, args.repeat, args.index_repeat, args.model)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n✓ No regressions beyond {args.threshold:.0%}")
@@ -3,19 +3,76 @@ NISR AI Chatbot for Ubuzima Hub
 Retrieval-Augmented Generation with strict Rwanda NISR dataset boundaries
 """
 
+import asyncio
+import contextvars
+import functools
+import json
 import os
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Iterator, List, Dict, Any, Optional
 from dotenv import load_dotenv
-from groq import Groq
 from vector_indexer import VectorIndexer
 from data_loader import NISRDataLoader
+from indicator_query import IndicatorQueryEngine
+from answer_cache import AnswerCache
+from context_builder import ContextBuilder
+from scope_classifier import ScopeClassifier
+from llm_gateway import LLMGateway
+import metrics
 
 # Load environment variables
 load_dotenv()
 
 
+@dataclass(frozen=True)
+class RetrievalOptions:
+    """
+    Per-call retrieval settings
+    
+    Attributes:
+        k: Number of documents to retrieve (None = chatbot default)
+        filters: ChromaDB-style metadata `where` filter
+        max_distance: Drop documents farther than this from the query
+        doc_type: Only retrieve documents of this type
+                  ("nutrition_data" or "survey_metadata")
+    """
+    k: Optional[int] = None
+    filters: Optional[Dict[str, Any]] = None
+    max_distance: Optional[float] = None
+    doc_type: Optional[str] = None
+    
+    def where(self) -> Optional[Dict[str, Any]]:
+        """Combined metadata filter for the vector search"""
+        clauses = []
+        if self.filters:
+            clauses.append(self.filters)
+        if self.doc_type:
+            clauses.append({"type": self.doc_type})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+    
+    def cache_scope(self) -> str:
+        """Key that separates cached answers retrieved under different options"""
+        return json.dumps(
+            [self.k, self.filters, self.max_distance, self.doc_type],
+            sort_keys=True,
+            default=str
+        )
+
+
 class NISRAIChatbot:
-    """AI Chatbot that only answers from NISR Rwanda datasets"""
+    """
+    AI Chatbot that only answers from NISR Rwanda datasets
+    
+    Retrieval settings are passed per call (RetrievalOptions) and never
+    stored on the instance, so one chatbot can serve concurrent requests.
+    `indexer` and `llm` default to ones built from the environment; pass
+    them in to run against another index or LLM (see offline_stubs.py).
+    """
     
     SYSTEM_PROMPT = """You are an AI assistant for Ubuzima Hub, specialized in Rwanda's nutrition and health data.
 
@@ -43,153 +100,561 @@ When answering:
         model: str = "llama-3.1-70b-versatile",
         temperature: float = 0.1,
         max_tokens: int = 500,
-        max_context_docs: int = 5
+        max_context_docs: int = 5,
+        batch_concurrency: int = 8,
+        use_indicator_engine: bool = True,
+        llm_timeout: float = 30.0,
+        relevance_max_distance: Optional[float] = None,
+        indexer: Optional[VectorIndexer] = None,
+        llm: Optional[LLMGateway] = None
     ):
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
-        if not self.api_key:
+        if not self.api_key and llm is None:
             raise ValueError("GROQ_API_KEY must be set in environment or passed as parameter")
             
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.max_context_docs = max_context_docs
+        self.batch_concurrency = batch_concurrency
+        self.llm_timeout = llm_timeout
+        
+        # Skip the LLM when even the best match is farther than this (unset = off);
+        # calibrate per embedding model with calibrate_relevance.py
+        if relevance_max_distance is None and os.getenv("RELEVANCE_MAX_DISTANCE"):
+            relevance_max_distance = float(os.getenv("RELEVANCE_MAX_DISTANCE"))
+        self.relevance_max_distance = relevance_max_distance
+        self._relevance_lock = threading.Lock()
+        self.llm_calls_avoided = 0
         
-        # Initialize Groq client
-        self.client = Groq(api_key=self.api_key)
+        # Pooled LLM access with deadlines, retries, circuit breaker and failover
+        self.llm = llm or LLMGateway.from_env(api_key=self.api_key, model=model, timeout=llm_timeout)
         
         # Initialize vector indexer
-        self.indexer = VectorIndexer()
+        self.indexer = indexer or VectorIndexer()
+        
+        # Structured engine for numeric lookups (answers without the LLM)
+        self.indicator_engine = None
+        if use_indicator_engine:
+            loader = NISRDataLoader(data_folder=os.getenv("DATA_FOLDER", "../data"))
+            loader.load_datasets()
+            if loader.nutrition_data is not None:
+                self.indicator_engine = IndicatorQueryEngine(loader.nutrition_data)
+        
+        # Cache of LLM answers, invalidated whenever the vector index is rebuilt
+        self.answer_cache = AnswerCache(
+            max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+            similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")),
+            min_doc_overlap=float(os.getenv("ANSWER_CACHE_DOC_OVERLAP", "0.8"))
+        )
+        
+        # Word-bounded, single-pass scope gate (vocabularies in scope_vocabulary.json)
+        self.scope_classifier = ScopeClassifier.from_config(
+            os.getenv("SCOPE_VOCABULARY", os.path.join(os.path.dirname(os.path.abspath(__file__)), "scope_vocabulary.json")),
+            data_folder=os.getenv("DATA_FOLDER", "../data")
+        )
+        
+        # Deduplicates and tabulates retrieved rows within a prompt token budget
+        self.context_builder = ContextBuilder(
+            token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+        )
         
         print(f"✓ NISR AI Chatbot initialized with model: {model}")
+    
+    def warm_up(self) -> float:
+        """
+        Exercise the embedding model and the vector index once
+        
+        The first forward pass and the first search pay one-off costs (weight
+        loading, thread pools, index files paged in). Running them here keeps
+        that latency off the first user request.
+        
+        Returns:
+            Seconds spent warming up
+        """
+        started = time.perf_counter()
+        probe = "What is the stunting rate among children in Rwanda?"
+        
+        # Call the model directly: the embedding cache would skip the forward pass
+        embedding = self.indexer.embedder.encode([probe])
+        self.indexer.backend.query(embedding, n_results=1)
+        self.answer_without_llm(probe)
+        
+        elapsed = time.perf_counter() - started
+        print(f"✓ Warm-up finished in {elapsed:.2f}s")
+        return elapsed
         
     def _is_rwanda_related(self, query: str) -> bool:
         """Check if query is potentially about Rwanda"""
-        rwanda_keywords = [
-            "rwanda", "rwandan", "kigali", "nisr", "rwa",
-            "stunting", "wasting", "nutrition", "malnutrition",
-            "anemia", "breastfeeding", "dhs", "eicv", "survey"
-        ]
-        query_lower = query.lower()
-        return any(keyword in query_lower for keyword in rwanda_keywords)
+        return self.scope_classifier.classify(query).rwanda_related
     
     def _is_out_of_scope(self, query: str) -> bool:
         """Detect if query is clearly out of scope"""
-        # Check for other countries
-        other_countries = [
-            "uganda", "kenya", "tanzania", "burundi", "congo",
-            "usa", "america", "china", "india", "europe"
-        ]
-        query_lower = query.lower()
+        return not self.scope_classifier.classify(query).in_scope
+    
+    def _answer_structured(self, query: str) -> Optional[Dict[str, Any]]:
+        """Answer exact lookups, ranges and time series straight from the indicator table"""
+        if self.indicator_engine is None:
+            return None
+        return self.indicator_engine.answer(query)
+    
+    def answer_without_llm(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Cheap answers that need neither retrieval nor the LLM
         
-        # If mentions other country, it's out of scope
-        if any(country in query_lower for country in other_countries):
-            return True
-            
-        # If doesn't mention Rwanda and is general question, might be out of scope
-        if not self._is_rwanda_related(query):
-            general_topics = ["weather", "sports", "entertainment", "politics"]
-            if any(topic in query_lower for topic in general_topics):
-                return True
-                
-        return False
+        Returns:
+            The out-of-scope or structured-lookup response, or None when the
+            query needs the full RAG pipeline
+        """
+        with metrics.stage("scope"):
+            scope = self.scope_classifier.classify(query)
+        if not scope.in_scope:
+            return self._out_of_scope_response(scope.reason)
+        with metrics.stage("structured"):
+            return self._answer_structured(query)
+    
+    def _resolve_options(self, options: Optional[RetrievalOptions]) -> RetrievalOptions:
+        """Fill in chatbot defaults for anything the caller did not set"""
+        options = options or RetrievalOptions()
+        if options.k is None:
+            options = replace(options, k=self.max_context_docs)
+        return options
+    
+    def _apply_cutoff(
+        self,
+        results: List[Dict[str, Any]],
+        options: RetrievalOptions
+    ) -> List[Dict[str, Any]]:
+        """Drop results beyond the distance cutoff"""
+        if options.max_distance is None:
+            return results
+        return [doc for doc in results if doc["distance"] <= options.max_distance]
     
-    def _retrieve_context(self, query: str) -> List[Dict[str, Any]]:
+    def _retrieve_context(
+        self,
+        query: str,
+        options: Optional[RetrievalOptions] = None
+    ) -> List[Dict[str, Any]]:
         """Retrieve relevant documents from vector database"""
-        results = self.indexer.search(query, n_results=self.max_context_docs)
-        return results
+        options = self._resolve_options(options)
+        results = self.indexer.search(query, n_results=options.k, filter_metadata=options.where())
+        metrics.observe_distances(results)
+        return self._apply_cutoff(results, options)
+    
+    def _has_relevant_context(self, retrieved_docs: List[Dict[str, Any]]) -> bool:
+        """
+        Whether retrieval found anything worth an LLM call
+        
+        False when nothing was retrieved or the closest document is beyond
+        `relevance_max_distance`; every False is an LLM call avoided.
+        """
+        distances = [doc["distance"] for doc in retrieved_docs if doc.get("distance") is not None]
+        relevant = bool(retrieved_docs) and (
+            self.relevance_max_distance is None
+            or not distances
+            or min(distances) <= self.relevance_max_distance
+        )
+        if not relevant:
+            with self._relevance_lock:
+                self.llm_calls_avoided += 1
+        return relevant
+    
+    def relevance_stats(self) -> Dict[str, Any]:
+        """Relevance cutoff and how many LLM calls it saved"""
+        return {
+            "max_distance": self.relevance_max_distance,
+            "llm_calls_avoided": self.llm_calls_avoided
+        }
     
     def _format_context(self, documents: List[Dict[str, Any]]) -> str:
         """Format retrieved documents as context for LLM"""
-        if not documents:
-            return "No relevant data found in NISR datasets."
+        return self.context_builder.build(documents)
+    
+    def _out_of_scope_response(self, reason: Optional[str] = None) -> Dict[str, Any]:
+        """Response for questions outside Rwanda NISR data"""
+        return {
+            "answer": "I can only answer questions about Rwanda based on official NISR (National Institute of Statistics of Rwanda) datasets. Please ask about Rwanda's nutrition, health, or survey data.",
+            "sources": [],
+            "context_used": False,
+            "is_relevant": False,
+            "scope_reason": reason
+        }
+    
+    def _no_data_response(self) -> Dict[str, Any]:
+        """Response for Rwanda questions with no matching NISR data"""
+        return {
+            "answer": "I don't have NISR data to answer that specific question. My responses are based on official NISR datasets covering nutrition indicators and survey metadata from Rwanda.",
+            "sources": [],
+            "context_used": False,
+            "is_relevant": True
+        }
+    
+    def _build_messages(self, query: str, retrieved_docs: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Build the LLM messages for a query and its retrieved documents"""
+        # Format context
+        with metrics.stage("format_context"):
+            context = self._format_context(retrieved_docs)
+        
+        return [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"Context from NISR datasets:\n\n{context}\n\nUser Question: {query}\n\nProvide a clear, factual answer based ONLY on the context above. Cite sources and years."}
+        ]
+    
+    def _sources(self, retrieved_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Extract sources from retrieved documents"""
+        return [
+            {
+                "source": doc["metadata"].get("source", "Unknown"),
+                # Years are stored as numbers; the API's Source model expects text
+                "year": str(doc["metadata"].get("year", doc["metadata"].get("year_start", "N/A"))),
+                "type": doc["metadata"].get("type", "unknown")
+            }
+            for doc in retrieved_docs
+        ]
+    
+    def _answer_response(self, answer: str, retrieved_docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Response for an LLM answer, citing the retrieved documents"""
+        return {
+            "answer": answer,
+            "sources": self._sources(retrieved_docs),
+            "context_used": True,
+            "is_relevant": True,
+            "retrieved_docs": len(retrieved_docs)
+        }
+    
+    def _error_response(self, error: Exception) -> Dict[str, Any]:
+        """Response when the LLM call fails"""
+        metrics.ERRORS.inc(type=type(error).__name__)
+        message = str(error) or type(error).__name__
+        return {
+            "answer": f"Error processing request: {message}",
+            "sources": [],
+            "context_used": False,
+            "is_relevant": True,
+            "error": message
+        }
+    
+    def _cache_key(
+        self,
+        query: str,
+        retrieved_docs: List[Dict[str, Any]],
+        scope: str
+    ) -> Optional[Dict[str, Any]]:
+        """Answer cache lookup arguments for a query, or None if caching is off"""
+        if not self.answer_cache.enabled:
+            return None
+        return {
+            "query": query,
+            # Retrieval just embedded this query, so this is an embedding cache hit
+            "embedding": self.indexer.embed([query])[0],
+            "doc_ids": [doc["id"] for doc in retrieved_docs],
+            "version": self.indexer.index_version,
+            "scope": scope
+        }
+    
+    def _cache_lookup(self, cache_key: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not cache_key:
+            return None
+        with metrics.stage("answer_cache"):
+            return self.answer_cache.get(**cache_key)
+    
+    def _cache_store(
+        self,
+        cache_key: Optional[Dict[str, Any]],
+        response: Dict[str, Any],
+        started: float
+    ) -> None:
+        """Cache a successful LLM answer along with the time it took"""
+        if cache_key and "error" not in response:
+            self.answer_cache.put(**cache_key, response=response, latency=time.perf_counter() - started)
+    
+    def _generate_answer(
+        self,
+        query: str,
+        retrieved_docs: List[Dict[str, Any]],
+        scope: str = ""
+    ) -> Dict[str, Any]:
+        """Answer a query from its retrieved documents with the LLM"""
+        # If no relevant documents found
+        if not self._has_relevant_context(retrieved_docs):
+            return self._no_data_response()
+        
+        cache_key = self._cache_key(query, retrieved_docs, scope)
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            return cached
+        
+        messages = self._build_messages(query, retrieved_docs)
+        started = time.perf_counter()
+        
+        # Call the LLM (retries and failover happen in the gateway)
+        try:
+            answer = self.llm.complete(messages, temperature=self.temperature, max_tokens=self.max_tokens)
             
-        context_parts = ["NISR Rwanda Data Context:\n"]
-        
-        for i, doc in enumerate(documents, 1):
-            metadata = doc["metadata"]
-            context_parts.append(
-                f"\n[Document {i}]\n"
-                f"Source: {metadata.get('source', 'Unknown')}\n"
-                f"Year: {metadata.get('year', metadata.get('year_start', 'N/A'))}\n"
-                f"Data: {doc['text']}\n"
-            )
+            result = self._answer_response(answer, retrieved_docs)
+            self._cache_store(cache_key, result, started)
+            return result
+            
+        except Exception as e:
+            return self._error_response(e)
+    
+    async def _agenerate_answer(
+        self,
+        query: str,
+        retrieved_docs: List[Dict[str, Any]],
+        scope: str = "",
+        executor: Optional[Executor] = None
+    ) -> Dict[str, Any]:
+        """Async variant of _generate_answer using the async LLM clients"""
+        if not self._has_relevant_context(retrieved_docs):
+            return self._no_data_response()
+        
+        # Embedding the query for the cache key may run the model: keep it off the event loop
+        cache_key = await self._in_executor(executor, self._cache_key, query, retrieved_docs, scope)
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            return cached
+        
+        messages = self._build_messages(query, retrieved_docs)
+        started = time.perf_counter()
+        
+        try:
+            answer = await self.llm.acomplete(messages, temperature=self.temperature, max_tokens=self.max_tokens)
+            
+            result = self._answer_response(answer, retrieved_docs)
+            self._cache_store(cache_key, result, started)
+            return result
             
-        return "\n".join(context_parts)
+        except Exception as e:
+            return self._error_response(e)
     
-    def chat(self, query: str) -> Dict[str, Any]:
+    def chat(self, query: str, options: Optional[RetrievalOptions] = None) -> Dict[str, Any]:
         """
         Process a user query and return AI response based only on NISR data
         
+        Args:
+            query: User question
+            options: Retrieval settings for this call (default: chatbot defaults)
+        
         Returns:
             Dict with keys: answer, sources, context_used, is_relevant
         """
-        # Check if out of scope
-        if self._is_out_of_scope(query):
-            return {
-                "answer": "I can only answer questions about Rwanda based on official NISR (National Institute of Statistics of Rwanda) datasets. Please ask about Rwanda's nutrition, health, or survey data.",
-                "sources": [],
-                "context_used": False,
-                "is_relevant": False
-            }
+        # Out-of-scope questions and numeric lookups need neither retrieval nor the LLM
+        direct = self.answer_without_llm(query)
+        if direct is not None:
+            return direct
         
         # Retrieve relevant context
-        retrieved_docs = self._retrieve_context(query)
+        options = self._resolve_options(options)
+        retrieved_docs = self._retrieve_context(query, options)
         
-        # If no relevant documents found
-        if not retrieved_docs or len(retrieved_docs) == 0:
-            return {
-                "answer": "I don't have NISR data to answer that specific question. My responses are based on official NISR datasets covering nutrition indicators and survey metadata from Rwanda.",
-                "sources": [],
-                "context_used": False,
-                "is_relevant": True
-            }
+        return self._generate_answer(query, retrieved_docs, scope=options.cache_scope())
+    
+    @staticmethod
+    def _in_executor(executor: Optional[Executor], fn, *args) -> asyncio.Future:
+        """run_in_executor that carries the caller's context (per-request stage timings)"""
+        context = contextvars.copy_context()
+        return asyncio.get_running_loop().run_in_executor(executor, functools.partial(context.run, fn, *args))
+    
+    async def achat(
+        self,
+        query: str,
+        executor: Optional[Executor] = None,
+        options: Optional[RetrievalOptions] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of chat for use inside an event loop
         
-        # Format context
-        context = self._format_context(retrieved_docs)
+        Embedding and vector search run on `executor` (default: the loop's
+        default executor) and the LLM call goes through the gateway's async
+        client, so neither blocks the loop. Cancelling the task cancels
+        the LLM request.
+        """
+        direct = self.answer_without_llm(query)
+        if direct is not None:
+            return direct
         
-        # Build messages for LLM
-        messages = [
-            {"role": "system", "content": self.SYSTEM_PROMPT},
-            {"role": "user", "content": f"Context from NISR datasets:\n\n{context}\n\nUser Question: {query}\n\nProvide a clear, factual answer based ONLY on the context above. Cite sources and years."}
-        ]
+        options = self._resolve_options(options)
+        retrieved_docs = await self._in_executor(executor, self._retrieve_context, query, options)
         
-        # Call Groq API
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
-            )
-            
-            answer = response.choices[0].message.content
-            
-            # Extract sources from retrieved documents
-            sources = [
-                {
-                    "source": doc["metadata"].get("source", "Unknown"),
-                    "year": doc["metadata"].get("year", doc["metadata"].get("year_start", "N/A")),
-                    "type": doc["metadata"].get("type", "unknown")
-                }
-                for doc in retrieved_docs
-            ]
-            
-            return {
-                "answer": answer,
-                "sources": sources,
+        return await self._agenerate_answer(query, retrieved_docs, scope=options.cache_scope(), executor=executor)
+    
+    def _stream_response(self, response: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Stream events for an answer that is already complete"""
+        yield {
+            "event": "sources",
+            "data": {key: value for key, value in response.items() if key != "answer"}
+        }
+        yield {"event": "token", "data": {"text": response["answer"]}}
+        yield {"event": "done", "data": {}}
+    
+    def _sources_event(self, retrieved_docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """First stream event of an LLM answer: what the answer will be based on"""
+        return {
+            "event": "sources",
+            "data": {
+                "sources": self._sources(retrieved_docs),
                 "context_used": True,
                 "is_relevant": True,
                 "retrieved_docs": len(retrieved_docs)
             }
-            
+        }
+    
+    def chat_stream(
+        self,
+        query: str,
+        options: Optional[RetrievalOptions] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of chat
+        
+        Yields events as dicts with keys `event` and `data`:
+            sources - sources, context_used, is_relevant, retrieved_docs
+            token   - {"text": ...} answer fragments as the LLM produces them
+            error   - {"error": ...} if the LLM call fails mid-answer
+            done    - end of stream
+        Out-of-scope, structured and no-data answers are streamed as a
+        single token event.
+        """
+        direct = self.answer_without_llm(query)
+        if direct is not None:
+            yield from self._stream_response(direct)
+            return
+        
+        options = self._resolve_options(options)
+        retrieved_docs = self._retrieve_context(query, options)
+        if not self._has_relevant_context(retrieved_docs):
+            yield from self._stream_response(self._no_data_response())
+            return
+        
+        cache_key = self._cache_key(query, retrieved_docs, options.cache_scope())
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            yield from self._stream_response(cached)
+            return
+        
+        yield self._sources_event(retrieved_docs)
+        
+        started = time.perf_counter()
+        tokens: List[str] = []
+        try:
+            for text in self.llm.stream(
+                self._build_messages(query, retrieved_docs),
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
+            ):
+                tokens.append(text)
+                yield {"event": "token", "data": {"text": text}}
+            self._cache_store(cache_key, self._answer_response("".join(tokens), retrieved_docs), started)
         except Exception as e:
-            return {
-                "answer": f"Error processing request: {str(e)}",
-                "sources": [],
-                "context_used": False,
-                "is_relevant": True,
-                "error": str(e)
-            }
+            yield {"event": "error", "data": {"error": self._error_response(e)["error"]}}
+        
+        yield {"event": "done", "data": {}}
+    
+    async def achat_stream(
+        self,
+        query: str,
+        executor: Optional[Executor] = None,
+        options: Optional[RetrievalOptions] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async variant of chat_stream
+        
+        Retrieval runs on `executor`; the LLM stream goes through the
+        gateway's async client, with `llm_timeout` applied to the first
+        token and to every gap between tokens.
+        """
+        direct = self.answer_without_llm(query)
+        if direct is not None:
+            for event in self._stream_response(direct):
+                yield event
+            return
+        
+        options = self._resolve_options(options)
+        retrieved_docs = await self._in_executor(executor, self._retrieve_context, query, options)
+        if not self._has_relevant_context(retrieved_docs):
+            for event in self._stream_response(self._no_data_response()):
+                yield event
+            return
+        
+        cache_key = await self._in_executor(
+            executor, self._cache_key, query, retrieved_docs, options.cache_scope()
+        )
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            for event in self._stream_response(cached):
+                yield event
+            return
+        
+        yield self._sources_event(retrieved_docs)
+        
+        started = time.perf_counter()
+        tokens: List[str] = []
+        try:
+            async for text in self.llm.astream(
+                self._build_messages(query, retrieved_docs),
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
+            ):
+                tokens.append(text)
+                yield {"event": "token", "data": {"text": text}}
+            self._cache_store(cache_key, self._answer_response("".join(tokens), retrieved_docs), started)
+        except Exception as e:
+            yield {"event": "error", "data": {"error": self._error_response(e)["error"]}}
+        
+        yield {"event": "done", "data": {}}
+    
+    def chat_many(
+        self,
+        queries: List[str],
+        options: Optional[RetrievalOptions] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process several queries at once
+        
+        Numeric lookups are answered by the indicator engine. Retrieval for
+        the remaining in-scope queries is a single batched search; the LLM
+        calls then run concurrently (up to `batch_concurrency`). `options`
+        apply to every query.
+        
+        Returns:
+            One response dict per query (same shape as `chat`), in order
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        
+        in_scope = []
+        for i, query in enumerate(queries):
+            direct = self.answer_without_llm(query)
+            if direct is not None:
+                results[i] = direct
+            else:
+                in_scope.append(i)
+                
+        if not in_scope:
+            return results
+        
+        # One batched retrieval for every in-scope query
+        options = self._resolve_options(options)
+        retrieved = self.indexer.search_many(
+            [queries[i] for i in in_scope],
+            n_results=options.k,
+            filter_metadata=options.where()
+        )
+        for docs in retrieved:
+            metrics.observe_distances(docs)
+        retrieved = [self._apply_cutoff(docs, options) for docs in retrieved]
+        
+        workers = max(1, min(self.batch_concurrency, len(in_scope)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            answers = executor.map(
+                lambda item: self._generate_answer(queries[item[0]], item[1], scope=options.cache_scope()),
+                zip(in_scope, retrieved)
+            )
+            for i, answer in zip(in_scope, answers):
+                results[i] = answer
+                
+        return results
 
 
 def interactive_chat():
@@ -0,0 +1,140 @@
+"""
+Context Builder for Ubuzima Hub AI System
+Packs retrieved documents into a compact, token-budgeted LLM context
+"""
+
+import math
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+NUTRITION_PREFIX = re.compile(r"^Rwanda Nutrition Data \([^)]*\): ")
+SURVEY_PREFIX = re.compile(r"^Rwanda Survey: ")
+RANGE_SUFFIX = re.compile(r" \(Range: ([^)]*)\)$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English and numbers)"""
+    return math.ceil(len(text) / 4)
+
+
+def _nutrition_value(text: str) -> Optional[str]:
+    """Value cell from a nutrition document text, e.g. `45.8 [43.9-47.7]`"""
+    if ". Value: " not in text:
+        return None
+    value = text.rsplit(". Value: ", 1)[1]
+    match = RANGE_SUFFIX.search(value)
+    if match:
+        value = value[:match.start()]
+        # Most values already carry their interval in brackets
+        if "[" not in value:
+            value = f"{value} [{match.group(1)}]"
+    return value
+
+
+class ContextBuilder:
+    """
+    Builds the "NISR Rwanda Data Context" block sent to the LLM
+
+    - Documents with identical text are included once.
+    - Nutrition rows of the same indicator are grouped into one table
+      (year x dimension -> value) under a single indicator/source header,
+      instead of repeating the boilerplate sentence per row.
+    - Documents are admitted in retrieval order until the token budget is
+      spent; the first document is always included.
+    """
+
+    def __init__(self, token_budget: int = 1200):
+        self.token_budget = token_budget
+
+        self._lock = threading.Lock()
+        self.contexts_built = 0
+        self.duplicates_dropped = 0
+        self.documents_over_budget = 0
+        self.tokens_used = 0
+
+    def _group_key(self, doc: Dict[str, Any]) -> Tuple[str, str]:
+        """Documents with the same key share one section of the context"""
+        metadata = doc.get("metadata") or {}
+        if (
+            metadata.get("type") == "nutrition_data"
+            and "dimension" in metadata
+            and NUTRITION_PREFIX.match(doc["text"])
+            and _nutrition_value(doc["text"]) is not None
+        ):
+            return ("nutrition", str(metadata.get("indicator_code") or metadata.get("indicator", "")))
+        return ("list", str(metadata.get("source", "Unknown")))
+
+    def _header(self, key: Tuple[str, str], doc: Dict[str, Any]) -> List[str]:
+        metadata = doc["metadata"]
+        if key[0] == "nutrition":
+            code = metadata.get("indicator_code")
+            name = metadata.get("indicator", "Unknown Indicator")
+            return [
+                f"\n## {name}" + (f" ({code})" if code else ""),
+                f"Source: {metadata.get('source', 'Unknown')}",
+                "Year | Group | Value"
+            ]
+        return [f"\n## {key[1]}"]
+
+    def _row(self, key: Tuple[str, str], doc: Dict[str, Any]) -> str:
+        if key[0] == "nutrition":
+            metadata = doc["metadata"]
+            group = metadata.get("dimension") or "-"
+            return f"{metadata.get('year', 'N/A')} | {group} | {_nutrition_value(doc['text'])}"
+        return f"- {SURVEY_PREFIX.sub('', doc['text'])}"
+
+    def build(self, documents: List[Dict[str, Any]]) -> str:
+        """Context string for the retrieved documents, within the token budget"""
+        if not documents:
+            return "No relevant data found in NISR datasets."
+
+        title = "NISR Rwanda Data Context:"
+        used = estimate_tokens(title)
+        sections: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        seen = set()
+        duplicates = over_budget = 0
+
+        for doc in documents:
+            if doc["text"] in seen:
+                duplicates += 1
+                continue
+
+            key = self._group_key(doc)
+            row = self._row(key, doc)
+            header = [] if key in sections else self._header(key, doc)
+            cost = estimate_tokens("\n".join(header + [row]))
+            if seen and used + cost > self.token_budget:
+                over_budget += 1
+                continue
+
+            seen.add(doc["text"])
+            used += cost
+            section = sections.setdefault(key, {"header": header, "rows": []})
+            section["rows"].append((str(doc["metadata"].get("year", "")), row))
+
+        lines = [title]
+        for key, section in sections.items():
+            lines.extend(section["header"])
+            rows = section["rows"]
+            if key[0] == "nutrition":
+                # Chronological rows read as a trend
+                rows = sorted(rows, key=lambda row: row[0])
+            lines.extend(row for _, row in rows)
+
+        with self._lock:
+            self.contexts_built += 1
+            self.duplicates_dropped += duplicates
+            self.documents_over_budget += over_budget
+            self.tokens_used += used
+
+        return "\n".join(lines)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "token_budget": self.token_budget,
+            "contexts_built": self.contexts_built,
+            "duplicates_dropped": self.duplicates_dropped,
+            "documents_over_budget": self.documents_over_budget,
+            "avg_context_tokens": round(self.tokens_used / self.contexts_built, 1) if self.contexts_built else 0.0
+        }
@@ -4,21 +4,87 @@ Loads and prepares NISR datasets for RAG system
 """
 
 import pandas as pd
+import numpy as np
 import os
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Iterator, List, Dict, Any, Optional
 import json
+from dataset_cache import DatasetCache
+
+
+def _column(frame: pd.DataFrame, name: str, default: Any) -> pd.Series:
+    """Column `name`, or a column filled with `default` if it is missing"""
+    if name in frame.columns:
+        return frame[name]
+    return pd.Series([default] * len(frame), index=frame.index, dtype=object)
+
+
+def _truthy(column: pd.Series) -> pd.Series:
+    """Element-wise Python truthiness (missing values count as true, like NaN)"""
+    if pd.api.types.is_bool_dtype(column):
+        return column
+    if pd.api.types.is_numeric_dtype(column):
+        return column.isna() | (column != 0)
+    return column.map(bool)
+
+
+def _strings(column: pd.Series) -> pd.Series:
+    """Column as plain strings, missing values as empty strings"""
+    return column.astype(object).where(column.notna(), "")
+
+
+def drop_hxl_rows(frame: pd.DataFrame) -> pd.DataFrame:
+    """Drop the HXL hashtag row (e.g. `#indicator+code,...`) that follows the header"""
+    if frame.empty:
+        return frame
+    first = frame.iloc[0]
+    if all(isinstance(cell, str) and cell.startswith("#") for cell in first if pd.notna(cell)):
+        return frame.iloc[1:]
+    return frame
+
+
+def _records(columns: Dict[str, Any], length: int) -> List[Dict[str, Any]]:
+    """Row dicts from a mapping of column name to Series (or constant)"""
+    values = [
+        column.tolist() if isinstance(column, pd.Series) else [column] * length
+        for column in columns.values()
+    ]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def _documents(
+    prefix: str,
+    index: pd.Index,
+    texts: pd.Series,
+    metadatas: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Zip ids, texts and metadata into document dicts"""
+    return [
+        {"id": f"{prefix}_{idx}", "text": text, "metadata": metadata}
+        for idx, text, metadata in zip(index.tolist(), texts.tolist(), metadatas)
+    ]
 
 
 class NISRDataLoader:
     """Loads and processes NISR datasets from CSV files"""
     
-    def __init__(self, data_folder: str = "../data"):
+    def __init__(self, data_folder: str = "../data", cache_dir: Optional[str] = None):
         self.data_folder = Path(data_folder)
         self.nutrition_data = None
         self.survey_metadata = None
         self.documents = []
         
+        # Parsed CSVs are cached column-wise so later starts skip the CSV parser
+        self.cache = None
+        if os.getenv("DATASET_CACHE", "true").lower() == "true":
+            self.cache = DatasetCache(cache_dir or os.getenv("DATASET_CACHE_DIR", "./vectordb/dataset_cache"))
+    
+    def _read_csv(self, path: Path) -> pd.DataFrame:
+        """Parse a CSV, or load it from the dataset cache"""
+        if self.cache is None:
+            return pd.read_csv(path)
+        return self.cache.load(path, pd.read_csv)
+        
     def load_datasets(self) -> None:
         """Load all NISR datasets from CSV files"""
         print("Loading NISR datasets...")
@@ -26,7 +92,7 @@ class NISRDataLoader:
         # Load nutrition indicators
         nutrition_path = self.data_folder / "nutrition_indicators_rwa.csv"
         if nutrition_path.exists():
-            self.nutrition_data = pd.read_csv(nutrition_path)
+            self.nutrition_data = self._read_csv(nutrition_path)
             print(f"✓ Loaded nutrition indicators: {len(self.nutrition_data)} rows")
         else:
             print(f"✗ Warning: {nutrition_path} not found")
@@ -34,7 +100,7 @@ class NISRDataLoader:
         # Load survey metadata
         survey_path = self.data_folder / "search-10-09-25-050154.csv"
         if survey_path.exists():
-            self.survey_metadata = pd.read_csv(survey_path)
+            self.survey_metadata = self._read_csv(survey_path)
             print(f"✓ Loaded survey metadata: {len(self.survey_metadata)} rows")
         else:
             print(f"✗ Warning: {survey_path} not found")
@@ -43,87 +109,95 @@ class NISRDataLoader:
         """Convert datasets into documents for vector indexing"""
         print("\nPreparing documents for RAG system...")
         documents = []
-        
-        # Process nutrition indicators
-        if self.nutrition_data is not None:
-            for idx, row in self.nutrition_data.iterrows():
-                # Create rich text document from each nutrition indicator
-                doc_text = self._format_nutrition_indicator(row)
-                
-                documents.append({
-                    "id": f"nutrition_{idx}",
-                    "text": doc_text,
-                    "metadata": {
-                        "source": "NISR Nutrition Indicators",
-                        "indicator": row.get("GHO (DISPLAY)", ""),
-                        "year": row.get("YEAR (DISPLAY)", ""),
-                        "country": "Rwanda",
-                        "type": "nutrition_data"
-                    }
-                })
-                
-        # Process survey metadata
-        if self.survey_metadata is not None:
-            for idx, row in self.survey_metadata.iterrows():
-                doc_text = self._format_survey_metadata(row)
-                
-                documents.append({
-                    "id": f"survey_{idx}",
-                    "text": doc_text,
-                    "metadata": {
-                        "source": "NISR Survey Catalog",
-                        "survey_title": row.get("titl", ""),
-                        "year_start": row.get("data_coll_start", ""),
-                        "year_end": row.get("data_coll_end", ""),
-                        "country": "Rwanda",
-                        "type": "survey_metadata"
-                    }
-                })
+        for chunk in self.iter_documents():
+            documents.extend(chunk)
                 
         print(f"✓ Prepared {len(documents)} documents for indexing")
         self.documents = documents
         return documents
     
-    def _format_nutrition_indicator(self, row: pd.Series) -> str:
-        """Format nutrition indicator row as readable text"""
-        indicator_name = row.get("GHO (DISPLAY)", "Unknown Indicator")
-        year = row.get("YEAR (DISPLAY)", "Unknown Year")
-        value = row.get("Value", "N/A")
-        dimension_type = row.get("DIMENSION (TYPE)", "")
-        dimension_name = row.get("DIMENSION (NAME)", "")
+    def iter_documents(self, chunk_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield documents in lists of at most `chunk_size`
         
-        text = f"Rwanda Nutrition Data ({year}): {indicator_name}"
+        Each chunk is built column-wise from a slice of the dataset, so only
+        one chunk of documents is held in memory at a time.
+        """
+        if self.nutrition_data is not None:
+            nutrition = drop_hxl_rows(self.nutrition_data)
+            for start in range(0, len(nutrition), chunk_size):
+                yield self.nutrition_documents(nutrition.iloc[start:start + chunk_size])
+                
+        if self.survey_metadata is not None:
+            surveys = drop_hxl_rows(self.survey_metadata)
+            for start in range(0, len(surveys), chunk_size):
+                yield self.survey_documents(surveys.iloc[start:start + chunk_size])
+    
+    def nutrition_documents(self, frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Build nutrition indicator documents for a block of rows"""
+        year = _column(frame, "YEAR (DISPLAY)", "Unknown Year")
+        indicator_name = _column(frame, "GHO (DISPLAY)", "Unknown Indicator")
+        value = _column(frame, "Value", "N/A")
+        dimension_type = _column(frame, "DIMENSION (TYPE)", "")
+        dimension_name = _column(frame, "DIMENSION (NAME)", "")
+        low = _column(frame, "Low", "")
+        high = _column(frame, "High", "")
         
-        if dimension_type and dimension_name:
-            text += f" for {dimension_name}"
-            
-        text += f". Value: {value}"
+        text = "Rwanda Nutrition Data (" + year.astype(str) + "): " + indicator_name.astype(str)
+        
+        has_dimension = _truthy(dimension_type) & _truthy(dimension_name)
+        text = text.where(~has_dimension, text + " for " + dimension_name.astype(str))
+        
+        text = text + ". Value: " + value.astype(str)
         
         # Add low/high range if available
-        low = row.get("Low", "")
-        high = row.get("High", "")
-        if pd.notna(low) and pd.notna(high):
-            text += f" (Range: {low}-{high})"
-            
-        return text
+        has_range = low.notna() & high.notna()
+        text = text.where(~has_range, text + " (Range: " + low.astype(str) + "-" + high.astype(str) + ")")
+        
+        metadata = _records({
+            "source": "NISR Nutrition Indicators",
+            "indicator": _column(frame, "GHO (DISPLAY)", ""),
+            "indicator_code": _strings(_column(frame, "GHO (CODE)", "")),
+            "dimension_type": _strings(dimension_type),
+            "dimension": _strings(dimension_name),
+            "year": _column(frame, "YEAR (DISPLAY)", ""),
+            "country": "Rwanda",
+            "type": "nutrition_data"
+        }, len(frame))
+        
+        return _documents("nutrition", frame.index, text, metadata)
     
-    def _format_survey_metadata(self, row: pd.Series) -> str:
-        """Format survey metadata as readable text"""
-        title = row.get("titl", "Unknown Survey")
-        authority = row.get("authenty", "NISR")
-        year_start = row.get("data_coll_start", "")
-        year_end = row.get("data_coll_end", "")
+    def survey_documents(self, frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Build survey catalog documents for a block of rows"""
+        title = _column(frame, "titl", "Unknown Survey")
+        authority = _column(frame, "authenty", "NISR")
+        year_start = _column(frame, "data_coll_start", "")
+        year_end = _column(frame, "data_coll_end", "")
         
-        text = f"Rwanda Survey: {title}"
-        text += f". Conducted by {authority}"
+        text = "Rwanda Survey: " + title.astype(str) + ". Conducted by " + authority.astype(str)
         
-        if year_start and year_end:
-            if year_start == year_end:
-                text += f" in {year_start}"
-            else:
-                text += f" from {year_start} to {year_end}"
-                
-        return text
+        start_text = year_start.astype(str)
+        period = pd.Series(
+            np.where(
+                (year_start.astype(object) == year_end.astype(object)).to_numpy(dtype=bool, na_value=False),
+                " in " + start_text,
+                " from " + start_text + " to " + year_end.astype(str)
+            ),
+            index=frame.index
+        )
+        has_period = _truthy(year_start) & _truthy(year_end)
+        text = text + period.where(has_period, "")
+        
+        metadata = _records({
+            "source": "NISR Survey Catalog",
+            "survey_title": _column(frame, "titl", ""),
+            "year_start": year_start,
+            "year_end": year_end,
+            "country": "Rwanda",
+            "type": "survey_metadata"
+        }, len(frame))
+        
+        return _documents("survey", frame.index, text, metadata)
     
     def get_summary_statistics(self) -> Dict[str, Any]:
         """Get summary statistics about loaded datasets"""
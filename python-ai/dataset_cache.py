@@ -0,0 +1,185 @@
+"""
+Dataset Cache for Ubuzima Hub AI System
+Columnar, dictionary-encoded on-disk copy of parsed CSV files
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Bump when the on-disk layout changes so old caches are rebuilt
+FORMAT_VERSION = 1
+
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """
+    Stores parsed DataFrames as one directory of .npy files per source file
+
+    String columns are dictionary-encoded (integer codes + a table of distinct
+    values) and come back as pandas categoricals when values repeat; numeric
+    columns are stored raw. Everything is loaded memory-mapped, so a warm
+    start does no CSV parsing and shares pages with the OS file cache.
+
+    An entry is valid while the source file's size and mtime are unchanged;
+    if only the mtime changed (e.g. a fresh checkout) the SHA-256 decides.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_dir(self, source: Path) -> Path:
+        key = hashlib.sha1(str(source.resolve()).encode("utf-8")).hexdigest()[:8]
+        return self.cache_dir / f"{source.stem}-{key}"
+
+    def load(
+        self,
+        source: Path,
+        parse: Callable[[Path], pd.DataFrame] = pd.read_csv
+    ) -> pd.DataFrame:
+        """DataFrame for `source`, from the cache if valid, else parsed and cached"""
+        entry = self._entry_dir(source)
+        try:
+            frame = self._read(entry, source)
+        except (OSError, ValueError, KeyError):
+            # Damaged entry: rebuild it below
+            frame = None
+        if frame is not None:
+            self.hits += 1
+            return frame
+
+        self.misses += 1
+        frame = parse(source)
+        try:
+            self._write(entry, source, frame)
+        except (OSError, ValueError) as e:
+            print(f"✗ Warning: could not cache {source.name}: {e}")
+        return frame
+
+    def _source_state(self, source: Path) -> Dict[str, int]:
+        stat = source.stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _read(self, entry: Path, source: Path) -> Optional[pd.DataFrame]:
+        """Load a cache entry, or None if it is missing or stale"""
+        manifest_path = entry / "manifest.json"
+        if not manifest_path.exists():
+            return None
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get("format_version") != FORMAT_VERSION:
+            return None
+
+        state = self._source_state(source)
+        if state["size"] != manifest["source"]["size"]:
+            return None
+        if state["mtime_ns"] != manifest["source"]["mtime_ns"]:
+            if file_sha256(source) != manifest["source"]["sha256"]:
+                return None
+            # Same content, new mtime: remember it so the next start skips hashing
+            manifest["source"].update(state)
+            self._write_manifest(entry, manifest)
+
+        columns = {
+            i: self._read_column(entry, i, column)
+            for i, column in enumerate(manifest["columns"])
+        }
+
+        index = manifest["index"]
+        if index["kind"] == "range":
+            frame_index = pd.RangeIndex(index["start"], index["stop"], index["step"])
+        else:
+            frame_index = pd.Index(np.load(entry / "index.npy", mmap_mode="r"))
+
+        frame = pd.DataFrame(columns, index=frame_index, copy=False)
+        frame.columns = [column["name"] for column in manifest["columns"]]
+        return frame
+
+    def _read_column(self, entry: Path, i: int, column: Dict[str, Any]) -> Any:
+        if column["kind"] == "numeric":
+            return np.load(entry / f"{i}.npy", mmap_mode="r")
+
+        codes = np.load(entry / f"{i}.codes.npy", mmap_mode="r")
+        values = np.load(entry / f"{i}.values.npy").astype(object)
+        if column["kind"] == "category":
+            return pd.Categorical.from_codes(codes, categories=pd.Index(values, dtype=object))
+
+        # Mostly unique strings: plain object column, NaN where the code is -1
+        table = np.append(values, np.nan).astype(object)
+        return table[codes]
+
+    def _write(self, entry: Path, source: Path, frame: pd.DataFrame) -> None:
+        """Replace the cache entry for `source` with `frame`"""
+        tmp = entry.with_name(entry.name + ".tmp")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+
+        columns = []
+        for i, name in enumerate(frame.columns):
+            series = frame.iloc[:, i]
+            columns.append({"name": name, "kind": self._write_column(tmp, i, series)})
+
+        if isinstance(frame.index, pd.RangeIndex):
+            index = {
+                "kind": "range",
+                "start": frame.index.start,
+                "stop": frame.index.stop,
+                "step": frame.index.step
+            }
+        else:
+            np.save(tmp / "index.npy", frame.index.to_numpy())
+            index = {"kind": "array"}
+
+        self._write_manifest(tmp, {
+            "format_version": FORMAT_VERSION,
+            "source": {**self._source_state(source), "path": str(source), "sha256": file_sha256(source)},
+            "rows": len(frame),
+            "columns": columns,
+            "index": index
+        })
+
+        if entry.exists():
+            shutil.rmtree(entry)
+        os.replace(tmp, entry)
+
+    def _write_column(self, entry: Path, i: int, series: pd.Series) -> str:
+        """Write one column; returns its storage kind"""
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufcmM":
+            np.save(entry / f"{i}.npy", series.to_numpy())
+            return "numeric"
+        if series.dtype != object:
+            raise ValueError(f"column {series.name!r} has unsupported dtype {series.dtype}")
+
+        present = series.dropna()
+        if not all(isinstance(value, str) for value in present.unique()):
+            raise ValueError(f"column {series.name!r} mixes strings and other values")
+
+        codes, values = pd.factorize(series, use_na_sentinel=True)
+        dtype = np.int8 if len(values) < 2**7 else np.int16 if len(values) < 2**15 else np.int32
+        np.save(entry / f"{i}.codes.npy", codes.astype(dtype))
+        np.save(entry / f"{i}.values.npy", np.asarray(values, dtype=str))
+
+        # Categoricals only pay off when values repeat
+        return "category" if len(values) <= len(series) // 2 else "strings"
+
+    def _write_manifest(self, entry: Path, manifest: Dict[str, Any]) -> None:
+        (entry / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,278 @@
+"""
+Embedding Cache for Ubuzima Hub AI System
+Two-tier (in-memory LRU + on-disk) cache of embeddings keyed by (model, text)
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextlib.contextmanager
+def _exclusive_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on `path` across processes (blocks until free)"""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class EmbeddingCache:
+    """
+    Caches embedding vectors so repeated texts skip the model forward pass
+
+    Memory tier: bounded LRU of recently used vectors.
+    Disk tier: append-only float32 matrix (memory-mapped for reads) plus a
+    key file whose line number is the row of the vector in the matrix.
+
+    Several processes (API workers, index builds, the ingest pipeline) may
+    share the disk tier. Appends happen under an exclusive file lock, after
+    catching up with rows other processes appended, so key lines and vector
+    rows always stay aligned. Rows are never rewritten, so lock-free reads
+    of rows already known to this process are safe.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        model_name: str,
+        memory_size: int = 4096
+    ):
+        self.model_name = model_name
+        self.memory_size = memory_size
+
+        # One store per model so vectors of different sizes never mix
+        model_key = hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:12]
+        self.cache_dir = Path(cache_dir) / model_key
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._meta_path = self.cache_dir / "meta.json"
+        self._keys_path = self.cache_dir / "keys.txt"
+        self._vectors_path = self.cache_dir / "vectors.f32"
+        self._lock_path = self.cache_dir / "lock"
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._rows: Dict[str, int] = {}
+        # Rows and bytes of keys.txt read so far, and the file they were read from
+        self._row_count = 0
+        self._keys_offset = 0
+        self._keys_inode: Optional[int] = None
+        self._matrix: Optional[np.memmap] = None
+        self._dim: Optional[int] = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._load()
+
+    def _key(self, text: str) -> str:
+        """Cache key for a text under this cache's model"""
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _load(self) -> None:
+        """Open the on-disk tier if one exists"""
+        with _exclusive_lock(self._lock_path):
+            self._sync()
+
+    def _reset_rows(self) -> None:
+        self._rows = {}
+        self._row_count = 0
+        self._keys_offset = 0
+        self._keys_inode = None
+        self._matrix = None
+
+    def _sync(self) -> None:
+        """
+        Catch up with the disk tier (call with the file lock held)
+
+        Reads the key lines other processes appended since the last sync. A
+        write cut short by a crash (vectors without their keys, or a partial
+        key line) is trimmed first, so line N of keys.txt is always row N of
+        vectors.f32.
+        """
+        if not self._meta_path.exists():
+            self._reset_rows()
+            return
+        if self._dim is None:
+            self._dim = int(json.loads(self._meta_path.read_text())["dim"])
+
+        with open(self._keys_path, "a+b") as f:
+            inode = os.fstat(f.fileno()).st_ino
+            if inode != self._keys_inode:
+                # First sync, or the store was cleared and recreated by another process
+                self._reset_rows()
+                self._keys_inode = inode
+            f.seek(self._keys_offset)
+            data = f.read()
+            complete = data.rfind(b"\n") + 1
+            vector_rows = self._vectors_path.stat().st_size // (4 * self._dim) if self._vectors_path.exists() else 0
+
+            keep = max(0, min(data.count(b"\n", 0, complete), vector_rows - self._row_count))
+            lines = data[:complete].split(b"\n")[:keep]
+            complete = sum(len(line) + 1 for line in lines)
+            if complete != len(data):
+                f.truncate(self._keys_offset + complete)
+            if vector_rows != self._row_count + keep:
+                os.truncate(self._vectors_path, (self._row_count + keep) * 4 * self._dim)
+
+        if lines:
+            for line in lines:
+                self._rows[line.decode("utf-8")] = self._row_count
+                self._row_count += 1
+            self._keys_offset += complete
+            self._open_matrix()
+
+    def _open_matrix(self) -> None:
+        """(Re)map the vector file after it has grown"""
+        if not self._row_count:
+            self._matrix = None
+            return
+        self._matrix = np.memmap(
+            self._vectors_path,
+            dtype=np.float32,
+            mode="r",
+            shape=(self._row_count, self._dim)
+        )
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """Insert into the LRU tier, evicting the least recently used entry"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        """Find a vector in memory, then on disk"""
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return vector
+
+        row = self._rows.get(key)
+        if row is not None and self._matrix is not None:
+            vector = np.array(self._matrix[row])
+            self._remember(key, vector)
+            self.disk_hits += 1
+            return vector
+
+        self.misses += 1
+        return None
+
+    def _persist(self, keys: List[str], vectors: np.ndarray) -> None:
+        """Append new vectors to the disk tier (call with the file lock held, after `_sync`)"""
+        if self._dim is None:
+            self._dim = int(vectors.shape[1])
+            self._meta_path.write_text(json.dumps({"model": self.model_name, "dim": self._dim}))
+            self._sync()
+
+        # Vectors first: a crash in between leaves extra vectors, which `_sync` trims
+        with open(self._vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        lines = "".join(f"{key}\n" for key in keys).encode("utf-8")
+        with open(self._keys_path, "ab") as f:
+            f.write(lines)
+
+        for key in keys:
+            self._rows[key] = self._row_count
+            self._row_count += 1
+        self._keys_offset += len(lines)
+        self._open_matrix()
+
+    def encode(
+        self,
+        texts: List[str],
+        encode_fn: Callable[[List[str]], np.ndarray]
+    ) -> np.ndarray:
+        """
+        Return embeddings for `texts`, calling `encode_fn` only for cache misses
+
+        `encode_fn` receives the list of unique uncached texts and must return
+        a (len(texts), dim) array.
+        """
+        with self._lock:
+            keys = [self._key(text) for text in texts]
+            vectors: List[Optional[np.ndarray]] = [self._lookup(key) for key in keys]
+
+            # Deduplicate misses so each unique text is encoded once
+            missing: "OrderedDict[str, str]" = OrderedDict()
+            for key, text, vector in zip(keys, texts, vectors):
+                if vector is None and key not in missing:
+                    missing[key] = text
+
+        if missing:
+            encoded = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+
+            with self._lock:
+                new_keys = [key for key in missing if key not in self._rows]
+                if new_keys:
+                    with _exclusive_lock(self._lock_path):
+                        self._sync()
+                        # Another process may have stored some of them meanwhile
+                        new_keys = [key for key in new_keys if key not in self._rows]
+                        if new_keys:
+                            positions = {key: i for i, key in enumerate(missing)}
+                            self._persist(new_keys, encoded[[positions[key] for key in new_keys]])
+
+                fresh = {}
+                for key, vector in zip(missing, encoded):
+                    fresh[key] = vector
+                    self._remember(key, vector)
+
+            vectors = [fresh[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+
+        if not vectors:
+            return np.zeros((0, self._dim or 0), dtype=np.float32)
+        return np.vstack(vectors)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._row_count
+        }
+
+    def clear(self) -> None:
+        """Drop both tiers"""
+        with self._lock, _exclusive_lock(self._lock_path):
+            self._memory.clear()
+            self._reset_rows()
+            self._dim = None
+            for path in (self._meta_path, self._keys_path, self._vectors_path):
+                if path.exists():
+                    path.unlink()
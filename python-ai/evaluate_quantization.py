@@ -0,0 +1,137 @@
+"""
+Quantization Evaluation for Ubuzima Hub AI System
+Recall@k, scan memory and latency of int8 / binary codes against the float index
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from data_loader import NISRDataLoader
+from retrieval_backends import NumpyBackend
+from vector_indexer import VectorIndexer
+from test_chatbot import TEST_CASES
+
+
+def evaluation_queries(backend: NumpyBackend, limit: int) -> List[str]:
+    """In-scope test questions plus one question per nutrition indicator"""
+    queries = [case["query"] for case in TEST_CASES if case["expected_relevant"]]
+    indicators = sorted({
+        doc["metadata"]["indicator"]
+        for page in backend.iter_documents()
+        for doc in page
+        if doc["metadata"].get("indicator")
+    })
+    queries.extend(f"What is the {indicator} in Rwanda?" for indicator in indicators)
+    return queries[:limit]
+
+
+def recall_at(exact: List[Dict[str, Any]], approximate: List[Dict[str, Any]]) -> float:
+    """
+    Share of the quantized results that belong in the float top-k
+
+    A result counts when it is at least as close as the float index's k-th
+    result (rescored distances are exact), so documents tied at the cut-off
+    are interchangeable; the corpus has many rows with near-identical text.
+    """
+    if not exact:
+        return 1.0
+    cutoff = exact[-1]["distance"] + 1e-6
+    return sum(doc["distance"] <= cutoff for doc in approximate) / len(exact)
+
+
+def evaluate(
+    indexer: VectorIndexer,
+    queries: List[str],
+    k_values: List[int],
+    rescore_factor: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """One row per quantization: scan bytes, recall@k and median query latency"""
+    embeddings = indexer.embed(queries)
+    depth = max(k_values)
+
+    rows = []
+    exact_results = None
+    for quantization in ("none", "int8", "binary"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Codes are built in memory only: never write into the index being evaluated
+            backend = NumpyBackend(
+                str(indexer.db_path),
+                quantization=quantization,
+                rescore_factor=rescore_factor,
+                persist_codes=False
+            )
+        seconds = []
+        results = []
+        for embedding in embeddings:
+            started = time.perf_counter()
+            results.append(backend.query(embedding[None, :], n_results=depth)[0])
+            seconds.append(time.perf_counter() - started)
+        if exact_results is None:
+            exact_results = results
+
+        stats = backend.stats()
+        rows.append({
+            "quantization": quantization,
+            "rescore_factor": stats["rescore_factor"],
+            "scan_bytes": stats["scan_bytes"],
+            "compression": stats["vector_bytes"] / stats["scan_bytes"],
+            "recall": {
+                k: float(np.mean([recall_at(exact[:k], found[:k]) for exact, found in zip(exact_results, results)]))
+                for k in k_values
+            },
+            "median_ms": statistics.median(seconds) * 1000
+        })
+    return rows
+
+
+def print_report(rows: List[Dict[str, Any]], k_values: List[int], query_count: int) -> None:
+    print(f"\nRecall against the float32 index over {query_count} queries:\n")
+    header = f"{'quantization':<12} {'rescore':>7} {'scan MB':>8} {'smaller':>7} "
+    header += " ".join(f"{'R@' + str(k):>6}" for k in k_values) + f" {'median ms':>9}"
+    print(header)
+    for row in rows:
+        line = f"{row['quantization']:<12} {row['rescore_factor'] or '-':>7} {row['scan_bytes'] / 1e6:>8.2f} "
+        line += f"{row['compression']:>6.1f}x "
+        line += " ".join(f"{row['recall'][k]:>6.3f}" for k in k_values) + f" {row['median_ms']:>9.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate quantized vector storage against the float index")
+    parser.add_argument("--db-path", default="./vectordb", help="Folder of a built numpy index")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10], help="Recall cut-offs")
+    parser.add_argument("--max-queries", type=int, default=500)
+    parser.add_argument("--rescore-factor", type=int, default=None,
+                        help="Candidates per result to rescore (default: 4 for int8, 16 for binary)")
+    parser.add_argument("--hashing", action="store_true",
+                        help="Evaluate on a temporary index built with the offline hashing embedder")
+    parser.add_argument("--data-folder", default="../data", help="Datasets for --hashing")
+    args = parser.parse_args()
+
+    print("=== Evaluating Vector Quantization ===")
+    with tempfile.TemporaryDirectory(prefix="ubuzima-quant-") as workdir:
+        if args.hashing:
+            from offline_stubs import make_indexer
+
+            loader = NISRDataLoader(data_folder=args.data_folder)
+            loader.load_datasets()
+            indexer = make_indexer(workdir, "numpy", None)
+            with contextlib.redirect_stdout(io.StringIO()):
+                indexer.index_documents(loader.prepare_documents(), incremental=False)
+        else:
+            indexer = VectorIndexer(db_path=args.db_path, backend="numpy", quantization="none")
+
+        if indexer.backend.count() == 0:
+            print("✗ Error: the numpy index is empty, run python vector_indexer.py --backend numpy first")
+        else:
+            queries = evaluation_queries(indexer.backend, args.max_queries)
+            rows = evaluate(indexer, queries, args.k, args.rescore_factor)
+            print_report(rows, args.k, len(queries))
+        indexer.close()
@@ -0,0 +1,168 @@
+"""
+ONNX Export for Ubuzima Hub AI System
+Exports the SentenceTransformer to ONNX (optionally int8) and verifies it agrees with the original
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from onnx_encoder import CONFIG_FILE, OnnxEncoder
+from test_chatbot import TEST_CASES
+
+
+def encoder_config(model, model_name: str) -> Dict[str, Any]:
+    """Pooling, normalisation and input length of a SentenceTransformer, for OnnxEncoder"""
+    modules = {type(module).__name__: module for module in model}
+    pooling = modules.get("Pooling")
+    if pooling is not None and pooling.get_config_dict().get("pooling_mode_cls_token"):
+        mode = "cls"
+    elif pooling is None or pooling.get_config_dict().get("pooling_mode_mean_tokens"):
+        mode = "mean"
+    else:
+        raise ValueError("Only mean and CLS pooling can be exported")
+    return {
+        "model_name": model_name,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_length": model.max_seq_length,
+        "pooling": mode,
+        "normalize": "Normalize" in modules,
+        "pad_token": model.tokenizer.pad_token or "[PAD]"
+    }
+
+
+def export(model, output: Path, opset: int = 14) -> None:
+    """Write the transformer as model.onnx and its fast tokenizer as tokenizer.json"""
+    import torch
+
+    class TokenEmbeddings(torch.nn.Module):
+        """The transformer with a single output: the token embeddings"""
+
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, *inputs):
+            return self.auto_model(*inputs, return_dict=False)[0]
+
+    transformer = TokenEmbeddings(model[0].auto_model).eval()
+    tokenizer = model.tokenizer
+    sample = tokenizer(["What is the stunting rate in Rwanda?"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            str(output / "model.onnx"),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True
+        )
+    tokenizer.backend_tokenizer.save(str(output / "tokenizer.json"))
+
+
+def quantize(output: Path) -> None:
+    """Dynamic int8 quantization of the weights (model_quantized.onnx)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        str(output / "model.onnx"),
+        str(output / "model_quantized.onnx"),
+        weight_type=QuantType.QInt8
+    )
+
+
+def verification_texts(data_folder: str, limit: int) -> List[str]:
+    """Test questions plus a sample of NISR documents"""
+    from data_loader import NISRDataLoader
+
+    texts = [case["query"] for case in TEST_CASES]
+    loader = NISRDataLoader(data_folder=data_folder)
+    loader.load_datasets()
+    documents = loader.prepare_documents()
+    step = max(1, len(documents) // max(1, limit - len(texts)))
+    texts.extend(doc["text"] for doc in documents[::step])
+    return texts[:limit]
+
+
+def query_latency_ms(encoder, queries: List[str], repeat: int = 5) -> float:
+    """Median single-query encode time"""
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            encoder.encode([query])
+            timings.append(time.perf_counter() - started)
+    return float(np.median(timings) * 1000)
+
+
+def verify(model, output: Path, quantized: bool, texts: List[str], threshold: float) -> bool:
+    """Compare ONNX and SentenceTransformer embeddings; True if every cosine reaches `threshold`"""
+    started = time.perf_counter()
+    encoder = OnnxEncoder(str(output), quantized=quantized)
+    load_seconds = time.perf_counter() - started
+
+    expected = np.asarray(model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+    actual = encoder.encode(texts)
+    actual = actual / np.maximum(np.linalg.norm(actual, axis=1, keepdims=True), 1e-12)
+    cosines = np.sum(expected * actual, axis=1)
+
+    queries = [case["query"] for case in TEST_CASES]
+    torch_ms = query_latency_ms(model, queries)
+    onnx_ms = query_latency_ms(encoder, queries)
+
+    passed = bool(cosines.min() >= threshold)
+    print(f"\n{encoder.model_file}:")
+    print(f"  cosine vs original over {len(texts)} texts: min {cosines.min():.5f}, mean {cosines.mean():.5f}")
+    print(f"  query encode: {onnx_ms:.2f} ms (SentenceTransformer {torch_ms:.2f} ms, {torch_ms / onnx_ms:.1f}x)")
+    print(f"  load time: {load_seconds:.2f}s (no torch import)")
+    print(f"{'✓' if passed else '✗'} Agreement {'meets' if passed else 'is below'} the {threshold} threshold")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX for EMBEDDING_BACKEND=onnx")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--output", default=os.getenv("ONNX_MODEL_DIR", "./onnx_model"))
+    parser.add_argument("--quantize", action="store_true", help="Also write an int8 model_quantized.onnx")
+    parser.add_argument("--threshold", type=float, default=0.99,
+                        help="Minimum cosine similarity with the original model for every text")
+    parser.add_argument("--samples", type=int, default=500, help="Texts to verify on")
+    parser.add_argument("--data-folder", default=os.getenv("DATA_FOLDER", "../data"))
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+
+    print(f"=== Exporting {args.model} to ONNX ===")
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    model = SentenceTransformer(args.model, device="cpu")
+
+    export(model, output)
+    (output / CONFIG_FILE).write_text(json.dumps(encoder_config(model, args.model), indent=2))
+    print(f"✓ Wrote {output / 'model.onnx'}")
+    if args.quantize:
+        quantize(output)
+        print(f"✓ Wrote {output / 'model_quantized.onnx'}")
+
+    texts = verification_texts(args.data_folder, args.samples)
+    results = [verify(model, output, False, texts, args.threshold)]
+    if args.quantize:
+        results.append(verify(model, output, True, texts, args.threshold))
+
+    if not all(results):
+        print("\n✗ Do not deploy a model below the threshold (try without --quantize)")
+        sys.exit(1)
+    print(f"\n✓ Set EMBEDDING_BACKEND=onnx and ONNX_MODEL_DIR={output} to use it"
+          + (" (ONNX_QUANTIZED=true for the int8 model)" if args.quantize else ""))
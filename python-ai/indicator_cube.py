@@ -0,0 +1,227 @@
+"""
+Indicator Cube for Ubuzima Hub AI System
+Time series of the NISR nutrition indicators, precomputed as JSON for the /indicators API
+"""
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from data_loader import drop_hxl_rows
+from dataset_cache import file_sha256
+
+# Bump when the response layout changes so clients do not revalidate against old ETags
+CUBE_VERSION = 1
+
+SOURCE_NAME = "NISR Nutrition Indicators"
+
+COLUMNS = [
+    "GHO (CODE)", "GHO (DISPLAY)", "GHO (URL)", "YEAR (DISPLAY)", "DIMENSION (TYPE)",
+    "DIMENSION (NAME)", "Numeric", "Value", "Low", "High"
+]
+
+
+def _number(value: Any) -> Optional[float]:
+    """Float for a numeric cell, None when empty or not a number"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _text(value: Any) -> Optional[str]:
+    return None if pd.isna(value) or value == "" else str(value)
+
+
+def _json(payload: Dict[str, Any]) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _signature(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header names `etag` (weak comparison, as HTTP requires)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+class IndicatorCube:
+    """
+    Indicator x dimension type x dimension name x year cube of values
+
+    Built once from `nutrition_indicators_rwa.csv`. Every response body the
+    API can return (the catalogue, and each series by indicator, dimension
+    type and dimension name) is serialised up front, so a request is a dict
+    lookup. `etag` is derived from the SHA-256 of the CSV, so it changes
+    exactly when the data does.
+
+    Some indicators publish several estimates for the same year and
+    dimension (the table has no column telling them apart); all of them are
+    kept, in file order.
+    """
+
+    def __init__(self, nutrition_data: pd.DataFrame, data_hash: str, source_path: Optional[Path] = None):
+        self.data_hash = data_hash
+        self.etag = f'"v{CUBE_VERSION}-{data_hash[:32]}"'
+        self.source_path = source_path
+        self.signature = _signature(source_path) if source_path is not None else None
+
+        # code -> {"name", "url"}; (code, dimension type, dimension name) -> points
+        self.indicators: Dict[str, Dict[str, Any]] = {}
+        self.series: Dict[Tuple[str, Optional[str], Optional[str]], List[Dict[str, Any]]] = {}
+        self._build(nutrition_data)
+
+        # Pre-serialised bodies: catalogue, then (code, type, name) with None meaning "all"
+        self.catalog_body = _json(self._catalog())
+        self.series_bodies: Dict[Tuple[str, Optional[str], Optional[str]], bytes] = {}
+        for code in self.indicators:
+            self.series_bodies[(code, None, None)] = _json(self._series_payload(code, None, None))
+            for dim_type, names in self.dimensions(code).items():
+                self.series_bodies[(code, dim_type, None)] = _json(self._series_payload(code, dim_type, None))
+                for dim_name in names:
+                    self.series_bodies[(code, dim_type, dim_name)] = _json(
+                        self._series_payload(code, dim_type, dim_name)
+                    )
+
+    @classmethod
+    def from_csv(cls, path: str) -> "IndicatorCube":
+        """Cube for a nutrition indicators CSV"""
+        source = Path(path)
+        frame = drop_hxl_rows(pd.read_csv(source, dtype=str, keep_default_na=False))
+        return cls(frame, file_sha256(source), source)
+
+    def is_stale(self) -> bool:
+        """True if the source CSV changed (or vanished) since the cube was built"""
+        if self.source_path is None:
+            return False
+        try:
+            return _signature(self.source_path) != self.signature
+        except OSError:
+            return True
+
+    def _build(self, nutrition_data: pd.DataFrame) -> None:
+        frame = nutrition_data[COLUMNS].astype(object)
+        frame = frame.where(pd.notna(frame), None)
+
+        for code, name, url, year, dim_type, dim_name, numeric, value, low, high in frame.itertuples(index=False):
+            code, dim_type, dim_name = _text(code), _text(dim_type), _text(dim_name)
+            if code is None or code.startswith("#"):
+                continue
+            self.indicators.setdefault(code, {"name": _text(name), "url": _text(url)})
+            year = _text(year)
+            self.series.setdefault((code, dim_type, dim_name), []).append({
+                "year": int(year) if year is not None and year.isdigit() else year,
+                "value": _number(numeric),
+                "low": _number(low),
+                "high": _number(high),
+                "display": _text(value)
+            })
+
+        for points in self.series.values():
+            points.sort(key=lambda point: str(point["year"]))
+
+        # code -> dimension type -> names, both sorted (missing dimensions first)
+        self._dimensions: Dict[str, Dict[Optional[str], List[Optional[str]]]] = {}
+        for code, dim_type, dim_name in sorted(self.series, key=lambda key: (key[0], key[1] or "", key[2] or "")):
+            self._dimensions.setdefault(code, {}).setdefault(dim_type, []).append(dim_name)
+
+    def dimensions(self, code: str) -> Dict[Optional[str], List[Optional[str]]]:
+        """Dimension type -> names published for an indicator"""
+        return self._dimensions.get(code, {})
+
+    def _catalog(self) -> Dict[str, Any]:
+        indicators = []
+        for code in sorted(self.indicators):
+            years = sorted({
+                point["year"]
+                for dim_type, names in self.dimensions(code).items()
+                for dim_name in names
+                for point in self.series[(code, dim_type, dim_name)]
+            }, key=str)
+            indicators.append({
+                "code": code,
+                **self.indicators[code],
+                "first_year": years[0] if years else None,
+                "last_year": years[-1] if years else None,
+                "dimensions": [
+                    {"type": dim_type, "names": names} for dim_type, names in self.dimensions(code).items()
+                ]
+            })
+        return {"source": SOURCE_NAME, "version": self.etag.strip('"'), "indicators": indicators}
+
+    def _series_payload(self, code: str, dim_type: Optional[str], dim_name: Optional[str]) -> Dict[str, Any]:
+        series = [
+            {"dimension_type": key_type, "dimension_name": key_name, "points": self.series[(code, key_type, key_name)]}
+            for key_type, names in self.dimensions(code).items()
+            for key_name in names
+            if (dim_type is None or key_type == dim_type) and (dim_name is None or key_name == dim_name)
+        ]
+        return {
+            "code": code,
+            "indicator": self.indicators[code]["name"],
+            "source": SOURCE_NAME,
+            "version": self.etag.strip('"'),
+            "dimension": dim_type,
+            "series": series
+        }
+
+    def series_body(self, code: str, dimension: Optional[str] = None, name: Optional[str] = None) -> bytes:
+        """
+        JSON time series of one indicator
+
+        Args:
+            code: GHO code, case-insensitive (e.g. NUTSTUNTINGPREV)
+            dimension: Only this dimension type (e.g. SEX), case-insensitive
+            name: Only this dimension name (e.g. Female); requires `dimension`
+
+        Raises:
+            KeyError: with a message naming what is unknown
+            ValueError: if `name` is given without `dimension`
+        """
+        code = code.upper()
+        if code not in self.indicators:
+            raise KeyError(f"Unknown indicator '{code}'")
+        dim_type = dimension.upper() if dimension else None
+        if name and dim_type is None:
+            raise ValueError("'name' needs a 'dimension'")
+
+        available = self.dimensions(code)
+        if dim_type is not None and dim_type not in available:
+            types = ", ".join(str(key) for key in available if key is not None)
+            raise KeyError(f"Indicator '{code}' has no dimension '{dim_type}'. Available: {types}")
+        if name:
+            names = {str(key).lower(): key for key in available[dim_type]}
+            if name.lower() not in names:
+                raise KeyError(f"Dimension '{dim_type}' of '{code}' has no '{name}'")
+            name = names[name.lower()]
+        return self.series_bodies[(code, dim_type, name or None)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "indicators": len(self.indicators),
+            "series": len(self.series),
+            "points": sum(len(points) for points in self.series.values()),
+            "bodies": len(self.series_bodies) + 1,
+            "body_bytes": len(self.catalog_body) + sum(len(body) for body in self.series_bodies.values()),
+            "etag": self.etag
+        }
+
+
+def default_cube_path() -> str:
+    return os.path.join(os.getenv("DATA_FOLDER", "../data"), "nutrition_indicators_rwa.csv")
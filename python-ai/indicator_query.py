@@ -0,0 +1,351 @@
+"""
+Indicator Query Engine for Ubuzima Hub AI System
+Answers numeric lookups directly from the NISR nutrition indicators table
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+
+NUMBER = r"\b(?:how many|number|numbers|count|thousands|millions)\b"
+SURVEY = r"\bsurvey"
+ADULT = r"\badults?\b|\bbmi\b"
+WOMEN = r"\bwom[ae]n\b|\bmothers?\b|\breproductive\b"
+CHILD = r"\bchild(?:ren)?\b|\badolescents?\b|\bkids?\b"
+
+# (indicator pattern, [(qualifier patterns, GHO code), ...]) in preference order.
+# A code is a candidate when all of its qualifier patterns match the question.
+INDICATOR_PATTERNS: List[Tuple[str, List[Tuple[Tuple[str, ...], str]]]] = [
+    (r"\bsevere(?:ly)?\s+wast(?:ing|ed)\b", [
+        ((), "NUTRITION_WH_3")
+    ]),
+    (r"(?<!severe )(?<!severely )\bwast(?:ing|ed)\b", [
+        ((NUMBER,), "NUTWASTINGNUM"),
+        ((), "NUTRITION_WH_2")
+    ]),
+    (r"\bstunt(?:ing|ed)\b", [
+        ((NUMBER,), "NUTSTUNTINGNUM"),
+        ((SURVEY,), "NUTRITION_ANT_HAZ_NE2"),
+        ((), "NUTSTUNTINGPREV"),
+        ((), "NUTRITION_ANT_HAZ_NE2")
+    ]),
+    (r"\bunderweight\b", [
+        ((ADULT,), "NCD_BMI_18A"),
+        ((), "NUTRITION_WA_2")
+    ]),
+    (r"\bthinness\b", [
+        ((), "NCD_BMI_MINUS2C")
+    ]),
+    (r"\bobes(?:e|ity)\b", [
+        ((CHILD,), "NCD_BMI_PLUS2C"),
+        ((), "NCD_BMI_30A")
+    ]),
+    (r"\boverweight\b", [
+        ((NUMBER,), "NUTOVERWEIGHTNUM"),
+        ((ADULT,), "NCD_BMI_25A"),
+        ((r"\badolescents?\b",), "NCD_BMI_PLUS1C"),
+        ((), "NUTRITION_ANT_WHZ_NE2")
+    ]),
+    (r"\ban(?:a)?emi(?:a|c)\b", [
+        ((WOMEN, NUMBER), "NUTRITION_ANAEMIA_REPRODUCTIVEAGE_NUM"),
+        ((WOMEN,), "NUTRITION_ANAEMIA_REPRODUCTIVEAGE_PREV"),
+        ((NUMBER,), "NUTRITION_ANAEMIA_CHILDREN_NUM"),
+        ((), "NUTRITION_ANAEMIA_CHILDREN_PREV")
+    ]),
+    (r"\bexclusive(?:ly)?\s+breast\s?(?:feeding|fed)\b", [
+        ((r"\b(?:two|2|first) days\b",), "NUT_BF_EBF2D"),
+        ((), "NUT_BF_EBF")
+    ]),
+    (r"\bearly initiation\b", [((), "NUT_BF_EIBF")]),
+    (r"\bever breast\s?fed\b", [((), "NUT_BF_EVBF")]),
+    (r"\bcontinued breast\s?feeding\b", [((), "NUT_BF_CBF")]),
+    (r"\bdietary diversity\b", [((), "NUT_CF_MDD")]),
+    (r"\bmeal frequency\b", [((), "NUT_CF_MMF")]),
+    (r"\bacceptable diet\b", [((), "NUT_CF_MAD")]),
+    (r"\begg\b|\bflesh foods?\b", [((), "NUT_CF_EFF")]),
+    (r"\bzero (?:vegetable|fruit)", [((), "NUT_CF_ZVF")]),
+    (r"\bsolid,? (?:semi-solid )?(?:or soft )?foods?\b", [((), "NUT_CF_ISSSF")]),
+    (r"\blow birth\s?weight\b", [
+        ((NUMBER,), "LBW_NUMBER"),
+        ((), "LBW_PREVALENCE")
+    ]),
+    (r"\bpre-?term birth", [
+        ((NUMBER,), "PRETERMBIRTH_NUMBER"),
+        ((), "PRETERMBIRTH_RATE")
+    ])
+]
+
+# Dimension phrases -> (DIMENSION (TYPE), DIMENSION (NAME))
+DIMENSION_PATTERNS: List[Tuple[str, Tuple[str, str]]] = [
+    (r"\bboth sexes\b", ("SEX", "Both sexes")),
+    (r"\b(?:females?|girls?|wom[ae]n)\b", ("SEX", "Female")),
+    (r"\b(?:males?|boys?|men)\b", ("SEX", "Male")),
+    (r"\burban\b", ("RESIDENCEAREATYPE", "Urban")),
+    (r"\brural\b", ("RESIDENCEAREATYPE", "Rural")),
+    (r"\bpoorest\b|\bq1\b", ("WEALTHQUINTILE", "Q1 (Poorest)")),
+    (r"\bq2\b", ("WEALTHQUINTILE", "Q2")),
+    (r"\bq3\b", ("WEALTHQUINTILE", "Q3")),
+    (r"\bq4\b", ("WEALTHQUINTILE", "Q4")),
+    (r"\brichest\b|\bwealthiest\b|\bq5\b", ("WEALTHQUINTILE", "Q5 (Richest)")),
+    (r"\bno(?:ne)? (?:and primary )?education\b", ("EDUCATIONLEVEL", "None and primary education")),
+    (r"\bsecondary or higher\b", ("EDUCATIONLEVEL", "Secondary or higher")),
+    (r"\bhigher education\b|\buniversity\b", ("EDUCATIONLEVEL", "Higher education")),
+    (r"\bsecondary(?! or higher)\b", ("EDUCATIONLEVEL", "Secondary education")),
+    (r"(?<!none and )\bprimary\b", ("EDUCATIONLEVEL", "Primary")),
+    (r"\bmild\b", ("SEVERITY", "Mild")),
+    (r"\bmoderate\b", ("SEVERITY", "Moderate")),
+    (r"\bsevere\b", ("SEVERITY", "Severe"))
+]
+
+AGE_GROUP_PATTERN = r"\b(\d{1,2})\s*(?:-|–|to)\s*(\d{1,2})\s*months?\b"
+
+# Dimensions used when the question does not name one, in preference order
+DEFAULT_DIMENSIONS: List[Tuple[Optional[str], Optional[str]]] = [
+    (None, None),
+    ("SEX", "Both sexes"),
+    ("AGEGROUP", "Total (All ages)"),
+    ("RESIDENCEAREATYPE", "Total")
+]
+
+YEAR_PATTERN = r"\b(19[5-9]\d|20\d{2})\b"
+RANGE_PATTERN = r"\bbetween\b|\bfrom\b|\bsince\b|\b(?:19|20)\d{2}\s*(?:-|–|to)\s*(?:19|20)\d{2}\b"
+SERIES_PATTERN = (
+    r"\b(?:trends?|over time|over the years|time series|evolution|evolved|changed?|"
+    r"history|historical|each year|by year|per year|annual|over the (?:last|past))\b"
+)
+# Questions asking for explanation or advice need the LLM
+EXPLAIN_PATTERN = (
+    r"\b(?:why|causes?|caused|reasons?|explain|how (?:to|can|do|does|should|could)|"
+    r"reduce|improve|compare|comparison|versus|vs|policy|policies|recommend\w*|interventions?|"
+    r"impact|effects?|should)\b"
+)
+
+
+class IndicatorQueryEngine:
+    """Exact lookups, ranges and time series over the nutrition indicators table"""
+
+    def __init__(self, nutrition_data: pd.DataFrame, source_name: str = "NISR Nutrition Indicators"):
+        self.source_name = source_name
+
+        # (code, year, dimension type, dimension name) -> matching rows
+        self.index: Dict[Tuple[str, str, Optional[str], Optional[str]], List[Dict[str, Any]]] = {}
+        # code -> indicator name / available dimensions / years per dimension
+        self.indicator_names: Dict[str, str] = {}
+        self.dimensions: Dict[str, set] = {}
+        self.years: Dict[Tuple[str, Optional[str], Optional[str]], set] = {}
+
+        self._build_index(nutrition_data)
+
+        self._indicator_patterns = [
+            (re.compile(pattern), [(tuple(re.compile(q) for q in qualifiers), code) for qualifiers, code in candidates])
+            for pattern, candidates in INDICATOR_PATTERNS
+        ]
+        self._code_pattern = re.compile(
+            r"\b(" + "|".join(sorted((re.escape(code) for code in self.indicator_names), key=len, reverse=True)) + r")\b",
+            re.IGNORECASE
+        ) if self.indicator_names else None
+        self._dimension_patterns = [(re.compile(pattern), dimension) for pattern, dimension in DIMENSION_PATTERNS]
+        self._age_group_pattern = re.compile(AGE_GROUP_PATTERN)
+        self._year_pattern = re.compile(YEAR_PATTERN)
+        self._range_pattern = re.compile(RANGE_PATTERN)
+        self._series_pattern = re.compile(SERIES_PATTERN)
+        self._since_pattern = re.compile(r"\bsince\b|\bfrom\b")
+        self._explain_pattern = re.compile(EXPLAIN_PATTERN)
+
+    def _build_index(self, nutrition_data: pd.DataFrame) -> None:
+        """Precompute the (code, year, dimension type, dimension name) index"""
+        columns = [
+            "GHO (CODE)", "GHO (DISPLAY)", "YEAR (DISPLAY)", "DIMENSION (TYPE)",
+            "DIMENSION (NAME)", "Numeric", "Value", "Low", "High"
+        ]
+        frame = nutrition_data[columns].astype(object)
+        # Skip the HXL hashtag row ("#indicator+code", ...)
+        frame = frame[~frame["GHO (CODE)"].astype(str).str.startswith("#")]
+        frame = frame.where(pd.notna(frame), None)
+
+        for code, name, year, dim_type, dim_name, numeric, value, low, high in frame.itertuples(index=False):
+            code, year = str(code), str(year)
+            record = {
+                "code": code,
+                "indicator": name,
+                "year": year,
+                "dimension_type": dim_type,
+                "dimension_name": dim_name,
+                "numeric": numeric,
+                "value": value,
+                "low": low,
+                "high": high
+            }
+            self.index.setdefault((code, year, dim_type, dim_name), []).append(record)
+            self.indicator_names.setdefault(code, name)
+            self.dimensions.setdefault(code, set()).add((dim_type, dim_name))
+            self.years.setdefault((code, dim_type, dim_name), set()).add(year)
+
+    def _match_indicator(self, query_lower: str) -> Tuple[List[str], str]:
+        """Candidate codes for the single indicator a question is about"""
+        if self._code_pattern is not None:
+            codes = {match.upper() for match in self._code_pattern.findall(query_lower)}
+            if len(codes) == 1:
+                code = codes.pop()
+                return [code], self._code_pattern.sub(" ", query_lower)
+
+        matched = [
+            (pattern, candidates) for pattern, candidates in self._indicator_patterns
+            if pattern.search(query_lower)
+        ]
+        if len(matched) != 1:
+            return [], query_lower
+
+        pattern, candidates = matched[0]
+        codes = [
+            code for qualifiers, code in candidates
+            if code in self.indicator_names and all(q.search(query_lower) for q in qualifiers)
+        ]
+        # The indicator phrase itself must not be read as a dimension ("severe wasting")
+        return codes, pattern.sub(" ", query_lower)
+
+    def _match_dimensions(self, text: str) -> List[Tuple[str, str]]:
+        """Dimension (type, name) pairs named in the question"""
+        found = []
+        for pattern, dimension in self._dimension_patterns:
+            if pattern.search(text) and dimension not in found:
+                found.append(dimension)
+        for start, end in self._age_group_pattern.findall(text):
+            found.append(("AGEGROUP", f"{int(start)} to {int(end)} months"))
+        return found
+
+    def _match_years(self, query_lower: str) -> Tuple[str, List[int]]:
+        """Query mode ("exact", "latest", "range", "years", "series") and the years named"""
+        years = sorted({int(year) for year in self._year_pattern.findall(query_lower)})
+        wants_range = self._range_pattern.search(query_lower) is not None
+        wants_series = self._series_pattern.search(query_lower) is not None
+
+        if not years:
+            return ("series" if wants_series else "latest"), []
+        if len(years) == 1:
+            if self._since_pattern.search(query_lower) or wants_series:
+                return "range", [years[0], 9999]
+            return "exact", years
+        if len(years) == 2 and (wants_range or wants_series):
+            return "range", years
+        return "years", years
+
+    def _resolve_dimension(
+        self,
+        code: str,
+        requested: List[Tuple[str, str]]
+    ) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """Dimension to report for `code`, or None if the request cannot be met"""
+        available = self.dimensions.get(code, set())
+        if requested:
+            if len(requested) != 1 or requested[0] not in available:
+                return None
+            return requested[0]
+        for dimension in DEFAULT_DIMENSIONS:
+            if dimension in available:
+                return dimension
+        # Indicators published for a single population (e.g. women 15-49 only)
+        if len(available) == 1:
+            return next(iter(available))
+        return None
+
+    def _lookup(self, code: str, year: str, dimension: Tuple[Optional[str], Optional[str]]) -> Optional[Dict[str, Any]]:
+        """The unique row for a key, or None when missing or ambiguous"""
+        rows = self.index.get((code, year, dimension[0], dimension[1]), [])
+        values = {row["value"] for row in rows}
+        if len(values) != 1:
+            return None
+        return rows[0]
+
+    def parse(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Map a question onto the index
+
+        Returns:
+            Dict with keys code, dimension, mode, years; or None when the
+            question is not a plain numeric lookup this engine can answer
+        """
+        query_lower = query.lower()
+        if self._explain_pattern.search(query_lower):
+            return None
+
+        codes, remainder = self._match_indicator(query_lower)
+        if not codes:
+            return None
+
+        mode, years = self._match_years(query_lower)
+        requested = self._match_dimensions(self._year_pattern.sub(" ", remainder))
+
+        for code in codes:
+            dimension = self._resolve_dimension(code, requested)
+            if dimension is not None:
+                return {"code": code, "dimension": dimension, "mode": mode, "years": years}
+        return None
+
+    def _format_value(self, row: Dict[str, Any]) -> str:
+        """Value with its uncertainty range when available"""
+        text = str(row["numeric"] if row["numeric"] is not None else row["value"])
+        if row["low"] is not None and row["high"] is not None:
+            text += f" (Range: {row['low']}-{row['high']})"
+        return text
+
+    def answer(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Answer a numeric lookup without the LLM
+
+        Returns:
+            Chat response dict (same shape as NISRAIChatbot.chat), or None
+            to fall back to retrieval-augmented generation
+        """
+        parsed = self.parse(query)
+        if parsed is None:
+            return None
+
+        code, dimension, mode, years = parsed["code"], parsed["dimension"], parsed["mode"], parsed["years"]
+        available_years = sorted(self.years.get((code, dimension[0], dimension[1]), set()), key=int)
+        if not available_years:
+            return None
+
+        if mode == "exact":
+            selected = [str(years[0])]
+        elif mode == "latest":
+            selected = [available_years[-1]]
+        elif mode == "range":
+            selected = [year for year in available_years if years[0] <= int(year) <= years[1]]
+        elif mode == "years":
+            selected = [str(year) for year in years]
+        else:
+            selected = available_years
+
+        rows = [self._lookup(code, year, dimension) for year in selected]
+        if not rows or any(row is None for row in rows):
+            return None
+
+        indicator = self.indicator_names[code]
+        population = f" ({dimension[1]})" if dimension[1] and dimension[1] not in ("Both sexes", "Total") else ""
+
+        if len(rows) == 1:
+            row = rows[0]
+            latest_note = " (latest available year)" if mode == "latest" else ""
+            answer = (
+                f"According to NISR data, {indicator} in Rwanda{population} was "
+                f"{self._format_value(row)} in {row['year']}{latest_note}."
+            )
+        else:
+            lines = [f"- {row['year']}: {self._format_value(row)}" for row in rows]
+            answer = f"According to NISR data, {indicator} in Rwanda{population}:\n" + "\n".join(lines)
+        answer += f"\n\nSource: {self.source_name} ({code})"
+
+        return {
+            "answer": answer,
+            "sources": [
+                {"source": self.source_name, "year": row["year"], "type": "nutrition_data"}
+                for row in rows
+            ],
+            "context_used": True,
+            "is_relevant": True,
+            "retrieved_docs": len(rows),
+            "answered_by": "indicator_engine"
+        }
@@ -0,0 +1,415 @@
+"""
+Streaming Ingest Pipeline for Ubuzima Hub AI System
+Chunked CSV/XLSX -> documents -> embeddings -> vector index with bounded memory
+"""
+
+import argparse
+import json
+import os
+import queue
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from data_loader import NISRDataLoader, drop_hxl_rows
+from vector_indexer import VectorIndexer, compute_document_hash
+
+
+class IngestSource:
+    """One dataset file and how to turn a block of its rows into documents"""
+
+    def __init__(
+        self,
+        name: str,
+        stem: str,
+        prefix: str,
+        dtypes: Dict[str, Any],
+        build: Callable[[NISRDataLoader, pd.DataFrame], List[Dict[str, Any]]]
+    ):
+        self.name = name
+        self.stem = stem
+        self.prefix = prefix
+        self.dtypes = dtypes
+        self.build = build
+
+    def find(self, data_folder: Path) -> Optional[Path]:
+        """The CSV (preferred) or XLSX file for this source, if present"""
+        for suffix in (".csv", ".xlsx"):
+            path = data_folder / f"{self.stem}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+
+# Only the columns documents are built from are read, with fixed dtypes so
+# every chunk parses the same way regardless of what it contains
+SOURCES = [
+    IngestSource(
+        name="nutrition",
+        stem="nutrition_indicators_rwa",
+        prefix="nutrition",
+        dtypes={
+            column: str for column in (
+                "GHO (CODE)", "GHO (DISPLAY)", "YEAR (DISPLAY)", "Value",
+                "DIMENSION (TYPE)", "DIMENSION (NAME)", "Low", "High"
+            )
+        },
+        build=NISRDataLoader.nutrition_documents
+    ),
+    IngestSource(
+        name="surveys",
+        stem="search-10-09-25-050154",
+        prefix="survey",
+        dtypes={
+            "titl": str,
+            "authenty": str,
+            "data_coll_start": "Int64",
+            "data_coll_end": "Int64"
+        },
+        build=NISRDataLoader.survey_documents
+    )
+]
+
+_DONE = object()
+
+
+def read_chunks(path: Path, dtypes: Dict[str, Any], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Read the `dtypes` columns of a CSV or XLSX file `chunk_rows` rows at a time"""
+    if path.suffix == ".xlsx":
+        yield from _read_xlsx_chunks(path, dtypes, chunk_rows)
+        return
+
+    reader = pd.read_csv(
+        path,
+        usecols=lambda column: column in dtypes,
+        dtype=dtypes,
+        chunksize=chunk_rows,
+        encoding="utf-8-sig"
+    )
+    with reader:
+        yield from reader
+
+
+def _read_xlsx_chunks(path: Path, dtypes: Dict[str, Any], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Stream rows of the first worksheet without loading the workbook"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("Streaming XLSX files requires openpyxl: pip install openpyxl")
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(cell) if cell is not None else "" for cell in next(rows, ())]
+        wanted = [i for i, column in enumerate(header) if column in dtypes]
+
+        def frame(block: List[tuple]) -> pd.DataFrame:
+            data = pd.DataFrame(
+                [[row[i] if i < len(row) else None for i in wanted] for row in block],
+                columns=[header[i] for i in wanted]
+            )
+            for column in data.columns:
+                if dtypes[column] is str:
+                    data[column] = data[column].map(lambda cell: cell if cell is None else str(cell))
+                else:
+                    data[column] = pd.to_numeric(data[column], errors="coerce").astype(dtypes[column])
+            return data
+
+        block = []
+        for row in rows:
+            block.append(row)
+            if len(block) == chunk_rows:
+                yield frame(block)
+                block = []
+        if block:
+            yield frame(block)
+    finally:
+        workbook.close()
+
+
+class IngestPipeline:
+    """
+    Streams dataset files into the vector index
+
+    Three stages run concurrently, connected by bounded queues:
+
+        read + prepare  ->  hash check + embed  ->  upsert + checkpoint
+
+    At most `queue_depth` batches wait between stages, so memory is bounded
+    by the chunk and batch sizes rather than by the size of the files.
+    Progress is checkpointed after every chunk; an interrupted run resumes
+    from the last committed chunk of each file.
+    """
+
+    def __init__(
+        self,
+        indexer: VectorIndexer,
+        data_folder: str = "../data",
+        chunk_rows: int = 5000,
+        batch_size: int = 256,
+        queue_depth: int = 4,
+        checkpoint_path: Optional[str] = None,
+        sources: Optional[List[IngestSource]] = None
+    ):
+        self.indexer = indexer
+        self.data_folder = Path(data_folder)
+        self.chunk_rows = chunk_rows
+        self.batch_size = batch_size
+        self.queue_depth = queue_depth
+        self.checkpoint_path = Path(checkpoint_path or self.indexer.db_path / "ingest_checkpoint.json")
+        self.sources = sources or SOURCES
+        self.loader = NISRDataLoader(data_folder=str(self.data_folder))
+
+    # Checkpoint
+
+    def _fingerprint(self, path: Path) -> Dict[str, Any]:
+        stat = path.stat()
+        return {"path": str(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def _load_checkpoint(self, files: Dict[str, Path]) -> Dict[str, Any]:
+        """Progress of an interrupted run, dropping files that changed since"""
+        progress = {}
+        if self.checkpoint_path.exists():
+            stored = json.loads(self.checkpoint_path.read_text())
+            for name, path in files.items():
+                entry = stored.get(name)
+                if entry and entry["file"] == self._fingerprint(path):
+                    progress[name] = entry
+        return progress
+
+    def _save_checkpoint(self, progress: Dict[str, Any]) -> None:
+        tmp = self.checkpoint_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(progress, indent=2))
+        os.replace(tmp, self.checkpoint_path)
+
+    # Stages
+
+    def _put(self, out: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        """Blocking put that gives up once the pipeline is stopping"""
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, inbox: queue.Queue, stop: threading.Event) -> Any:
+        """Blocking get that gives up (returns _DONE) once the pipeline is stopping"""
+        while not stop.is_set():
+            try:
+                return inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _read_stage(
+        self,
+        files: Dict[str, Path],
+        progress: Dict[str, Any],
+        out: queue.Queue,
+        stop: threading.Event
+    ) -> None:
+        """Read chunks, build documents, emit fixed-size batches"""
+        try:
+            for source in self.sources:
+                if source.name not in files:
+                    continue
+                skip_rows = progress[source.name]["rows"]
+                position = 0
+
+                for frame in read_chunks(files[source.name], source.dtypes, self.chunk_rows):
+                    # Row labels are positions in the file, so ids match a full load
+                    frame.index = pd.RangeIndex(position, position + len(frame))
+                    position += len(frame)
+                    if position <= skip_rows:
+                        continue
+                    dropped = None
+                    if frame.index[0] == 0:
+                        kept = drop_hxl_rows(frame)
+                        dropped = [int(row) for row in frame.index.difference(kept.index)]
+                        frame = kept
+
+                    documents = source.build(self.loader, frame)
+                    for start in range(0, max(len(documents), 1), self.batch_size):
+                        last = start + self.batch_size >= len(documents)
+                        batch = {
+                            "source": source.name,
+                            "documents": documents[start:start + self.batch_size],
+                            # Checkpoint once the final batch of the chunk is written
+                            "rows": position if last else None
+                        }
+                        if dropped is not None:
+                            batch["dropped"], dropped = dropped, None
+                        if not self._put(out, batch, stop):
+                            return
+            self._put(out, _DONE, stop)
+        except BaseException as e:
+            self._put(out, e, stop)
+
+    def _embed_stage(self, inbox: queue.Queue, out: queue.Queue, stop: threading.Event) -> None:
+        """Skip unchanged documents, embed the rest"""
+        try:
+            while True:
+                batch = self._get(inbox, stop)
+                if batch is _DONE or isinstance(batch, BaseException):
+                    self._put(out, batch, stop)
+                    return
+
+                documents = batch["documents"]
+                existing = self.indexer.backend.get_hashes([doc["id"] for doc in documents]) if documents else {}
+                changed = []
+                updated = 0
+                for doc in documents:
+                    content_hash = compute_document_hash(doc, self.indexer.embedding_model_name)
+                    previous = existing.get(doc["id"])
+                    if previous == content_hash:
+                        continue
+                    updated += previous is not None
+                    changed.append({
+                        "id": doc["id"],
+                        "text": doc["text"],
+                        "metadata": {**doc["metadata"], "content_hash": content_hash}
+                    })
+
+                batch["changed"] = changed
+                batch["counts"] = {
+                    "added": len(changed) - updated,
+                    "updated": updated,
+                    "unchanged": len(documents) - len(changed)
+                }
+                batch["embeddings"] = self.indexer.embed_documents([doc["text"] for doc in changed]) if changed else None
+                del batch["documents"]
+                if not self._put(out, batch, stop):
+                    return
+        except BaseException as e:
+            self._put(out, e, stop)
+
+    def _remove_stale(self, files: Dict[str, Path], progress: Dict[str, Any]) -> int:
+        """Delete indexed documents that no longer exist in any source file"""
+        valid = {}
+        for source in self.sources:
+            if source.name in files:
+                # After a complete run "rows" is the number of rows in the file
+                entry = progress[source.name]
+                valid[source.prefix] = (entry["rows"], set(entry["dropped"]))
+
+        pattern = re.compile(r"^(.*)_(\d+)$")
+        stale = []
+        for doc_id in self.indexer.backend.get_hashes():
+            match = pattern.match(doc_id)
+            if match and match.group(1) in valid:
+                total_rows, dropped = valid[match.group(1)]
+                row = int(match.group(2))
+                if row < total_rows and row not in dropped:
+                    continue
+            stale.append(doc_id)
+
+        for i in range(0, len(stale), 100):
+            self.indexer.backend.delete(ids=stale[i:i + 100])
+        return len(stale)
+
+    def run(self, resume: bool = True) -> Dict[str, int]:
+        """
+        Ingest every source file into the index
+
+        Returns:
+            Dict with counts: added, updated, removed, unchanged
+        """
+        files = {}
+        for source in self.sources:
+            path = source.find(self.data_folder)
+            if path is None:
+                print(f"✗ Warning: no CSV or XLSX file for {source.stem} in {self.data_folder}")
+            else:
+                files[source.name] = path
+
+        progress = self._load_checkpoint(files) if resume else {}
+        for name, path in files.items():
+            if name in progress and progress[name]["rows"]:
+                print(f"Resuming {path.name} after row {progress[name]['rows']}")
+            progress.setdefault(name, {"file": self._fingerprint(path), "rows": 0, "dropped": []})
+
+        summary = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        prepared = queue.Queue(maxsize=self.queue_depth)
+        embedded = queue.Queue(maxsize=self.queue_depth)
+        stop = threading.Event()
+        stages = [
+            threading.Thread(target=self._read_stage, args=(files, progress, prepared, stop), daemon=True),
+            threading.Thread(target=self._embed_stage, args=(prepared, embedded, stop), daemon=True)
+        ]
+        for stage in stages:
+            stage.start()
+
+        try:
+            while True:
+                batch = self._get(embedded, stop)
+                if batch is _DONE:
+                    break
+                if isinstance(batch, BaseException):
+                    raise batch
+                if "dropped" in batch:
+                    progress[batch["source"]]["dropped"] = batch["dropped"]
+
+                changed = batch["changed"]
+                if changed:
+                    self.indexer.backend.upsert(
+                        ids=[doc["id"] for doc in changed],
+                        embeddings=batch["embeddings"],
+                        texts=[doc["text"] for doc in changed],
+                        metadatas=[doc["metadata"] for doc in changed]
+                    )
+                for key, count in batch["counts"].items():
+                    summary[key] += count
+
+                if batch["rows"] is not None:
+                    self.indexer.backend.commit()
+                    progress[batch["source"]]["rows"] = batch["rows"]
+                    self._save_checkpoint(progress)
+                    print(f"✓ {batch['source']}: {batch['rows']} rows ingested")
+        finally:
+            stop.set()
+            for stage in stages:
+                stage.join()
+
+        summary["removed"] = self._remove_stale(files, progress)
+        self.indexer.backend.commit()
+        if summary["added"] or summary["updated"] or summary["removed"]:
+            self.indexer.bump_index_version()
+        if not self.indexer.lexical_index.matches(self.indexer.index_version):
+            self.indexer.rebuild_lexical_index()
+
+        # Finished cleanly: the next run starts from the top again
+        if self.checkpoint_path.exists():
+            self.checkpoint_path.unlink()
+
+        print(
+            f"✓ Ingest complete: {summary['added']} added, {summary['updated']} updated, "
+            f"{summary['removed']} removed, {summary['unchanged']} unchanged"
+        )
+        return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream NISR datasets into the vector index")
+    parser.add_argument("--data-folder", default=os.getenv("DATA_FOLDER", "../data"))
+    parser.add_argument("--chunk-rows", type=int, default=5000, help="Rows read from a file at a time")
+    parser.add_argument("--batch-size", type=int, default=256, help="Documents embedded and upserted at a time")
+    parser.add_argument("--queue-depth", type=int, default=4, help="Batches buffered between stages")
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default=None)
+    parser.add_argument("--no-resume", action="store_true", help="Ignore any checkpoint and start over")
+    args = parser.parse_args()
+
+    print("=== NISR Streaming Ingest ===\n")
+    pipeline = IngestPipeline(
+        VectorIndexer(backend=args.backend),
+        data_folder=args.data_folder,
+        chunk_rows=args.chunk_rows,
+        batch_size=args.batch_size,
+        queue_depth=args.queue_depth
+    )
+    pipeline.run(resume=not args.no_resume)
+    pipeline.indexer.close()
@@ -0,0 +1,214 @@
+"""
+Lexical Index for Ubuzima Hub AI System
+BM25 inverted index over document text and metadata, kept next to the vector index
+"""
+
+import json
+import math
+import os
+import re
+import shutil
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from retrieval_backends import MetadataColumns
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "by", "data", "for", "from", "how", "in",
+    "is", "it", "of", "on", "or", "rwanda", "the", "to", "was", "were", "what",
+    "which", "with"
+}
+
+# Metadata that is the same for whole datasets (or internal) adds no signal
+UNINDEXED_METADATA = {"content_hash", "source", "country", "type"}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens, minus stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def document_tokens(document: Dict[str, Any]) -> List[str]:
+    """Tokens of a document's text plus its metadata values"""
+    metadata = document.get("metadata") or {}
+    fields = [str(value) for key, value in metadata.items() if key not in UNINDEXED_METADATA]
+    return tokenize(" ".join([document["text"]] + fields))
+
+
+class LexicalIndex:
+    """
+    BM25 (Okapi) index stored as a compressed-sparse-row postings matrix
+
+    Each term's postings are a slice of two parallel arrays (document row,
+    precomputed BM25 weight), so scoring a query is one vectorised add per
+    query term. The index records the vector index version it was built
+    from; `matches` tells callers whether it is in sync.
+    """
+
+    def __init__(self, index_dir: str, k1: float = 1.2, b: float = 0.75):
+        self.index_dir = Path(index_dir)
+        self.k1 = k1
+        self.b = b
+        self._data: Optional[Dict[str, Any]] = None
+        # (mtime, size) of the meta.json that _data was loaded from
+        self._signature: Optional[tuple] = None
+        self._load()
+
+    def _meta_signature(self) -> Optional[tuple]:
+        try:
+            stat = (self.index_dir / "meta.json").stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> None:
+        meta_path = self.index_dir / "meta.json"
+        self._signature = self._meta_signature()
+        if self._signature is None:
+            self._data = None
+            return
+        meta = json.loads(meta_path.read_text())
+        with open(self.index_dir / "metadatas.json", "r", encoding="utf-8") as f:
+            metadatas = json.load(f)
+        self._data = {
+            "version": meta["version"],
+            "ids": meta["ids"],
+            "vocabulary": meta["vocabulary"],
+            "indptr": np.load(self.index_dir / "indptr.npy", mmap_mode="r"),
+            "docs": np.load(self.index_dir / "docs.npy", mmap_mode="r"),
+            "weights": np.load(self.index_dir / "weights.npy", mmap_mode="r"),
+            "filters": MetadataColumns(metadatas)
+        }
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._data["version"] if self._data else None
+
+    def matches(self, version: str) -> bool:
+        """True if the index was built from vector index `version`"""
+        return self._data is not None and self._data["version"] == version
+
+    def refresh(self) -> None:
+        """Reload the index if another process rebuilt it since it was loaded"""
+        if self._meta_signature() != self._signature:
+            self._load()
+
+    def build(self, documents: Iterable[Dict[str, Any]], version: str) -> None:
+        """(Re)build the index from every document in the vector index"""
+        ids: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        lengths: List[int] = []
+        vocabulary: Dict[str, int] = {}
+        postings: List[List[Tuple[int, int]]] = []
+
+        for row, document in enumerate(documents):
+            ids.append(document["id"])
+            metadatas.append({
+                key: value for key, value in (document.get("metadata") or {}).items()
+                if key != "content_hash"
+            })
+            tokens = document_tokens(document)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_id = vocabulary.setdefault(term, len(vocabulary))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((row, tf))
+
+        n_docs = len(ids)
+        avg_length = (sum(lengths) / n_docs) if n_docs else 0.0
+        length_norm = np.asarray(
+            [self.k1 * (1 - self.b + self.b * length / avg_length) if avg_length else self.k1 for length in lengths],
+            dtype=np.float32
+        )
+
+        indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(entries) for entries in postings])
+        docs = np.empty(indptr[-1], dtype=np.int32)
+        weights = np.empty(indptr[-1], dtype=np.float32)
+        for term_id, entries in enumerate(postings):
+            rows, tfs = zip(*entries)
+            rows = np.asarray(rows, dtype=np.int32)
+            tfs = np.asarray(tfs, dtype=np.float32)
+            idf = math.log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            start, end = indptr[term_id], indptr[term_id + 1]
+            docs[start:end] = rows
+            weights[start:end] = idf * tfs * (self.k1 + 1) / (tfs + length_norm[rows])
+
+        # Write next to the live index, then swap directories
+        tmp = self.index_dir.with_name(self.index_dir.name + ".tmp")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+        np.save(tmp / "indptr.npy", indptr)
+        np.save(tmp / "docs.npy", docs)
+        np.save(tmp / "weights.npy", weights)
+        with open(tmp / "metadatas.json", "w", encoding="utf-8") as f:
+            json.dump(metadatas, f, ensure_ascii=False, default=str)
+        (tmp / "meta.json").write_text(json.dumps({
+            "version": version,
+            "k1": self.k1,
+            "b": self.b,
+            "ids": ids,
+            "vocabulary": vocabulary
+        }))
+        if self.index_dir.exists():
+            shutil.rmtree(self.index_dir)
+        os.replace(tmp, self.index_dir)
+
+        self._load()
+        print(f"✓ Lexical index built: {n_docs} documents, {len(vocabulary)} terms")
+
+    def query_many(
+        self,
+        queries: List[str],
+        n_results: int,
+        where: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """Top (document ID, BM25 score) pairs for each query, best first"""
+        data = self._data
+        if data is None:
+            return [[] for _ in queries]
+
+        mask = data["filters"].where_mask(where) if where else None
+        results = []
+        for query in queries:
+            scores = np.zeros(len(data["ids"]), dtype=np.float32)
+            for term in set(tokenize(query)):
+                term_id = data["vocabulary"].get(term)
+                if term_id is None:
+                    continue
+                start, end = data["indptr"][term_id], data["indptr"][term_id + 1]
+                # A term lists each document once, so fancy-index += is safe
+                scores[data["docs"][start:end]] += data["weights"][start:end]
+            if mask is not None:
+                scores[~mask] = 0.0
+
+            k = min(n_results, int(np.count_nonzero(scores)))
+            if k <= 0:
+                results.append([])
+                continue
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            results.append([(data["ids"][row], float(scores[row])) for row in top])
+        return results
+
+    def clear(self) -> None:
+        if self.index_dir.exists():
+            shutil.rmtree(self.index_dir)
+        self._data = None
+        self._signature = None
+
+    def stats(self) -> Dict[str, Any]:
+        if self._data is None:
+            return {"documents": 0, "terms": 0, "version": None}
+        return {
+            "documents": len(self._data["ids"]),
+            "terms": len(self._data["vocabulary"]),
+            "version": self._data["version"]
+        }
@@ -0,0 +1,437 @@
+"""
+LLM Gateway for Ubuzima Hub AI System
+Pooled, retrying, circuit-broken access to OpenAI-compatible chat endpoints
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+import httpx
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI, OpenAI
+
+import metrics
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+# Worth another attempt: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMUnavailableError(RuntimeError):
+    """Every endpoint failed or has its circuit open"""
+
+
+@dataclass(frozen=True)
+class LLMEndpoint:
+    """One OpenAI-compatible chat completions endpoint"""
+    name: str
+    base_url: str
+    api_key: str
+    model: str
+
+
+class CircuitBreaker:
+    """
+    Stops calling an endpoint after repeated failures
+
+    closed:    calls go through; `failure_threshold` consecutive failures open it
+    open:      calls are refused for `reset_seconds`
+    half_open: one probe call is let through; success closes the circuit,
+               failure opens it again
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            # Let one probe through per reset window
+            self.state = "half_open"
+            self.opened_at = time.monotonic()
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class _Route:
+    """An endpoint with its pooled clients, circuit breaker and counters"""
+
+    def __init__(self, endpoint: LLMEndpoint, timeout: float, pool_size: int, breaker: CircuitBreaker):
+        self.endpoint = endpoint
+        self.breaker = breaker
+        limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=60.0
+        )
+        client_timeout = httpx.Timeout(timeout, connect=min(timeout, 5.0))
+        # Retries are done by the gateway, not the SDK
+        self.client = OpenAI(
+            base_url=endpoint.base_url,
+            api_key=endpoint.api_key,
+            max_retries=0,
+            timeout=client_timeout,
+            http_client=httpx.Client(limits=limits, timeout=client_timeout)
+        )
+        self.async_client = AsyncOpenAI(
+            base_url=endpoint.base_url,
+            api_key=endpoint.api_key,
+            max_retries=0,
+            timeout=client_timeout,
+            http_client=httpx.AsyncClient(limits=limits, timeout=client_timeout)
+        )
+        self.counts = {"requests": 0, "successes": 0, "failures": 0, "retries": 0, "rejected": 0}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.endpoint.base_url,
+            "model": self.endpoint.model,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            **self.counts
+        }
+
+
+class LLMGateway:
+    """
+    Chat completions through a primary endpoint with optional failover
+
+    Every call has one deadline (`timeout`) covering all attempts. Retryable
+    errors (connection errors, timeouts, 408/409/429/5xx) are retried up to
+    `max_retries` times with full-jitter exponential backoff, honouring
+    Retry-After. When an endpoint runs out of attempts, or its circuit is
+    open, the next endpoint is tried. Other errors (bad request, auth) are
+    raised straight away. Streams are retried only until the first chunk
+    arrives; after that, errors reach the caller.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[LLMEndpoint],
+        timeout: float = 30.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        pool_size: int = 20,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0
+    ):
+        if not endpoints:
+            raise ValueError("LLMGateway needs at least one endpoint")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.routes = [
+            _Route(endpoint, timeout, pool_size, CircuitBreaker(breaker_failures, breaker_reset))
+            for endpoint in endpoints
+        ]
+        self._lock = threading.Lock()
+        self.failovers = 0
+
+    @classmethod
+    def from_env(cls, api_key: str, model: str, timeout: float = 30.0) -> "LLMGateway":
+        """Primary endpoint (Groq unless LLM_BASE_URL is set) plus optional LLM_FALLBACK_*"""
+        endpoints = [LLMEndpoint("primary", os.getenv("LLM_BASE_URL", GROQ_BASE_URL), api_key, model)]
+        fallback_url = os.getenv("LLM_FALLBACK_BASE_URL")
+        if fallback_url:
+            endpoints.append(LLMEndpoint(
+                "fallback",
+                fallback_url,
+                os.getenv("LLM_FALLBACK_API_KEY", "") or api_key,
+                os.getenv("LLM_FALLBACK_MODEL", "") or model
+            ))
+        return cls(
+            endpoints,
+            timeout=timeout,
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+            pool_size=int(os.getenv("LLM_POOL_SIZE", "20")),
+            breaker_failures=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            breaker_reset=float(os.getenv("LLM_BREAKER_RESET", "30"))
+        )
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, APIStatusError):
+            return error.status_code in RETRYABLE_STATUS
+        return isinstance(error, (APIConnectionError, asyncio.TimeoutError, httpx.TransportError))
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential delay, at least the server's Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if isinstance(error, APIStatusError):
+            try:
+                delay = max(delay, float(error.response.headers.get("retry-after", 0)))
+            except ValueError:
+                pass
+        return delay
+
+    def _count(self, route: _Route, key: str) -> None:
+        with self._lock:
+            route.counts[key] += 1
+
+    def _admit(self, route: _Route, attempt: int) -> bool:
+        """Whether `route` may take this attempt (its circuit is not open)"""
+        if not route.breaker.allow():
+            self._count(route, "rejected")
+            return False
+        if attempt:
+            self._count(route, "retries")
+        self._count(route, "requests")
+        return True
+
+    def _failed(self, route: _Route, error: Exception) -> None:
+        """Record a failed attempt; re-raise it if retrying cannot help"""
+        if not self.is_retryable(error):
+            raise error
+        self._count(route, "failures")
+        route.breaker.record_failure()
+
+    def _succeeded(self, route: _Route) -> None:
+        self._count(route, "successes")
+        route.breaker.record_success()
+
+    def _count_failover(self) -> None:
+        with self._lock:
+            self.failovers += 1
+
+    def _exhausted(self, error: Optional[Exception], deadline: float) -> Exception:
+        if time.monotonic() >= deadline:
+            return self._timed_out()
+        if error is None:
+            return LLMUnavailableError("LLM service unavailable: circuit open on every endpoint")
+        return LLMUnavailableError(f"LLM service unavailable: {str(error) or type(error).__name__}")
+
+    def _timed_out(self) -> Exception:
+        return TimeoutError(f"LLM did not respond within {self.timeout:g}s")
+
+    def _call(self, fn: Callable[[_Route, float], Any]) -> Any:
+        """Run `fn(route, seconds_left)` under the retry, breaker and failover policy"""
+        deadline = time.monotonic() + self.timeout
+        last_error: Optional[Exception] = None
+        for index, route in enumerate(self.routes):
+            if index:
+                self._count_failover()
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    delay = self._backoff(attempt - 1, last_error)
+                    if time.monotonic() + delay >= deadline:
+                        # No time to wait for this endpoint: try the next one
+                        break
+                    time.sleep(delay)
+                if not self._admit(route, attempt):
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._timed_out() from last_error
+                try:
+                    result = fn(route, remaining)
+                except Exception as e:
+                    self._failed(route, e)
+                    last_error = e
+                    continue
+                self._succeeded(route)
+                return result
+        raise self._exhausted(last_error, deadline) from last_error
+
+    async def _acall(self, fn: Callable[[_Route, float], Awaitable[Any]]) -> Any:
+        """Async variant of _call"""
+        deadline = time.monotonic() + self.timeout
+        last_error: Optional[Exception] = None
+        for index, route in enumerate(self.routes):
+            if index:
+                self._count_failover()
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    delay = self._backoff(attempt - 1, last_error)
+                    if time.monotonic() + delay >= deadline:
+                        break
+                    await asyncio.sleep(delay)
+                if not self._admit(route, attempt):
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._timed_out() from last_error
+                try:
+                    # wait_for cancels the in-flight HTTP request at the deadline
+                    result = await asyncio.wait_for(fn(route, remaining), timeout=remaining)
+                except Exception as e:
+                    self._failed(route, e)
+                    last_error = e
+                    continue
+                self._succeeded(route)
+                return result
+        raise self._exhausted(last_error, deadline) from last_error
+
+    def _params(
+        self,
+        route: _Route,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Keyword arguments for one chat.completions.create call"""
+        return dict(
+            model=route.endpoint.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            **kwargs
+        )
+
+    @staticmethod
+    def _record_usage(response: Any) -> None:
+        """Count the prompt and completion tokens the provider reports"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        metrics.LLM_TOKENS.inc(usage.prompt_tokens or 0, kind="prompt")
+        metrics.LLM_TOKENS.inc(usage.completion_tokens or 0, kind="completion")
+
+    def complete(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        """Answer text for `messages`"""
+        def call(route: _Route, remaining: float) -> str:
+            response = route.client.chat.completions.create(
+                **self._params(route, messages, temperature, max_tokens, remaining)
+            )
+            self._record_usage(response)
+            return response.choices[0].message.content
+        with metrics.stage("llm"):
+            return self._call(call)
+
+    async def acomplete(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        """Async variant of complete"""
+        async def call(route: _Route, remaining: float) -> str:
+            response = await route.async_client.chat.completions.create(
+                **self._params(route, messages, temperature, max_tokens, remaining)
+            )
+            self._record_usage(response)
+            return response.choices[0].message.content
+        with metrics.stage("llm"):
+            return await self._acall(call)
+
+    @staticmethod
+    def _text(chunk: Any) -> Optional[str]:
+        return chunk.choices[0].delta.content if chunk.choices else None
+
+    def stream(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Iterator[str]:
+        """
+        Answer text fragments as the LLM produces them
+
+        Records `llm_first_token` (until the first chunk) and `llm` (until the
+        last) stage timings. Streamed responses carry no token usage.
+        """
+        def open_stream(route: _Route, remaining: float):
+            chunks = iter(route.client.chat.completions.create(
+                **self._params(route, messages, temperature, max_tokens, remaining, stream=True)
+            ))
+            # The first chunk proves the endpoint is answering; fail over before it
+            return route, chunks, next(chunks, None)
+
+        started = time.perf_counter()
+        route, chunks, first = self._call(open_stream)
+        metrics.record_stage("llm_first_token", time.perf_counter() - started)
+        try:
+            if first is None:
+                return
+            text = self._text(first)
+            if text:
+                yield text
+            for chunk in chunks:
+                text = self._text(chunk)
+                if text:
+                    yield text
+        except Exception as e:
+            if self.is_retryable(e):
+                route.breaker.record_failure()
+            raise
+        finally:
+            metrics.record_stage("llm", time.perf_counter() - started)
+
+    async def astream(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        """Async variant of stream; `timeout` also bounds every gap between chunks"""
+        async def open_stream(route: _Route, remaining: float):
+            stream = await route.async_client.chat.completions.create(
+                **self._params(route, messages, temperature, max_tokens, remaining, stream=True)
+            )
+            chunks = stream.__aiter__()
+            try:
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = None
+            return route, chunks, first
+
+        started = time.perf_counter()
+        route, chunks, first = await self._acall(open_stream)
+        metrics.record_stage("llm_first_token", time.perf_counter() - started)
+        try:
+            if first is None:
+                return
+            text = self._text(first)
+            if text:
+                yield text
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.timeout)
+                except StopAsyncIteration:
+                    break
+                text = self._text(chunk)
+                if text:
+                    yield text
+        except asyncio.TimeoutError:
+            route.breaker.record_failure()
+            raise self._timed_out()
+        except Exception as e:
+            if self.is_retryable(e):
+                route.breaker.record_failure()
+            raise
+        finally:
+            metrics.record_stage("llm", time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "timeout_seconds": self.timeout,
+            "max_retries": self.max_retries,
+            "failovers": self.failovers,
+            "endpoints": {route.endpoint.name: route.stats() for route in self.routes}
+        }
+
+    def close(self) -> None:
+        """Close the pooled HTTP connections of the sync clients"""
+        for route in self.routes:
+            route.client.close()
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections of the async clients"""
+        for route in self.routes:
+            await route.async_client.close()
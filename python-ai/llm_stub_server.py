@@ -0,0 +1,141 @@
+"""
+LLM Stub Server for Ubuzima Hub AI System
+Local OpenAI-compatible chat endpoint with injectable failures, for testing the LLM gateway
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+app = FastAPI(title="LLM Stub Server")
+
+# Behaviour, changed at start-up (CLI) or at runtime (POST /stub/config)
+config: Dict[str, Any] = {
+    "latency": 0.0,        # Seconds before answering
+    "fail_status": 503,    # Status code of injected failures
+    "fail_next": 0,        # Fail this many upcoming requests
+    "fail_rate": 0.0,      # Then fail this fraction of requests at random
+    "retry_after": None,   # Retry-After header on failures
+    "answer": "Stub answer based on the NISR context."
+}
+counters = {"requests": 0, "failures": 0, "streams": 0}
+
+
+class StubConfig(BaseModel):
+    latency: Optional[float] = None
+    fail_status: Optional[int] = None
+    fail_next: Optional[int] = None
+    fail_rate: Optional[float] = None
+    retry_after: Optional[float] = None
+    answer: Optional[str] = None
+
+
+def _should_fail() -> bool:
+    if config["fail_next"] > 0:
+        config["fail_next"] -= 1
+        return True
+    return random.random() < config["fail_rate"]
+
+
+def _chunk(completion_id: str, model: str, delta: Dict[str, Any], finish: Optional[str] = None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    counters["requests"] += 1
+    await asyncio.sleep(config["latency"])
+
+    if _should_fail():
+        counters["failures"] += 1
+        headers = {}
+        if config["retry_after"] is not None:
+            headers["retry-after"] = str(config["retry_after"])
+        return JSONResponse(
+            {"error": {"message": "Injected failure", "type": "stub_error"}},
+            status_code=config["fail_status"],
+            headers=headers
+        )
+
+    model = body.get("model", "stub")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    answer = config["answer"]
+
+    if body.get("stream"):
+        counters["streams"] += 1
+
+        async def events():
+            yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+            for word in answer.split(" "):
+                yield _chunk(completion_id, model, {"content": word + " "})
+            yield _chunk(completion_id, model, {}, finish="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    prompt_tokens = sum(len(message.get("content", "")) for message in body.get("messages", [])) // 4
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": answer},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(answer) // 4,
+            "total_tokens": prompt_tokens + len(answer) // 4
+        }
+    }
+
+
+@app.post("/stub/config")
+async def set_config(update: StubConfig):
+    config.update({key: value for key, value in update.model_dump().items() if value is not None})
+    return config
+
+
+@app.get("/stub/stats")
+async def get_stats():
+    return counters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible LLM stub")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each answer")
+    parser.add_argument("--fail-status", type=int, default=503, help="Status code of injected failures")
+    parser.add_argument("--fail-next", type=int, default=0, help="Fail the first N requests")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests to fail")
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After seconds on failures")
+    args = parser.parse_args()
+
+    config.update(
+        latency=args.latency,
+        fail_status=args.fail_status,
+        fail_next=args.fail_next,
+        fail_rate=args.fail_rate,
+        retry_after=args.retry_after
+    )
+    print(f"LLM stub on http://127.0.0.1:{args.port}/v1 (set LLM_BASE_URL to this)")
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,213 @@
+"""
+Metrics for Ubuzima Hub AI System
+In-process counters, gauges and histograms rendered in Prometheus text format
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Seconds: 1ms .. 30s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Squared L2 between unit vectors lies in [0, 4]
+DISTANCE_BUCKETS = (0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4, 1.6, 1.8, 2.0, 4.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    """Current value per label set"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    """Bucketed observations per label set (cumulated when rendered)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last = +Inf), sum, count]
+        self._values: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(series[0]), series[1], series[2])) for key, series in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "ubuzima_stage_seconds",
+    "Time spent in each stage of answering a question"
+)
+LLM_TOKENS = Counter(
+    "ubuzima_llm_tokens_total",
+    "LLM tokens reported by the provider, by kind (prompt, completion)"
+)
+RETRIEVAL_DISTANCE = Histogram(
+    "ubuzima_retrieval_distance",
+    "Embedding distance of retrieved documents (rank=best: closest per query)",
+    buckets=DISTANCE_BUCKETS
+)
+ERRORS = Counter(
+    "ubuzima_errors_total",
+    "Errors by exception type"
+)
+HTTP_REQUESTS = Counter(
+    "ubuzima_http_requests_total",
+    "HTTP requests by route and status code"
+)
+HTTP_SECONDS = Histogram(
+    "ubuzima_http_request_seconds",
+    "HTTP request latency by route"
+)
+STARTUP_SECONDS = Gauge(
+    "ubuzima_startup_seconds",
+    "Start-up time by phase (model_load, warmup, cold_start)"
+)
+COMPONENT_STATS = Gauge(
+    "ubuzima_component_stat",
+    "Numeric /stats values (cache hits, queue depth, LLM retries, ...) by component"
+)
+
+REGISTRY = [
+    STAGE_SECONDS, LLM_TOKENS, RETRIEVAL_DISTANCE, ERRORS,
+    HTTP_REQUESTS, HTTP_SECONDS, STARTUP_SECONDS, COMPONENT_STATS
+]
+
+# Per-request stage timings, set by track_timings
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("ubuzima_timings", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block into ubuzima_stage_seconds and the current request's timings"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def track_timings() -> Iterator[Dict[str, float]]:
+    """Collect the stage timings of everything run in this context"""
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def observe_distances(documents: List[dict]) -> None:
+    """Record the distances of one query's retrieved documents"""
+    distances = [doc["distance"] for doc in documents if doc.get("distance") is not None]
+    for distance in distances:
+        RETRIEVAL_DISTANCE.observe(distance, rank="all")
+    if distances:
+        RETRIEVAL_DISTANCE.observe(min(distances), rank="best")
+
+
+def record_stats(component: str, stats: Dict[str, Any], prefix: str = "") -> None:
+    """Copy the numeric values of a component's stats dict into ubuzima_component_stat"""
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            record_stats(component, value, prefix=f"{name}.")
+        elif isinstance(value, (int, float)):
+            COMPONENT_STATS.set(value, component=component, stat=name)
+
+
+def render() -> str:
+    """Every metric in Prometheus text exposition format (version 0.0.4)"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,89 @@
+"""
+Offline Stubs for Ubuzima Hub AI System
+Deterministic stand-ins for the embedding model and the LLM, shared by the tests and benchmarks
+"""
+
+import hashlib
+import re
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from vector_indexer import VectorIndexer
+
+HASHING_MODEL = "hashing-384"
+
+
+class HashingEmbedder:
+    """
+    Deterministic bag-of-words embedder with a SentenceTransformer-style encode
+
+    Each word is hashed to a signed dimension, so results never change
+    between runs or machines and nothing is downloaded.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+        self._slots: Dict[str, tuple] = {}
+
+    def _slot(self, token: str) -> tuple:
+        slot = self._slots.get(token)
+        if slot is None:
+            digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            slot = self._slots[token] = (digest % self.dimensions, 1.0 if digest >> 63 else -1.0)
+        return slot
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                index, sign = self._slot(token)
+                vectors[row, index] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class StubLLM:
+    """Stands in for LLMGateway: answers at once with a fixed text, no network"""
+
+    def __init__(self, answer: str = "Stub answer based on the NISR context."):
+        self.answer = answer
+        self.calls = 0
+
+    def complete(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        self.calls += 1
+        return self.answer
+
+    async def acomplete(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        return self.complete(messages, temperature, max_tokens)
+
+    def stream(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Iterator[str]:
+        self.calls += 1
+        for word in self.answer.split(" "):
+            yield word + " "
+
+    async def astream(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        for text in self.stream(messages, temperature, max_tokens):
+            yield text
+
+    def stats(self) -> Dict[str, Any]:
+        return {"stub": True, "calls": self.calls}
+
+    def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+
+def make_indexer(db_path: str, backend: str, model: Optional[str]) -> VectorIndexer:
+    """Indexer on the hashing embedder, or on a (locally cached) SentenceTransformer"""
+    if model:
+        return VectorIndexer(embedding_model=model, db_path=db_path, backend=backend, embed_processes=1)
+    return VectorIndexer(
+        embedding_model=HASHING_MODEL,
+        db_path=db_path,
+        backend=backend,
+        embed_processes=1,
+        embedder=HashingEmbedder()
+    )
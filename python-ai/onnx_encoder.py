@@ -0,0 +1,142 @@
+"""
+ONNX Encoder for Ubuzima Hub AI System
+Sentence embeddings from an exported ONNX model on ONNX Runtime, without torch
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Values of EMBEDDING_BACKEND
+SENTENCE_TRANSFORMERS = "sentence_transformers"
+ONNX = "onnx"
+EMBEDDING_BACKENDS = (SENTENCE_TRANSFORMERS, ONNX)
+
+# Written by export_onnx_encoder.py next to the model
+CONFIG_FILE = "encoder.json"
+
+
+class OnnxEncoder:
+    """
+    SentenceTransformer-compatible `encode` on ONNX Runtime
+
+    Loads the folder written by export_onnx_encoder.py: the transformer as
+    `model.onnx` (or the int8 `model_quantized.onnx`), its `tokenizer.json`
+    and `encoder.json` (pooling, normalisation, max length). Only
+    onnxruntime, tokenizers and numpy are imported, so start-up skips torch.
+    """
+
+    def __init__(self, model_dir: str, quantized: Optional[bool] = None, threads: Optional[int] = None):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_dir = Path(model_dir)
+        config_path = self.model_dir / CONFIG_FILE
+        if not config_path.exists():
+            raise FileNotFoundError(
+                f"{config_path} not found; run python export_onnx_encoder.py --output {model_dir}"
+            )
+        self.config: Dict[str, Any] = json.loads(config_path.read_text())
+
+        if quantized is None:
+            quantized = os.getenv("ONNX_QUANTIZED", "false").lower() == "true"
+        self.model_file = "model_quantized.onnx" if quantized else "model.onnx"
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = threads if threads is not None else int(os.getenv("ONNX_THREADS", "0"))
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            str(self.model_dir / self.model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=int(self.config["max_length"]))
+        pad_token = self.config.get("pad_token", "[PAD]")
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+    @property
+    def cache_name(self) -> str:
+        """Model identity for caches: vectors of this runtime differ slightly from torch's"""
+        return f"{self.config['model_name']}@onnx/{self.model_file}"
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.config["dimension"])
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        if self.config.get("pooling", "mean") == "cls":
+            pooled = token_embeddings[:, 0]
+        else:
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.config.get("normalize", True):
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        """Embeddings for `texts`, in input order"""
+        if isinstance(texts, str):
+            return self.encode([texts], batch_size=batch_size)[0]
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        # Batches of similar length need little padding
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        vectors = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        started = time.perf_counter()
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            vectors[rows] = self._encode_batch([texts[row] for row in rows])
+        if show_progress_bar:
+            batches = -(-len(texts) // batch_size)
+            print(f"✓ Encoded {len(texts)} texts in {batches} batches ({time.perf_counter() - started:.1f}s)")
+        return vectors
+
+
+def create_embedder(
+    model_name: str,
+    backend: Optional[str] = None,
+    onnx_dir: Optional[str] = None,
+    threads: Optional[int] = None
+):
+    """
+    Sentence encoder for `model_name` on the chosen runtime
+
+    backend (default: EMBEDDING_BACKEND): "sentence_transformers" loads the
+    PyTorch model (the default); "onnx" loads the export in `onnx_dir`
+    (default: ONNX_MODEL_DIR or ./onnx_model).
+    """
+    backend = (backend or os.getenv("EMBEDDING_BACKEND", SENTENCE_TRANSFORMERS)).lower()
+    if backend == ONNX:
+        encoder = OnnxEncoder(onnx_dir or os.getenv("ONNX_MODEL_DIR", "./onnx_model"), threads=threads)
+        if encoder.config["model_name"] != model_name:
+            print(f"✗ Warning: ONNX export is of {encoder.config['model_name']}, not {model_name}")
+        return encoder
+    if backend != SENTENCE_TRANSFORMERS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose one of: {', '.join(EMBEDDING_BACKENDS)}")
+
+    # Imported here: torch alone takes seconds to import
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
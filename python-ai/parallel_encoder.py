@@ -0,0 +1,152 @@
+"""
+Parallel Encoder for Ubuzima Hub AI System
+Multi-process sentence embedding for index builds
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+# Per-process model, loaded once by the pool initializer
+_worker_model = None
+
+
+def _init_worker(model_name: str, threads: int, backend: Optional[str], onnx_dir: Optional[str]) -> None:
+    """Load the model in a pool process and cap its intra-op threads"""
+    global _worker_model
+    from onnx_encoder import create_embedder
+    _worker_model = create_embedder(model_name, backend, onnx_dir, threads=threads)
+
+
+def _encode_shard(texts: List[str], batch_size: int) -> np.ndarray:
+    return np.asarray(_worker_model.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+
+class ParallelEncoder:
+    """
+    Encodes large lists of texts across a pool of processes
+
+    Texts are sorted by length so every batch holds texts of similar length
+    (little padding), split into shards that the workers pick up as they
+    become free, and put back in input order afterwards. Lists shorter than
+    `min_parallel_texts`, or `processes <= 1`, are encoded in this process.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        model_name: str,
+        processes: int = 1,
+        batch_size: int = 32,
+        min_parallel_texts: int = 2000,
+        backend: Optional[str] = None,
+        onnx_dir: Optional[str] = None
+    ):
+        self.embedder = embedder
+        self.model_name = model_name
+        # Workers load their own copy on the same runtime (see onnx_encoder.create_embedder)
+        self.backend = backend
+        self.onnx_dir = onnx_dir
+        self.processes = processes
+        self.batch_size = batch_size
+        self.min_parallel_texts = min_parallel_texts
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Start the worker processes on first use; they are reused afterwards"""
+        if self._pool is None:
+            threads = max(1, (os.cpu_count() or 1) // self.processes)
+            print(f"Starting {self.processes} embedding processes ({threads} threads each)...")
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                # spawn: forking a process that has already loaded torch is unsafe
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, threads, self.backend, self.onnx_dir)
+            )
+        return self._pool
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        """Embeddings for `texts`, in input order"""
+        if self.processes <= 1 or len(texts) < self.min_parallel_texts:
+            return np.asarray(
+                self.embedder.encode(texts, batch_size=self.batch_size, show_progress_bar=show_progress_bar),
+                dtype=np.float32
+            )
+
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        sorted_texts = [texts[i] for i in order]
+
+        # Several shards per process so fast workers take on more of them
+        shard_size = max(self.batch_size, -(-len(texts) // (self.processes * 8)))
+        shards = [sorted_texts[i:i + shard_size] for i in range(0, len(sorted_texts), shard_size)]
+
+        pool = self._get_pool()
+        started = time.perf_counter()
+        sorted_vectors = np.vstack(list(pool.map(_encode_shard, shards, [self.batch_size] * len(shards))))
+        if show_progress_bar:
+            print(
+                f"Encoded {len(texts)} texts in {len(shards)} shards across "
+                f"{self.processes} processes ({time.perf_counter() - started:.1f}s)"
+            )
+
+        vectors = np.empty_like(sorted_vectors)
+        vectors[order] = sorted_vectors
+        return vectors
+
+    def close(self) -> None:
+        """Stop the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def benchmark(process_counts: List[int], data_folder: str = "../data") -> None:
+    """Time single- vs multi-process encoding of the bundled datasets"""
+    from sentence_transformers import SentenceTransformer
+    from data_loader import NISRDataLoader
+
+    model_name = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    loader = NISRDataLoader(data_folder=data_folder)
+    loader.load_datasets()
+    texts = [doc["text"] for doc in loader.prepare_documents()]
+    embedder = SentenceTransformer(model_name)
+
+    print(f"\n=== Encoding {len(texts)} documents with {model_name} ===")
+    started = time.perf_counter()
+    baseline = np.asarray(embedder.encode(texts), dtype=np.float32)
+    baseline_seconds = time.perf_counter() - started
+    print(f"single process (current path): {baseline_seconds:.2f}s")
+
+    for processes in process_counts:
+        encoder = ParallelEncoder(embedder, model_name, processes=processes, min_parallel_texts=0)
+        # Exclude worker start-up (model loading) from the timing
+        encoder.encode(texts[:encoder.batch_size * processes])
+        started = time.perf_counter()
+        vectors = encoder.encode(texts)
+        seconds = time.perf_counter() - started
+        encoder.close()
+
+        max_diff = float(np.abs(vectors - baseline).max())
+        print(
+            f"{processes} processes: {seconds:.2f}s "
+            f"(speedup {baseline_seconds / seconds:.2f}x, max |diff| vs single {max_diff:.2e})"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parallel embedding on the NISR datasets")
+    parser.add_argument(
+        "--processes",
+        default=",".join(str(n) for n in (2, 4, os.cpu_count() or 1)),
+        help="Comma-separated process counts to try"
+    )
+    parser.add_argument("--data-folder", default=os.getenv("DATA_FOLDER", "../data"))
+    args = parser.parse_args()
+
+    benchmark(sorted({int(n) for n in args.processes.split(",")}), data_folder=args.data_folder)
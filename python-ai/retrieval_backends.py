@@ -0,0 +1,754 @@
+"""
+Retrieval Backends for Ubuzima Hub AI System
+Storage and nearest-neighbour search behind VectorIndexer
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from vector_quantization import CODES, QUANTIZATIONS, RESCORE_FACTORS, load_or_build_codes, remove_codes
+
+
+COLLECTION_NAME = "nisr_rwanda_data"
+
+
+class ChromaBackend:
+    """ChromaDB persistent collection (default backend)"""
+
+    name = "chroma"
+
+    def __init__(self, db_path: str, collection_name: str = COLLECTION_NAME):
+        import chromadb
+
+        self.db_path = Path(db_path)
+        self.collection_name = collection_name
+
+        print(f"Initializing ChromaDB at: {db_path}")
+        self.client = chromadb.PersistentClient(path=str(self.db_path))
+        self._open_collection()
+
+    def _open_collection(self) -> None:
+        """Get or create collection"""
+        self.collection = self.client.get_or_create_collection(
+            name=self.collection_name,
+            metadata={"description": "NISR Rwanda nutrition and survey data"}
+        )
+
+    def get_hashes(self, ids: Optional[List[str]] = None) -> Dict[str, str]:
+        """Map of document ID -> content hash for `ids` (default: everything indexed)"""
+        existing = self.collection.get(ids=ids, include=["metadatas"])
+        return {
+            doc_id: (metadata or {}).get("content_hash", "")
+            for doc_id, metadata in zip(existing["ids"], existing["metadatas"])
+        }
+
+    def upsert(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        self.collection.upsert(
+            embeddings=np.asarray(embeddings).tolist(),
+            documents=texts,
+            metadatas=metadatas,
+            ids=ids
+        )
+
+    def delete(self, ids: List[str]) -> None:
+        self.collection.delete(ids=ids)
+
+    def commit(self) -> None:
+        """ChromaDB persists on every write"""
+
+    def query(
+        self,
+        embeddings: np.ndarray,
+        n_results: int,
+        where: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Nearest neighbours for each query embedding"""
+        results = self.collection.query(
+            query_embeddings=np.asarray(embeddings).tolist(),
+            n_results=n_results,
+            where=where if where else None
+        )
+
+        formatted_results = []
+        for q in range(len(embeddings)):
+            query_results = []
+            if results["documents"] and len(results["documents"]) > q:
+                for i in range(len(results["documents"][q])):
+                    query_results.append({
+                        "id": results["ids"][q][i],
+                        "text": results["documents"][q][i],
+                        "metadata": results["metadatas"][q][i],
+                        "distance": results["distances"][q][i] if results.get("distances") else None
+                    })
+            formatted_results.append(query_results)
+
+        return formatted_results
+
+    def get_by_ids(self, ids: List[str], embedding: np.ndarray) -> List[Dict[str, Any]]:
+        """Documents by ID, with their distance to `embedding` (same metric as query)"""
+        if not ids:
+            return []
+        found = self.collection.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+        query = np.asarray(embedding, dtype=np.float32)
+        documents = {
+            doc_id: {
+                "id": doc_id,
+                "text": text,
+                "metadata": metadata,
+                "distance": float(np.sum((np.asarray(vector, dtype=np.float32) - query) ** 2))
+            }
+            for doc_id, text, metadata, vector in zip(
+                found["ids"], found["documents"], found["metadatas"], found["embeddings"]
+            )
+        }
+        return [documents[doc_id] for doc_id in ids if doc_id in documents]
+
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Every indexed document (id, text, metadata), a page at a time"""
+        for offset in range(0, self.collection.count(), batch_size):
+            page = self.collection.get(limit=batch_size, offset=offset, include=["documents", "metadatas"])
+            yield [
+                {"id": doc_id, "text": text, "metadata": metadata or {}}
+                for doc_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"])
+            ]
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def clear(self) -> None:
+        self.client.delete_collection(name=self.collection_name)
+        self._open_collection()
+
+    def reload(self) -> None:
+        """Pick up a collection recreated by another process"""
+        self._open_collection()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"collection_name": self.collection.name}
+
+
+class MetadataColumns:
+    """
+    Metadata dictionary-encoded into int32 code columns for fast filtering
+
+    Evaluates ChromaDB-style `where` filters as boolean row masks.
+    """
+
+    def __init__(self, metadatas: List[Dict[str, Any]]):
+        self.size = len(metadatas)
+        keys = set()
+        for metadata in metadatas:
+            keys.update(metadata.keys())
+
+        self.columns: Dict[str, Dict[str, Any]] = {}
+        for key in keys:
+            vocabulary: Dict[Any, int] = {}
+            codes = np.fromiter(
+                (
+                    vocabulary.setdefault(metadata[key], len(vocabulary)) if key in metadata else -1
+                    for metadata in metadatas
+                ),
+                dtype=np.int32,
+                count=len(metadatas)
+            )
+            self.columns[key] = {"codes": codes, "vocabulary": vocabulary, "numeric": None}
+
+    def numeric_column(self, key: str) -> np.ndarray:
+        """Float view of a metadata column for range comparisons"""
+        column = self.columns[key]
+        if column["numeric"] is None:
+            lookup = np.full(len(column["vocabulary"]) + 1, np.nan)
+            for value, code in column["vocabulary"].items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lookup[code] = value
+            # code -1 (key missing) indexes the trailing NaN
+            column["numeric"] = lookup[column["codes"]]
+        return column["numeric"]
+
+    def condition_mask(self, key: str, condition: Any) -> np.ndarray:
+        """Boolean row mask for one `key: condition` clause"""
+        n = self.size
+        if key in self.columns:
+            codes, vocabulary = self.columns[key]["codes"], self.columns[key]["vocabulary"]
+        else:
+            codes, vocabulary = np.full(n, -1, dtype=np.int32), {}
+
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        mask = np.ones(n, dtype=bool)
+        for operator, operand in condition.items():
+            if operator == "$eq":
+                mask &= codes == vocabulary.get(operand, -2)
+            elif operator == "$ne":
+                mask &= codes != vocabulary.get(operand, -2)
+            elif operator in ("$in", "$nin"):
+                wanted = [vocabulary[value] for value in operand if value in vocabulary]
+                hits = np.isin(codes, wanted)
+                mask &= hits if operator == "$in" else ~hits
+            elif operator in ("$gt", "$gte", "$lt", "$lte"):
+                values = self.numeric_column(key) if key in self.columns else np.full(n, np.nan)
+                with np.errstate(invalid="ignore"):
+                    if operator == "$gt":
+                        mask &= values > operand
+                    elif operator == "$gte":
+                        mask &= values >= operand
+                    elif operator == "$lt":
+                        mask &= values < operand
+                    else:
+                        mask &= values <= operand
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+        return mask
+
+    def where_mask(self, where: Dict[str, Any]) -> np.ndarray:
+        """Boolean row mask for a ChromaDB-style `where` filter"""
+        mask = np.ones(self.size, dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self.where_mask(clause)
+            elif key == "$or":
+                any_mask = np.zeros(self.size, dtype=bool)
+                for clause in condition:
+                    any_mask |= self.where_mask(clause)
+                mask &= any_mask
+            else:
+                mask &= self.condition_mask(key, condition)
+        return mask
+
+
+class _NumpyIndexState:
+    """
+    One consistent snapshot of the NumPy index (documents, matrix, filter columns)
+
+    Row N of every list is row N of the vector file. Rows whose document was
+    replaced or deleted since the last compaction have id None; queries mask
+    them out.
+    """
+
+    def __init__(
+        self,
+        ids: List[Optional[str]],
+        texts: List[Optional[str]],
+        metadatas: List[Dict[str, Any]],
+        matrix: np.ndarray,
+        rows: Optional[Dict[str, int]] = None
+    ):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.matrix = matrix
+        self.rows = rows if rows is not None else {
+            doc_id: row for row, doc_id in enumerate(ids) if doc_id is not None
+        }
+        # Built on first query (NumpyBackend._prepare), so commits stay cheap
+        self.ready = False
+        self.lock = threading.Lock()
+        self.live: Optional[np.ndarray] = None
+        self.filters: Optional[MetadataColumns] = None
+        # Int8Codes / BinaryCodes of `matrix` when quantization is on
+        self.codes = None
+
+    @property
+    def dead_rows(self) -> int:
+        return len(self.ids) - len(self.rows)
+
+    def where_mask(self, where: Dict[str, Any]) -> np.ndarray:
+        """Boolean row mask for a ChromaDB-style `where` filter"""
+        return self.filters.where_mask(where)
+
+
+class NumpyBackend:
+    """
+    In-process exact search over a memory-mapped float32 matrix
+
+    Vectors are L2-normalised on write, so one matrix product gives cosine
+    similarity; distances are reported as squared L2 (2 - 2 * cosine), the
+    same metric as the default ChromaDB collection. Metadata filters use the
+    ChromaDB `where` syntax and are evaluated on columnar arrays built once
+    per snapshot.
+
+    Storage is append-only: `upsert` appends vectors to vectors_<gen>.f32 and
+    `commit` appends the document records to documents_<gen>.jsonl, then
+    re-maps the grown file, so a commit costs IO proportional to the batch,
+    not to the index. A replaced or deleted document leaves a dead row
+    behind; once dead rows outnumber live ones, the live rows are streamed
+    into the next generation and meta.json is switched to it. Writes become
+    visible to queries on `commit()`.
+
+    With `quantization` "int8" or "binary", queries scan compact codes
+    instead of the float matrix (4x / 32x fewer bytes) and only the
+    `rescore_factor * k` best candidates are rescored exactly against their
+    float vectors, which stay memory-mapped on disk. Returned distances are
+    always exact. Codes are saved next to the index for the next load unless
+    `persist_codes` is False (read-only tools such as evaluate_quantization).
+    """
+
+    name = "numpy"
+
+    # Rows copied per write while compacting
+    COMPACT_BATCH = 4096
+
+    def __init__(
+        self,
+        db_path: str,
+        collection_name: str = COLLECTION_NAME,
+        quantization: Optional[str] = None,
+        rescore_factor: Optional[int] = None,
+        persist_codes: bool = True
+    ):
+        self.db_path = Path(db_path)
+        self.collection_name = collection_name
+        self.persist_codes = persist_codes
+        self.quantization = (quantization or os.getenv("VECTOR_QUANTIZATION", "none")).lower()
+        if self.quantization not in QUANTIZATIONS:
+            raise ValueError(
+                f"Unknown vector quantization '{self.quantization}'. Choose one of: {', '.join(QUANTIZATIONS)}"
+            )
+        if rescore_factor is None and os.getenv("VECTOR_RESCORE_FACTOR"):
+            rescore_factor = int(os.getenv("VECTOR_RESCORE_FACTOR"))
+        self.rescore_factor = rescore_factor or RESCORE_FACTORS.get(self.quantization, 1)
+        self.index_dir = self.db_path / f"numpy_{collection_name}"
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+        self._meta_path = self.index_dir / "meta.json"
+
+        self._lock = threading.Lock()
+        self._dim: Optional[int] = None
+        self._generation = 0
+        # Log records appended on commit, and the content hash (None: deleted) they give each ID
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_hashes: Dict[str, Optional[str]] = {}
+        self._state = self._load()
+
+    def _paths(self, generation: int) -> tuple:
+        """Vector file and document log of one generation"""
+        return (
+            self.index_dir / f"vectors_{generation}.f32",
+            self.index_dir / f"documents_{generation}.jsonl"
+        )
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        if not self._meta_path.exists():
+            return None
+        return json.loads(self._meta_path.read_text())
+
+    def _write_meta(self) -> None:
+        """Atomically point meta.json at the current generation"""
+        meta_tmp = self._meta_path.with_suffix(".tmp")
+        meta_tmp.write_text(json.dumps({"dim": self._dim, "generation": self._generation}))
+        os.replace(meta_tmp, self._meta_path)
+
+    def _load(self) -> _NumpyIndexState:
+        """Memory-map the vector file and replay the document log"""
+        self._migrate_legacy()
+        while True:
+            meta = self._read_meta()
+            state = self._read_state(meta)
+            # A compaction that switched generations meanwhile means re-reading
+            if self._read_meta() == meta:
+                return state
+
+    def _read_state(self, meta: Optional[Dict[str, Any]]) -> _NumpyIndexState:
+        if meta is None:
+            self._dim, self._generation = None, 0
+            return _NumpyIndexState([], [], [], np.zeros((0, 0), dtype=np.float32))
+
+        self._dim, self._generation = int(meta["dim"]), int(meta["generation"])
+        vectors_path, log_path = self._paths(self._generation)
+        size = vectors_path.stat().st_size if vectors_path.exists() else 0
+        total = size // (4 * self._dim)
+
+        ids: List[Optional[str]] = [None] * total
+        texts: List[Optional[str]] = [None] * total
+        metadatas: List[Dict[str, Any]] = [{}] * total
+        rows: Dict[str, int] = {}
+        if log_path.exists():
+            with open(log_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # record cut short by a crash, or still being written
+                    self._replay(json.loads(line), ids, texts, metadatas, rows)
+        return _NumpyIndexState(ids, texts, metadatas, self._map(vectors_path, total), rows)
+
+    def _map(self, vectors_path: Path, total: int) -> np.ndarray:
+        if not total:
+            return np.zeros((0, self._dim), dtype=np.float32)
+        return np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(total, self._dim))
+
+    @staticmethod
+    def _replay(
+        record: Dict[str, Any],
+        ids: List[Optional[str]],
+        texts: List[Optional[str]],
+        metadatas: List[Dict[str, Any]],
+        rows: Dict[str, int]
+    ) -> None:
+        """Apply one log record: the document's previous row (if any) becomes dead"""
+        doc_id = record["id"]
+        old = rows.pop(doc_id, None)
+        if old is not None:
+            ids[old], texts[old], metadatas[old] = None, None, {}
+        if record.get("deleted") or record["row"] >= len(ids):
+            return
+        row = record["row"]
+        ids[row], texts[row], metadatas[row] = doc_id, record["text"], record["metadata"]
+        rows[doc_id] = row
+
+    def _migrate_legacy(self) -> None:
+        """Convert an index written as vectors.f32 + documents.json to generation 0"""
+        legacy_documents = self.index_dir / "documents.json"
+        if self._meta_path.exists() or not legacy_documents.exists():
+            return
+        with open(legacy_documents, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        vectors_path, log_path = self._paths(0)
+        legacy_vectors = self.index_dir / "vectors.f32"
+        if legacy_vectors.exists():
+            os.replace(legacy_vectors, vectors_path)
+        with open(log_path, "w", encoding="utf-8") as f:
+            for row, (doc_id, text, metadata) in enumerate(zip(stored["ids"], stored["texts"], stored["metadatas"])):
+                f.write(_log_line({"id": doc_id, "row": row, "text": text, "metadata": metadata}))
+        self._dim, self._generation = int(stored["dim"]), 0
+        self._write_meta()
+        legacy_documents.unlink()
+
+    def get_hashes(self, ids: Optional[List[str]] = None) -> Dict[str, str]:
+        """Map of document ID -> content hash for `ids` (default: everything indexed)"""
+        with self._lock:
+            state = self._state
+            if ids is None:
+                hashes = {
+                    doc_id: state.metadatas[row].get("content_hash", "")
+                    for doc_id, row in state.rows.items()
+                }
+                for doc_id, content_hash in self._pending_hashes.items():
+                    if content_hash is None:
+                        hashes.pop(doc_id, None)
+                    else:
+                        hashes[doc_id] = content_hash
+                return hashes
+
+            hashes = {}
+            for doc_id in ids:
+                if doc_id in self._pending_hashes:
+                    if self._pending_hashes[doc_id] is not None:
+                        hashes[doc_id] = self._pending_hashes[doc_id]
+                elif doc_id in state.rows:
+                    hashes[doc_id] = state.metadatas[state.rows[doc_id]].get("content_hash", "")
+            return hashes
+
+    def upsert(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        with self._lock:
+            if self._dim is None:
+                self._dim = int(vectors.shape[1])
+                self._write_meta()
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Embedding size {vectors.shape[1]} does not match the index ({self._dim})")
+
+            # Updates append too: the old row goes dead when the log is replayed
+            vectors_path, _ = self._paths(self._generation)
+            row_bytes = 4 * self._dim
+            with open(vectors_path, "ab") as f:
+                end = f.seek(0, os.SEEK_END)
+                if end % row_bytes:
+                    # Partial row left by a crash
+                    end -= end % row_bytes
+                    f.truncate(end)
+                f.write(np.ascontiguousarray(vectors).tobytes())
+
+            first = end // row_bytes
+            for i, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+                self._pending.append({"id": doc_id, "row": first + i, "text": text, "metadata": metadata})
+                self._pending_hashes[doc_id] = metadata.get("content_hash", "")
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            for doc_id in ids:
+                if doc_id in self._state.rows or self._pending_hashes.get(doc_id) is not None:
+                    self._pending.append({"id": doc_id, "deleted": True})
+                    self._pending_hashes[doc_id] = None
+
+    def commit(self) -> None:
+        """Append pending records to the document log and publish them memory-mapped"""
+        with self._lock:
+            if not self._pending:
+                return
+
+            vectors_path, log_path = self._paths(self._generation)
+            with open(log_path, "a+b") as f:
+                end = f.seek(0, os.SEEK_END)
+                if end:
+                    # Drop a record cut short by a crash so the next line starts clean
+                    f.seek(max(0, end - 65536))
+                    tail = f.read()
+                    if not tail.endswith(b"\n"):
+                        f.truncate(end - len(tail) + tail.rfind(b"\n") + 1)
+                f.write("".join(_log_line(record) for record in self._pending).encode("utf-8"))
+
+            state = self._state
+            total = vectors_path.stat().st_size // (4 * self._dim)
+            grown = total - len(state.ids)
+            ids = state.ids + [None] * grown
+            texts = state.texts + [None] * grown
+            metadatas = state.metadatas + [{}] * grown
+            rows = dict(state.rows)
+            for record in self._pending:
+                self._replay(record, ids, texts, metadatas, rows)
+            state = _NumpyIndexState(ids, texts, metadatas, self._map(vectors_path, total), rows)
+
+            self._pending = []
+            self._pending_hashes = {}
+            # Codes describe the old vectors; _prepare rebuilds them if needed
+            remove_codes(self.index_dir)
+            if state.dead_rows > len(state.rows):
+                state = self._compact(state)
+            self._state = state
+
+    def _compact(self, state: _NumpyIndexState) -> _NumpyIndexState:
+        """Stream the live rows into the next generation and drop the old files"""
+        old_paths = self._paths(self._generation)
+        generation = self._generation + 1
+        vectors_path, log_path = self._paths(generation)
+        live = sorted(state.rows.values())
+
+        with open(vectors_path, "wb") as vectors_file, open(log_path, "w", encoding="utf-8") as log_file:
+            for start in range(0, len(live), self.COMPACT_BATCH):
+                block = live[start:start + self.COMPACT_BATCH]
+                vectors_file.write(np.ascontiguousarray(state.matrix[block]).tobytes())
+                log_file.write("".join(
+                    _log_line({
+                        "id": state.ids[row],
+                        "row": start + i,
+                        "text": state.texts[row],
+                        "metadata": state.metadatas[row]
+                    })
+                    for i, row in enumerate(block)
+                ))
+
+        self._generation = generation
+        self._write_meta()
+        for path in old_paths:
+            try:
+                path.unlink()
+            except OSError:
+                pass  # still mapped (Windows); removed by clear()
+
+        return _NumpyIndexState(
+            [state.ids[row] for row in live],
+            [state.texts[row] for row in live],
+            [state.metadatas[row] for row in live],
+            self._map(vectors_path, len(live))
+        )
+
+    def _prepare(self, state: _NumpyIndexState) -> None:
+        """Build the live-row mask, filter columns and codes of a snapshot on first use"""
+        if state.ready:
+            return
+        with state.lock:
+            if state.ready:
+                return
+            if state.dead_rows:
+                state.live = np.fromiter((doc_id is not None for doc_id in state.ids), dtype=bool, count=len(state.ids))
+            if self.quantization != "none" and state.rows:
+                if self.persist_codes:
+                    state.codes = load_or_build_codes(self.quantization, self.index_dir, state.matrix, self._generation)
+                else:
+                    state.codes = CODES[self.quantization].build(state.matrix)
+            state.filters = MetadataColumns(state.metadatas)
+            state.ready = True
+
+    def query(
+        self,
+        embeddings: np.ndarray,
+        n_results: int,
+        where: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Top-k by cosine similarity for each query embedding (exact, or shortlisted by codes and rescored)"""
+        state = self._state
+        queries = np.asarray(embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        if not state.rows:
+            return [[] for _ in range(len(queries))]
+
+        self._prepare(state)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        mask = state.live
+        if where:
+            mask = state.where_mask(where) if mask is None else mask & state.where_mask(where)
+        candidates = len(state.ids) if mask is None else int(mask.sum())
+        k = min(n_results, candidates)
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        if state.codes is None:
+            scores = queries @ state.matrix.T
+            if mask is not None:
+                scores[:, ~mask] = -np.inf
+            top, top_scores = _top_k(scores, k)
+        else:
+            top, top_scores = self._rescored_top_k(state, queries, k, min(k * self.rescore_factor, candidates), mask)
+
+        formatted_results = []
+        for rows, row_scores in zip(top, top_scores):
+            formatted_results.append([
+                {
+                    "id": state.ids[row],
+                    "text": state.texts[row],
+                    "metadata": dict(state.metadatas[row]),
+                    "distance": max(0.0, 2.0 - 2.0 * float(score))
+                }
+                for row, score in zip(rows, row_scores)
+            ])
+        return formatted_results
+
+    @staticmethod
+    def _rescored_top_k(
+        state: _NumpyIndexState,
+        queries: np.ndarray,
+        k: int,
+        shortlist: int,
+        mask: Optional[np.ndarray]
+    ) -> tuple:
+        """Shortlist rows by their codes, then rank the shortlist by exact cosine"""
+        approximate = state.codes.scores(queries)
+        if mask is not None:
+            approximate[:, ~mask] = -np.inf
+        candidates, _ = _top_k(approximate, shortlist)
+
+        top = np.empty((len(queries), k), dtype=np.int64)
+        top_scores = np.empty((len(queries), k), dtype=np.float32)
+        for q, rows in enumerate(candidates):
+            # Sorted rows read the memory-mapped vectors front to back
+            rows = np.sort(rows)
+            exact = state.matrix[rows] @ queries[q]
+            best, best_scores = _top_k(exact[None, :], k)
+            top[q], top_scores[q] = rows[best[0]], best_scores[0]
+        return top, top_scores
+
+    def get_by_ids(self, ids: List[str], embedding: np.ndarray) -> List[Dict[str, Any]]:
+        """Documents by ID, with their distance to `embedding` (same metric as query)"""
+        state = self._state
+        rows = [state.rows[doc_id] for doc_id in ids if doc_id in state.rows]
+        if not rows:
+            return []
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = state.matrix[rows] @ query
+        return [
+            {
+                "id": state.ids[row],
+                "text": state.texts[row],
+                "metadata": dict(state.metadatas[row]),
+                "distance": max(0.0, 2.0 - 2.0 * float(score))
+            }
+            for row, score in zip(rows, scores)
+        ]
+
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Every indexed document (id, text, metadata), a page at a time"""
+        state = self._state
+        live = sorted(state.rows.values())
+        for start in range(0, len(live), batch_size):
+            yield [
+                {"id": state.ids[row], "text": state.texts[row], "metadata": state.metadatas[row]}
+                for row in live[start:start + batch_size]
+            ]
+
+    def count(self) -> int:
+        return len(self._state.rows)
+
+    def reload(self) -> None:
+        """Re-map the index after another process committed to it (pending writes win)"""
+        with self._lock:
+            if not self._pending:
+                self._state = self._load()
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._meta_path.exists():
+                self._meta_path.unlink()
+            for pattern in ("vectors_*.f32", "documents_*.jsonl", "vectors.f32", "documents.json"):
+                for path in self.index_dir.glob(pattern):
+                    path.unlink()
+            remove_codes(self.index_dir)
+            self._pending = []
+            self._pending_hashes = {}
+            self._state = self._load()
+
+    def stats(self) -> Dict[str, Any]:
+        state = self._state
+        if state.rows:
+            self._prepare(state)
+        return {
+            "collection_name": self.collection_name,
+            "index_path": str(self.index_dir),
+            "quantization": self.quantization,
+            "rescore_factor": self.rescore_factor if state.codes is not None else None,
+            "vector_bytes": int(state.matrix.nbytes),
+            "dead_rows": state.dead_rows,
+            "scan_bytes": int(state.codes.nbytes if state.codes is not None else state.matrix.nbytes)
+        }
+
+
+def _log_line(record: Dict[str, Any]) -> str:
+    """One document-log record as a JSON line"""
+    return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+def _top_k(scores: np.ndarray, k: int) -> tuple:
+    """Columns of the `k` highest scores per row, best first, and those scores"""
+    if k < scores.shape[1]:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.tile(np.arange(scores.shape[1]), (len(scores), 1))
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+BACKENDS = {
+    ChromaBackend.name: ChromaBackend,
+    NumpyBackend.name: NumpyBackend
+}
+
+
+def create_backend(name: str, db_path: str, quantization: Optional[str] = None):
+    """
+    Instantiate a retrieval backend by name ("chroma" or "numpy")
+
+    `quantization` (default: VECTOR_QUANTIZATION) only applies to the NumPy
+    backend; ChromaDB always stores float32 vectors.
+    """
+    try:
+        backend_class = BACKENDS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown vector backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    if backend_class is NumpyBackend:
+        return NumpyBackend(db_path, quantization=quantization)
+    if (quantization or os.getenv("VECTOR_QUANTIZATION", "none")).lower() != "none":
+        print(f"✗ Warning: vector quantization needs VECTOR_BACKEND=numpy, {name} stores float32")
+    return backend_class(db_path)
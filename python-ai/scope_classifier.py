@@ -0,0 +1,179 @@
+"""
+Scope Classifier for Ubuzima Hub AI System
+Decides in one regex pass whether a question is within Rwanda NISR data
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Vocabulary categories, in the order they decide a question's scope
+OTHER_COUNTRY = "other_country"
+RWANDA_PLACE = "rwanda_place"
+RWANDA_TERM = "rwanda_term"
+GENERAL_TOPIC = "general_topic"
+
+# Reason codes returned by ScopeClassifier.classify
+REASON_OTHER_COUNTRY = "other_country"
+REASON_GENERAL_TOPIC = "general_topic"
+REASON_RWANDA_TERM = "rwanda_term"
+REASON_RWANDA_PLACE = "rwanda_place"
+REASON_NO_SIGNAL = "no_signal"
+
+# Gazetteer names that are ordinary words on their own ("western diet", "southern region");
+# they count as places only when qualified ("Southern Province")
+COMPASS_WORDS = {"north", "south", "east", "west", "northern", "southern", "eastern", "western", "central"}
+PLACE_QUALIFIER = "province"
+
+
+@dataclass(frozen=True)
+class ScopeDecision:
+    """
+    Outcome of scope classification
+
+    Attributes:
+        in_scope: False if the question must be rejected
+        rwanda_related: True if the question mentions Rwanda or its data
+        reason: One of the REASON_* codes
+        matched: The vocabulary term behind the decision, if any
+    """
+    in_scope: bool
+    rwanda_related: bool
+    reason: str
+    matched: Optional[str] = None
+
+
+def _normalize(term: str) -> str:
+    return " ".join(term.lower().split())
+
+
+def trie_pattern(terms: Iterable[str]) -> str:
+    """
+    Regex matching any of `terms`, factored as a prefix trie
+
+    Each alternative branches on one character, so the regex engine
+    follows a single path per position instead of trying every term.
+    Spaces inside terms match any run of whitespace.
+    """
+    trie: Dict[str, dict] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        ends_here = "" in node
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + build(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            # Longer terms first (greedy), falling back to the shorter one
+            body = body + "?" if len(branches) == 1 and len(body) == 1 else "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+def load_gazetteer(path: Path) -> List[str]:
+    """
+    Place names from a GeoJSON gazetteer (features[].properties.name)
+
+    A bare compass word ("Southern") is returned qualified ("Southern
+    Province"), so it does not make every "southern region" a Rwanda place.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    names = [
+        feature["properties"]["name"]
+        for feature in data.get("features", [])
+        if feature.get("properties", {}).get("name")
+    ]
+    return [f"{name} {PLACE_QUALIFIER}" if _normalize(name) in COMPASS_WORDS else name for name in names]
+
+
+class ScopeClassifier:
+    """
+    Single-pass scope gate for chatbot questions
+
+    All vocabularies are compiled into one word-bounded trie regex, so
+    classifying a question is one `finditer` over it: the cost grows with
+    the question's length, not with the number of vocabulary terms. Word
+    boundaries keep short terms such as "rwa" or "usa" from matching inside
+    other words ("causal").
+
+    Rules (first match wins):
+        other country mentioned          -> out of scope (other_country)
+        general topic, no Rwanda signal  -> out of scope (general_topic)
+        Rwanda term or place mentioned   -> in scope (rwanda_term / rwanda_place)
+        otherwise                        -> in scope (no_signal)
+    """
+
+    def __init__(self, vocabularies: Dict[str, Iterable[str]]):
+        self.categories: Dict[str, str] = {}
+        # Later categories never override earlier ones for the same term
+        for category in (RWANDA_PLACE, RWANDA_TERM, OTHER_COUNTRY, GENERAL_TOPIC):
+            for term in vocabularies.get(category, []):
+                self.categories.setdefault(_normalize(term), category)
+
+        self.pattern = re.compile(
+            r"(?<!\w)(?:" + trie_pattern(self.categories) + r")(?!\w)",
+            re.IGNORECASE
+        )
+
+    @classmethod
+    def from_config(cls, config_path: str, data_folder: Optional[str] = None) -> "ScopeClassifier":
+        """
+        Load vocabularies from a JSON file
+
+        Keys: rwanda_terms, other_countries, general_topics and
+        rwanda_gazetteers (GeoJSON files, relative to `data_folder`, whose
+        feature names count as Rwanda places).
+        """
+        config_path = Path(config_path)
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+
+        places: List[str] = []
+        folder = Path(data_folder) if data_folder else config_path.parent
+        for name in config.get("rwanda_gazetteers", []):
+            path = folder / name
+            if path.exists():
+                places.extend(load_gazetteer(path))
+            else:
+                print(f"✗ Warning: gazetteer {path} not found")
+
+        return cls({
+            RWANDA_PLACE: places,
+            RWANDA_TERM: config.get("rwanda_terms", []),
+            OTHER_COUNTRY: config.get("other_countries", []),
+            GENERAL_TOPIC: config.get("general_topics", [])
+        })
+
+    def matches(self, query: str) -> Dict[str, str]:
+        """First matched term of each category found in `query`"""
+        found: Dict[str, str] = {}
+        for match in self.pattern.finditer(query):
+            term = _normalize(match.group(0))
+            found.setdefault(self.categories[term], term)
+        return found
+
+    def classify(self, query: str) -> ScopeDecision:
+        found = self.matches(query)
+        rwanda_related = RWANDA_TERM in found or RWANDA_PLACE in found
+
+        if OTHER_COUNTRY in found:
+            return ScopeDecision(False, rwanda_related, REASON_OTHER_COUNTRY, found[OTHER_COUNTRY])
+        if GENERAL_TOPIC in found and not rwanda_related:
+            return ScopeDecision(False, False, REASON_GENERAL_TOPIC, found[GENERAL_TOPIC])
+        if RWANDA_TERM in found:
+            return ScopeDecision(True, True, REASON_RWANDA_TERM, found[RWANDA_TERM])
+        if RWANDA_PLACE in found:
+            return ScopeDecision(True, True, REASON_RWANDA_PLACE, found[RWANDA_PLACE])
+        return ScopeDecision(True, False, REASON_NO_SIGNAL)
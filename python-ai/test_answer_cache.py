@@ -0,0 +1,45 @@
+"""
+Tests for AnswerCache semantic (near-duplicate) hits
+"""
+
+import numpy as np
+
+from answer_cache import AnswerCache
+
+VERSION = "v1"
+
+
+def _embedding(seed: int, noise: float = 0.0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=32) + noise
+
+
+def test_near_duplicate_question_over_different_data_misses():
+    cache = AnswerCache()
+    base = _embedding(0)
+    musanze = ["nutrition_10", "nutrition_11", "nutrition_12"]
+    rubavu = ["nutrition_40", "nutrition_41", "nutrition_42"]
+
+    cache.put(
+        "What is the stunting rate in Musanze district?", base, musanze, VERSION,
+        response={"answer": "Musanze: 45%"}, latency=1.0
+    )
+    # Embeds almost identically, but retrieval found another district's rows
+    nearby = base + 0.01 * _embedding(1)
+    assert cache.get("What is the stunting rate in Rubavu district?", nearby, rubavu, VERSION) is None
+    assert cache.stats()["semantic_hits"] == 0
+
+
+def test_near_duplicate_question_over_same_data_hits():
+    cache = AnswerCache()
+    base = _embedding(0)
+    documents = ["nutrition_10", "nutrition_11", "nutrition_12"]
+
+    cache.put(
+        "What is the stunting rate in Musanze district?", base, documents, VERSION,
+        response={"answer": "Musanze: 45%"}, latency=1.0
+    )
+    nearby = base + 0.01 * _embedding(1)
+    hit = cache.get("Stunting rate in Musanze district please", nearby, documents, VERSION)
+    assert hit is not None and hit["cache_hit"] == "semantic"
+    assert hit["answer"] == "Musanze: 45%"
@@ -0,0 +1,102 @@
+"""
+Tests for api_server startup, readiness, streaming and /indicators errors
+Runs offline: the chatbot is replaced by a stub, so no model, index or API key is needed
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+import api_server
+from indicator_cube import IndicatorCube, default_cube_path
+
+
+class StubGateway:
+    def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+
+class StubChatbot:
+    def __init__(self, **kwargs):
+        self.llm = StubGateway()
+
+
+def test_ready_after_lazy_build_when_warmup_is_off(monkeypatch):
+    monkeypatch.setenv("WARMUP_ON_STARTUP", "false")
+    monkeypatch.setattr(api_server, "NISRAIChatbot", StubChatbot)
+    monkeypatch.setattr(api_server, "chatbot", None)
+    # The lifespan shuts the executor down on exit; keep the module's own for other tests
+    monkeypatch.setattr(api_server, "chat_executor", ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(api_server, "startup_state", {
+        "ready": False,
+        "error": None,
+        "model_load_seconds": None,
+        "warmup_seconds": None,
+        "cold_start_seconds": None
+    })
+
+    with TestClient(api_server.app) as client:
+        starting = client.get("/ready")
+        assert starting.status_code == 503
+        assert starting.json()["status"] == "starting"
+
+        # The first request builds the chatbot
+        assert client.get("/health").status_code == 200
+
+        ready = client.get("/ready")
+        assert ready.status_code == 200
+        assert ready.json()["status"] == "ready"
+        assert ready.json()["cold_start_seconds"] is not None
+
+
+class StreamingChatbot(StubChatbot):
+    """Streams a fixed answer, like achat_stream"""
+
+    async def achat_stream(self, query, executor=None, options=None):
+        yield {"event": "token", "data": {"text": f"Answer to: {query}"}}
+        yield {"event": "done", "data": {}}
+
+
+def test_chat_stream_takes_no_slot_until_the_body_is_read(monkeypatch):
+    limiter = api_server.ConcurrencyLimiter(max_concurrent=1, max_queued=0, queue_timeout=1.0)
+    monkeypatch.setattr(api_server, "chat_limiter", limiter)
+    monkeypatch.setattr(api_server, "chatbot", StreamingChatbot())
+
+    async def open_without_reading():
+        return await api_server.chat_stream(api_server.ChatRequest(query="What is the stunting rate in Rwanda?"))
+
+    # A client that disconnects before the body starts must not leak the slot
+    asyncio.run(open_without_reading())
+    assert limiter.active == 0
+
+    response = TestClient(api_server.app).post("/chat/stream", json={"query": "What is the stunting rate in Rwanda?"})
+    assert "Answer to: What is the stunting rate in Rwanda?" in response.text
+    assert limiter.active == 0
+
+
+def test_chat_stream_reports_a_busy_server_in_the_stream(monkeypatch):
+    limiter = api_server.ConcurrencyLimiter(max_concurrent=0, max_queued=0, queue_timeout=0.1)
+    monkeypatch.setattr(api_server, "chat_limiter", limiter)
+    monkeypatch.setattr(api_server, "chatbot", StreamingChatbot())
+
+    response = TestClient(api_server.app).post("/chat/stream", json={"query": "What is the stunting rate in Rwanda?"})
+    assert "event: error" in response.text and "Server busy" in response.text
+    assert response.text.rstrip().endswith("data: {}")
+    assert limiter.rejected == 1
+
+
+def test_indicator_series_errors(monkeypatch):
+    monkeypatch.setenv("DATA_FOLDER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data"))
+    monkeypatch.setattr(api_server, "indicator_cube", IndicatorCube.from_csv(default_cube_path()))
+    client = TestClient(api_server.app)
+
+    assert client.get("/indicators/NUTSTUNTINGPREV/series?dimension=SEX&name=Female").status_code == 200
+    # A malformed request is not a missing resource
+    assert client.get("/indicators/NUTSTUNTINGPREV/series?name=Female").status_code == 400
+    assert client.get("/indicators/NOSUCHCODE/series").status_code == 404
+    assert client.get("/indicators/NUTSTUNTINGPREV/series?dimension=NOSUCH").status_code == 404
@@ -0,0 +1,113 @@
+"""
+Tests for NISRAIChatbot.chat_many and the /chat/batch endpoint
+Runs offline: hashing embedder, numpy backend and an LLM stub that echoes the question
+"""
+
+import asyncio
+import os
+import re
+import threading
+from typing import Dict, List
+
+import pytest
+
+from offline_stubs import StubLLM, make_indexer
+from chatbot import NISRAIChatbot
+from data_loader import NISRDataLoader
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+
+class EchoLLM(StubLLM):
+    """Answers with the question it was asked, so each answer identifies its query"""
+
+    def complete(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        self.calls += 1
+        question = re.search(r"User Question: (.*)\n", messages[-1]["content"]).group(1)
+        return f"Answer to: {question}"
+
+
+@pytest.fixture(scope="module")
+def chatbot(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("chat_many")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("DATA_FOLDER", DATA_FOLDER)
+        patch.setenv("DATASET_CACHE_DIR", str(workdir / "dataset_cache"))
+        patch.setenv("RELEVANCE_MAX_DISTANCE", "")
+        patch.setenv("ANSWER_CACHE_SIZE", "0")
+
+        loader = NISRDataLoader(DATA_FOLDER)
+        loader.load_datasets()
+        indexer = make_indexer(str(workdir / "vectordb"), "numpy", None)
+        indexer.index_documents(loader.prepare_documents(), incremental=False)
+
+        bot = NISRAIChatbot(indexer=indexer, llm=EchoLLM())
+        yield bot
+        indexer.close()
+
+
+def test_chat_many_returns_one_answer_per_query_in_order(chatbot):
+    queries = [
+        "How does exclusive breastfeeding in Rwanda differ between the poorest and richest households?",
+        "What is the stunting rate in Kenya?",
+        "What surveys has NISR conducted about nutrition?"
+    ]
+    results = chatbot.chat_many(queries)
+
+    assert len(results) == len(queries)
+    assert results[0]["answer"] == f"Answer to: {queries[0]}"
+    assert results[1]["is_relevant"] is False
+    assert results[2]["answer"] == f"Answer to: {queries[2]}"
+
+
+MIXED_QUERIES = [
+    "What is the stunting rate in Kenya?",
+    "How does exclusive breastfeeding in Rwanda differ between the poorest and richest households?",
+    "What is the stunting rate among children in Rwanda?",
+    "Who is the president of France?",
+    "What surveys has NISR conducted about nutrition?"
+]
+
+
+def check_mixed_results(results: List[Dict]) -> None:
+    """Out-of-scope, indicator-engine and LLM answers each land at their query's position"""
+    assert len(results) == len(MIXED_QUERIES)
+    assert results[0]["is_relevant"] is False
+    assert results[1]["answer"] == f"Answer to: {MIXED_QUERIES[1]}"
+    assert results[2]["answered_by"] == "indicator_engine"
+    assert "Stunting" in results[2]["answer"]
+    assert results[3]["is_relevant"] is False
+    assert results[4]["answer"] == f"Answer to: {MIXED_QUERIES[4]}"
+
+
+def test_chat_many_keeps_order_across_answer_paths(chatbot):
+    check_mixed_results(chatbot.chat_many(MIXED_QUERIES))
+
+
+def test_chat_batch_endpoint_keeps_order(chatbot, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import api_server
+
+    monkeypatch.setattr(api_server, "chatbot", chatbot)
+    response = TestClient(api_server.app).post("/chat/batch", json={"queries": MIXED_QUERIES})
+    assert response.status_code == 200, response.text
+    check_mixed_results(response.json()["results"])
+
+
+def test_achat_embeds_off_the_event_loop(chatbot, monkeypatch):
+    # With the answer cache on, the cache key embeds the query too
+    monkeypatch.setattr(chatbot.answer_cache, "max_entries", 16)
+    embed = chatbot.indexer.embed
+    loop_threads = []
+
+    def recording_embed(texts):
+        loop_threads.append(threading.current_thread() is threading.main_thread())
+        return embed(texts)
+
+    monkeypatch.setattr(chatbot.indexer, "embed", recording_embed)
+    query = "What surveys has NISR conducted about nutrition?"
+    result = asyncio.run(chatbot.achat(query))
+
+    assert result["answer"] == f"Answer to: {query}"
+    assert loop_threads and not any(loop_threads)
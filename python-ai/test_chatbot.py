@@ -11,6 +11,91 @@ from chatbot import NISRAIChatbot
 # Load environment
 load_dotenv()
 
+# Shared with calibrate_relevance.py
+TEST_CASES = [
+    {
+        "name": "Valid Rwanda nutrition question",
+        "query": "What is the stunting rate among children in Rwanda?",
+        "expected_relevant": True,
+        "expected_context": True
+    },
+    {
+        "name": "Valid survey metadata question",
+        "query": "What surveys has NISR conducted about nutrition?",
+        "expected_relevant": True,
+        "expected_context": True
+    },
+    {
+        "name": "Rwanda question with no data",
+        "query": "What is the GDP of Rwanda in 2025?",
+        "expected_relevant": True,
+        "expected_context": False
+    },
+    {
+        "name": "Out of scope - other country",
+        "query": "What is the stunting rate in Kenya?",
+        "expected_relevant": False,
+        "expected_context": False
+    },
+    {
+        "name": "Out of scope - general topic",
+        "query": "What is the weather like today?",
+        "expected_relevant": False,
+        "expected_context": False
+    },
+    {
+        "name": "Specific indicator query",
+        "query": "What is the prevalence of anemia in Rwandan women?",
+        "expected_relevant": True,
+        "expected_context": True
+    },
+    {
+        "name": "Breakdown by wealth quintile",
+        "query": "How does exclusive breastfeeding in Rwanda differ between the poorest and richest households?",
+        "expected_relevant": True,
+        "expected_context": True
+    },
+    {
+        "name": "Survey coverage question",
+        "query": "When was the Rwanda Demographic and Health Survey conducted?",
+        "expected_relevant": True,
+        "expected_context": True
+    },
+    {
+        "name": "Rwanda question with no data - economy",
+        "query": "What was Rwanda's inflation rate last month?",
+        "expected_relevant": True,
+        "expected_context": False
+    },
+    {
+        "name": "Rwanda question with no data - tourism",
+        "query": "How many tourists visited Kigali's national parks in 2023?",
+        "expected_relevant": True,
+        "expected_context": False
+    },
+    {
+        "name": "Out of scope - compass word is not a province",
+        "query": "What is the weather in the southern region?",
+        "expected_relevant": False,
+        "expected_context": False,
+        "expected_scope_reason": "general_topic"
+    },
+    {
+        "name": "Compass word is not a Rwanda place",
+        "query": "What are the western diet trends?",
+        "expected_relevant": True,
+        "expected_context": False,
+        "expected_scope_reason": "no_signal"
+    },
+    {
+        "name": "Rwanda province named",
+        "query": "How many children are underweight in the Southern Province?",
+        "expected_relevant": True,
+        "expected_context": True,
+        "expected_scope_reason": "rwanda_place"
+    }
+]
+
 
 def test_chatbot():
     """Run comprehensive tests"""
@@ -27,50 +112,10 @@ def test_chatbot():
         chatbot = NISRAIChatbot()
         print("✓ Chatbot initialized successfully\n")
         
-        # Test cases
-        test_cases = [
-            {
-                "name": "Valid Rwanda nutrition question",
-                "query": "What is the stunting rate among children in Rwanda?",
-                "expected_relevant": True,
-                "expected_context": True
-            },
-            {
-                "name": "Valid survey metadata question",
-                "query": "What surveys has NISR conducted about nutrition?",
-                "expected_relevant": True,
-                "expected_context": True
-            },
-            {
-                "name": "Rwanda question with no data",
-                "query": "What is the GDP of Rwanda in 2025?",
-                "expected_relevant": True,
-                "expected_context": False
-            },
-            {
-                "name": "Out of scope - other country",
-                "query": "What is the stunting rate in Kenya?",
-                "expected_relevant": False,
-                "expected_context": False
-            },
-            {
-                "name": "Out of scope - general topic",
-                "query": "What is the weather like today?",
-                "expected_relevant": False,
-                "expected_context": False
-            },
-            {
-                "name": "Specific indicator query",
-                "query": "What is the prevalence of anemia in Rwandan women?",
-                "expected_relevant": True,
-                "expected_context": True
-            }
-        ]
-        
         passed = 0
         failed = 0
         
-        for i, test in enumerate(test_cases, 1):
+        for i, test in enumerate(TEST_CASES, 1):
             print(f"\n{i}. Testing: {test['name']}")
             print(f"   Query: \"{test['query']}\"")
             
@@ -89,6 +134,13 @@ def test_chatbot():
             else:
                 checks.append(f"✗ Context usage (expected {test['expected_context']}, got {result['context_used']})")
             
+            if "expected_scope_reason" in test:
+                reason = chatbot.scope_classifier.classify(test['query']).reason
+                if reason == test['expected_scope_reason']:
+                    checks.append("✓ Scope reason")
+                else:
+                    checks.append(f"✗ Scope reason (expected {test['expected_scope_reason']}, got {reason})")
+            
             # Print results
             for check in checks:
                 print(f"   {check}")
@@ -102,7 +154,7 @@ def test_chatbot():
         
         # Summary
         print("\n" + "="*60)
-        print(f"Test Results: {passed} passed, {failed} failed out of {len(test_cases)} tests")
+        print(f"Test Results: {passed} passed, {failed} failed out of {len(TEST_CASES)} tests")
         print("="*60)
         
         if failed == 0:
@@ -0,0 +1,209 @@
+"""
+Tests for LLMGateway against llm_stub_server
+Each stub runs in its own process on an ephemeral port; failures are injected through POST /stub/config
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict
+
+import httpx
+import pytest
+
+from chatbot import NISRAIChatbot
+from llm_gateway import LLMEndpoint, LLMGateway, LLMUnavailableError
+from offline_stubs import make_indexer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MESSAGES = [{"role": "user", "content": "What is the stunting rate in Rwanda?"}]
+DEFAULTS = {"latency": 0.0, "fail_status": 503, "fail_next": 0, "fail_rate": 0.0, "retry_after": 0.0}
+
+
+class StubServer:
+    """llm_stub_server.py in a subprocess"""
+
+    def __init__(self, answer: str):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.answer = answer
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "llm_stub_server.py"), "--port", str(self.port)],
+            cwd=HERE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + 20
+        while True:
+            try:
+                httpx.get(f"{self.url}/stub/stats", timeout=1.0)
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline or self.process.poll() is not None:
+                    self.stop()
+                    raise RuntimeError("LLM stub server did not start")
+                time.sleep(0.1)
+
+    def configure(self, **settings) -> None:
+        httpx.post(f"{self.url}/stub/config", json=settings, timeout=5.0).raise_for_status()
+
+    def requests(self) -> int:
+        return httpx.get(f"{self.url}/stub/stats", timeout=5.0).json()["requests"]
+
+    def endpoint(self, name: str) -> LLMEndpoint:
+        return LLMEndpoint(name, f"{self.url}/v1", "stub-key", "stub-model")
+
+    def stop(self) -> None:
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+@pytest.fixture(scope="module")
+def servers():
+    primary, fallback = StubServer("Primary answer."), StubServer("Fallback answer.")
+    yield primary, fallback
+    primary.stop()
+    fallback.stop()
+
+
+@pytest.fixture
+def stubs(servers):
+    for server in servers:
+        server.configure(**DEFAULTS, answer=server.answer)
+    return servers
+
+
+def make_gateway(*endpoints: LLMEndpoint, **settings: Any) -> LLMGateway:
+    options: Dict[str, Any] = {"timeout": 5.0, "max_retries": 2, "backoff_base": 0.01, "backoff_max": 0.05}
+    options.update(settings)
+    return LLMGateway(list(endpoints), **options)
+
+
+def test_retries_retryable_failures(stubs):
+    primary, _ = stubs
+    primary.configure(fail_next=2, fail_status=429)
+    gateway = make_gateway(primary.endpoint("primary"))
+    before = primary.requests()
+
+    assert gateway.complete(MESSAGES, temperature=0.1, max_tokens=50) == "Primary answer."
+    assert primary.requests() - before == 3
+    counts = gateway.stats()["endpoints"]["primary"]
+    assert counts["retries"] == 2 and counts["failures"] == 2 and counts["successes"] == 1
+    gateway.close()
+
+
+def test_async_retries_retryable_failures(stubs):
+    primary, _ = stubs
+    primary.configure(fail_next=1)
+    gateway = make_gateway(primary.endpoint("primary"))
+
+    async def ask() -> str:
+        try:
+            return await gateway.acomplete(MESSAGES, temperature=0.1, max_tokens=50)
+        finally:
+            await gateway.aclose()
+
+    assert asyncio.run(ask()) == "Primary answer."
+    assert gateway.stats()["endpoints"]["primary"]["retries"] == 1
+
+
+def test_does_not_retry_bad_requests(stubs):
+    primary, _ = stubs
+    primary.configure(fail_next=1, fail_status=400)
+    gateway = make_gateway(primary.endpoint("primary"))
+    before = primary.requests()
+
+    with pytest.raises(Exception) as raised:
+        gateway.complete(MESSAGES, temperature=0.1, max_tokens=50)
+    assert not isinstance(raised.value, LLMUnavailableError)
+    assert primary.requests() - before == 1
+    gateway.close()
+
+
+def test_deadline_covers_every_attempt(stubs):
+    primary, _ = stubs
+    primary.configure(latency=2.0)
+    gateway = make_gateway(primary.endpoint("primary"), timeout=0.5)
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        gateway.complete(MESSAGES, temperature=0.1, max_tokens=50)
+    assert time.monotonic() - started < 1.5
+    gateway.close()
+
+
+def test_circuit_breaker_opens_and_resets(stubs):
+    primary, _ = stubs
+    primary.configure(fail_next=2)
+    gateway = make_gateway(primary.endpoint("primary"), max_retries=0, breaker_failures=2, breaker_reset=0.5)
+
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            gateway.complete(MESSAGES, temperature=0.1, max_tokens=50)
+    assert gateway.stats()["endpoints"]["primary"]["circuit"] == "open"
+
+    # Open circuit: refused without reaching the server
+    before = primary.requests()
+    with pytest.raises(LLMUnavailableError, match="circuit open"):
+        gateway.complete(MESSAGES, temperature=0.1, max_tokens=50)
+    assert primary.requests() == before
+    assert gateway.stats()["endpoints"]["primary"]["rejected"] == 1
+
+    # After the reset window one probe goes through and closes it again
+    time.sleep(0.6)
+    assert gateway.complete(MESSAGES, temperature=0.1, max_tokens=50) == "Primary answer."
+    assert gateway.stats()["endpoints"]["primary"]["circuit"] == "closed"
+    gateway.close()
+
+
+def test_fails_over_to_the_fallback_endpoint(stubs):
+    primary, fallback = stubs
+    primary.configure(fail_rate=1.0)
+    gateway = make_gateway(primary.endpoint("primary"), fallback.endpoint("fallback"), max_retries=1)
+
+    assert gateway.complete(MESSAGES, temperature=0.1, max_tokens=50) == "Fallback answer."
+    stats = gateway.stats()
+    assert stats["failovers"] == 1
+    assert stats["endpoints"]["primary"]["failures"] == 2
+    assert stats["endpoints"]["fallback"]["successes"] == 1
+    gateway.close()
+
+
+def test_unavailable_when_every_endpoint_fails(stubs):
+    primary, fallback = stubs
+    primary.configure(fail_rate=1.0)
+    fallback.configure(fail_rate=1.0)
+    gateway = make_gateway(primary.endpoint("primary"), fallback.endpoint("fallback"), max_retries=1)
+
+    with pytest.raises(LLMUnavailableError):
+        gateway.complete(MESSAGES, temperature=0.1, max_tokens=50)
+    gateway.close()
+
+
+def test_chatbot_answers_with_an_error_when_the_llm_is_unavailable(stubs, tmp_path, monkeypatch):
+    primary, _ = stubs
+    primary.configure(fail_rate=1.0)
+    monkeypatch.setenv("DATA_FOLDER", os.path.join(HERE, "..", "data"))
+    monkeypatch.setenv("DATASET_CACHE_DIR", str(tmp_path / "dataset_cache"))
+    monkeypatch.setenv("RELEVANCE_MAX_DISTANCE", "")
+    monkeypatch.setenv("ANSWER_CACHE_SIZE", "0")
+
+    indexer = make_indexer(str(tmp_path / "vectordb"), "numpy", None)
+    indexer.index_documents([{
+        "id": "nutrition_0",
+        "text": "Exclusive breastfeeding in Rwanda: 87% of infants in the poorest households, 79% in the richest.",
+        "metadata": {"source": "nutrition", "indicator": "Exclusive breastfeeding"}
+    }], incremental=False)
+    gateway = make_gateway(primary.endpoint("primary"), max_retries=0)
+    bot = NISRAIChatbot(indexer=indexer, llm=gateway)
+
+    result = bot.chat("How does exclusive breastfeeding in Rwanda differ between the poorest and richest households?")
+    assert "LLM service unavailable" in result["error"]
+    assert result["answer"].startswith("Error processing request")
+    gateway.close()
+    indexer.close()
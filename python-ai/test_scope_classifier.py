@@ -0,0 +1,63 @@
+"""
+Tests for ScopeClassifier (the chatbot's scope gate)
+Runs offline against scope_vocabulary.json and the data/rw.json gazetteer
+"""
+
+import os
+
+import pytest
+
+from scope_classifier import ScopeClassifier
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return ScopeClassifier.from_config(
+        os.path.join(HERE, "scope_vocabulary.json"),
+        data_folder=os.path.join(HERE, "..", "data")
+    )
+
+
+@pytest.mark.parametrize("query, in_scope, reason, matched", [
+    # Rwanda terms and places
+    ("What is the stunting rate among children in Rwanda?", True, "rwanda_term", "stunting"),
+    ("What is the weather in Kigali?", True, "rwanda_term", "kigali"),
+    ("How many children are underweight in the Southern Province?", True, "rwanda_place", "southern province"),
+    # Other countries, including multi-word names
+    ("What is the stunting rate in Kenya?", False, "other_country", "kenya"),
+    ("What is the stunting rate in the USA?", False, "other_country", "usa"),
+    ("How is nutrition in Antigua and Barbuda?", False, "other_country", "antigua and barbuda"),
+    # General topics without a Rwanda signal
+    ("What is the weather like today?", False, "general_topic", "weather"),
+    ("What is the weather in the southern region?", False, "general_topic", "weather"),
+])
+def test_classify(classifier, query, in_scope, reason, matched):
+    decision = classifier.classify(query)
+    assert (decision.in_scope, decision.reason, decision.matched) == (in_scope, reason, matched)
+
+
+@pytest.mark.parametrize("query", [
+    # "usa" inside "causal", "rwa" inside "drawback"
+    "Is there a causal link between diet and growth?",
+    "What is the drawback of this approach?",
+    # Compass words are places only as "<compass> Province"
+    "What are the western diet trends?",
+    "Is the northern hemisphere colder?",
+])
+def test_words_inside_words_and_bare_compass_words_are_no_signal(classifier, query):
+    decision = classifier.classify(query)
+    assert decision.in_scope and not decision.rwanda_related
+    assert decision.reason == "no_signal"
+
+
+def test_causal_does_not_hide_a_rwanda_term(classifier):
+    decision = classifier.classify("Is there a causal link between stunting and anemia?")
+    assert decision.in_scope and decision.reason == "rwanda_term"
+
+
+def test_longest_term_wins():
+    classifier = ScopeClassifier({"rwanda_term": ["rwa", "rwanda"], "other_country": ["south africa"]})
+    assert classifier.matches("Rwanda and South Africa") == {"rwanda_term": "rwanda", "other_country": "south africa"}
+    assert classifier.classify("South Africa").reason == "other_country"
@@ -0,0 +1,44 @@
+"""
+Tests for VectorIndexer encoding setup
+Runs offline with the hashing embedder
+"""
+
+import numpy as np
+
+from offline_stubs import HASHING_MODEL, HashingEmbedder
+from vector_indexer import VectorIndexer
+
+
+def test_injected_embedder_encodes_in_process(tmp_path):
+    embedder = HashingEmbedder()
+    indexer = VectorIndexer(
+        embedding_model=HASHING_MODEL,
+        db_path=str(tmp_path),
+        backend="numpy",
+        embed_processes=4,
+        embedder=embedder
+    )
+    assert indexer.document_encoder.processes == 1
+
+    texts = [f"Stunting among children in district {i}" for i in range(2500)]
+    vectors = indexer.document_encoder.encode(texts)
+    assert np.allclose(vectors, embedder.encode(texts))
+    indexer.close()
+
+
+def test_embedding_cache_is_keyed_by_runtime(tmp_path, monkeypatch):
+    monkeypatch.setattr("vector_indexer.create_embedder", lambda model, backend: HashingEmbedder())
+    names = {
+        backend: VectorIndexer(
+            embedding_model=HASHING_MODEL,
+            db_path=str(tmp_path / backend),
+            backend="numpy",
+            embed_processes=1,
+            embedding_backend=backend
+        ).embedding_cache.model_name
+        for backend in ("sentence_transformers", "onnx")
+    }
+    assert names == {
+        "sentence_transformers": f"{HASHING_MODEL}@sentence_transformers",
+        "onnx": f"{HASHING_MODEL}@onnx"
+    }
@@ -0,0 +1,28 @@
+"""
+Tests for saved int8 / binary codes
+"""
+
+import numpy as np
+import pytest
+
+from vector_quantization import CODES, load_or_build_codes
+
+
+@pytest.mark.parametrize("quantization", sorted(CODES))
+def test_saved_codes_are_reused_only_for_the_same_vectors(tmp_path, quantization):
+    rng = np.random.default_rng(0)
+    before = rng.normal(size=(500, 32)).astype(np.float32)
+    after = rng.normal(size=(500, 32)).astype(np.float32)
+
+    saved = load_or_build_codes(quantization, tmp_path, before)
+    reused = load_or_build_codes(quantization, tmp_path, before)
+    assert isinstance(reused.codes, np.memmap)
+    assert np.array_equal(reused.codes, saved.codes)
+
+    # Same row count, different vectors (a rebuild in place)
+    rebuilt = load_or_build_codes(quantization, tmp_path, after)
+    assert np.array_equal(rebuilt.codes, CODES[quantization].build(after).codes)
+
+    # Same vectors under a new index generation (a compaction)
+    regenerated = load_or_build_codes(quantization, tmp_path, after, generation=1)
+    assert not isinstance(regenerated.codes, np.memmap)
@@ -3,13 +3,38 @@ Vector Indexer for Ubuzima Hub AI System
 Creates and manages vector embeddings for NISR datasets
 """
 
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import argparse
+import hashlib
+import itertools
+import json
 import os
+import threading
+import uuid
 from pathlib import Path
+import numpy as np
 from data_loader import NISRDataLoader
+from embedding_cache import EmbeddingCache
+from lexical_index import LexicalIndex
+import metrics
+from onnx_encoder import SENTENCE_TRANSFORMERS, create_embedder
+from parallel_encoder import ParallelEncoder
+from retrieval_backends import create_backend
+
+
+def compute_document_hash(document: Dict[str, Any], embedding_model: str) -> str:
+    """Content hash of a prepared document (text + metadata + embedding model)"""
+    payload = json.dumps(
+        {
+            "text": document["text"],
+            "metadata": document["metadata"],
+            "embedding_model": embedding_model
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
 class VectorIndexer:
@@ -18,52 +43,181 @@ class VectorIndexer:
     def __init__(
         self,
         embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
-        db_path: str = "./vectordb"
+        db_path: str = "./vectordb",
+        backend: Optional[str] = None,
+        embed_processes: Optional[int] = None,
+        embedder: Optional[Any] = None,
+        quantization: Optional[str] = None,
+        embedding_backend: Optional[str] = None
     ):
+        """
+        Args:
+            embedding_model: SentenceTransformer model name (also keys the caches)
+            db_path: Folder for the index, caches and version files
+            backend: "chroma" or "numpy" (default: VECTOR_BACKEND)
+            embed_processes: Processes for index-build encoding (default: EMBED_PROCESSES)
+            embedder: Ready-made encoder with a SentenceTransformer-style
+                `encode`, used instead of loading `embedding_model` (always
+                in this process: `embed_processes` does not apply)
+            quantization: "none", "int8" or "binary" vector codes for the
+                numpy backend (default: VECTOR_QUANTIZATION)
+            embedding_backend: "sentence_transformers" (PyTorch) or "onnx"
+                (ONNX Runtime export from export_onnx_encoder.py)
+                (default: EMBEDDING_BACKEND or sentence_transformers)
+        """
         self.embedding_model_name = embedding_model
         self.db_path = Path(db_path)
         self.db_path.mkdir(parents=True, exist_ok=True)
         
-        print(f"Initializing embedding model: {embedding_model}")
-        self.embedder = SentenceTransformer(embedding_model)
+        self.embedding_backend = (embedding_backend or os.getenv("EMBEDDING_BACKEND", SENTENCE_TRANSFORMERS)).lower()
+        processes = embed_processes or int(os.getenv("EMBED_PROCESSES", "1"))
+        # An injected embedder runs on an unknown runtime: keyed by its `cache_name`, else the model name
+        cache_name = embedding_model
+        if embedder is None:
+            print(f"Initializing embedding model: {embedding_model} ({self.embedding_backend})")
+            embedder = create_embedder(embedding_model, self.embedding_backend)
+            cache_name = f"{embedding_model}@{self.embedding_backend}"
+        elif processes > 1:
+            # Workers rebuild the model from its name, which would not be the injected embedder
+            print("✗ Warning: embed_processes ignored for an injected embedder, encoding in this process")
+            processes = 1
+        self.embedder = embedder
+        
+        # Index builds shard large encodes across processes (EMBED_PROCESSES, 1 = off)
+        self.document_encoder = ParallelEncoder(
+            self.embedder,
+            embedding_model,
+            processes=processes,
+            backend=self.embedding_backend
+        )
+        
+        # Shared by indexing and query paths: unchanged texts are never re-encoded.
+        # Keyed by runtime too, since ONNX (and int8) vectors differ slightly from torch's
+        self.embedding_cache = EmbeddingCache(
+            cache_dir=str(self.db_path / "embedding_cache"),
+            model_name=getattr(self.embedder, "cache_name", cache_name),
+            memory_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+        )
+        
+        # Retrieval backend: "chroma" (default) or "numpy" (in-process search, VECTOR_QUANTIZATION)
+        self.backend = create_backend(
+            backend or os.getenv("VECTOR_BACKEND", "chroma"), str(self.db_path), quantization=quantization
+        )
+        self._version_path = self.db_path / f"{self.backend.name}_index_version"
+        
+        # BM25 index over the same documents, fused with dense results (HYBRID_SEARCH)
+        self.hybrid_search = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+        self.lexical_index = LexicalIndex(str(self.db_path / f"lexical_{self.backend.name}"))
         
-        print(f"Initializing ChromaDB at: {db_path}")
-        self.client = chromadb.PersistentClient(path=str(self.db_path))
+        # Index version this process has loaded; builds in other processes
+        # (build_index, ingest_pipeline) change it and trigger a reload
+        self._reload_lock = threading.Lock()
+        self._loaded_version = self.index_version
+        self._warned_lexical_version: Optional[str] = None
         
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name="nisr_rwanda_data",
-            metadata={"description": "NISR Rwanda nutrition and survey data"}
+    def embed(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        """Embed texts through the embedding cache"""
+        return self.embedding_cache.encode(
+            texts,
+            lambda missing: self.embedder.encode(missing, show_progress_bar=show_progress_bar)
         )
+    
+    def embed_documents(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        """Embed texts for indexing: like `embed`, but large misses go to the process pool"""
+        return self.embedding_cache.encode(
+            texts,
+            lambda missing: self.document_encoder.encode(missing, show_progress_bar=show_progress_bar)
+        )
+    
+    def close(self) -> None:
+        """Stop any embedding worker processes"""
+        self.document_encoder.close()
         
-    def index_documents(self, documents: List[Dict[str, Any]]) -> None:
-        """Index documents with vector embeddings"""
+    def index_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        incremental: bool = True
+    ) -> Dict[str, int]:
+        """
+        Index documents with vector embeddings
+        
+        In incremental mode only documents whose content hash changed are
+        embedded and upserted, and indexed documents that are no longer
+        present in `documents` are deleted. Otherwise the collection is
+        cleared and rebuilt from scratch.
+        
+        Returns:
+            Dict with counts: added, updated, removed, unchanged
+        """
         print(f"\nIndexing {len(documents)} documents...")
         
-        # Extract texts and IDs
-        texts = [doc["text"] for doc in documents]
-        ids = [doc["id"] for doc in documents]
-        metadatas = [doc["metadata"] for doc in documents]
+        if not incremental:
+            self.clear_collection()
+        existing_hashes = self.backend.get_hashes() if incremental else {}
         
-        # Generate embeddings
-        print("Generating embeddings...")
-        embeddings = self.embedder.encode(texts, show_progress_bar=True).tolist()
+        # Work out which documents changed since the last build
+        changed = []
+        summary = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        current_ids = set()
+        for doc in documents:
+            current_ids.add(doc["id"])
+            content_hash = compute_document_hash(doc, self.embedding_model_name)
+            previous_hash = existing_hashes.get(doc["id"])
+            
+            if previous_hash == content_hash:
+                summary["unchanged"] += 1
+                continue
+                
+            summary["updated" if previous_hash is not None else "added"] += 1
+            changed.append({
+                "id": doc["id"],
+                "text": doc["text"],
+                "metadata": {**doc["metadata"], "content_hash": content_hash}
+            })
+            
+        stale_ids = [doc_id for doc_id in existing_hashes if doc_id not in current_ids]
+        summary["removed"] = len(stale_ids)
         
-        # Add to ChromaDB in batches
         batch_size = 100
-        for i in range(0, len(documents), batch_size):
-            end_idx = min(i + batch_size, len(documents))
+        
+        # Remove documents that disappeared from the source data
+        for i in range(0, len(stale_ids), batch_size):
+            self.backend.delete(ids=stale_ids[i:i + batch_size])
+        
+        if changed:
+            # Extract texts and IDs
+            texts = [doc["text"] for doc in changed]
+            ids = [doc["id"] for doc in changed]
+            metadatas = [doc["metadata"] for doc in changed]
             
-            self.collection.add(
-                embeddings=embeddings[i:end_idx],
-                documents=texts[i:end_idx],
-                metadatas=metadatas[i:end_idx],
-                ids=ids[i:end_idx]
-            )
+            # Generate embeddings
+            print(f"Generating embeddings for {len(changed)} new or changed documents...")
+            embeddings = self.embed_documents(texts, show_progress_bar=True)
             
-            print(f"Indexed batch {i//batch_size + 1}/{(len(documents)-1)//batch_size + 1}")
+            # Upsert to the retrieval backend in batches
+            for i in range(0, len(changed), batch_size):
+                end_idx = min(i + batch_size, len(changed))
+                
+                self.backend.upsert(
+                    ids=ids[i:end_idx],
+                    embeddings=embeddings[i:end_idx],
+                    texts=texts[i:end_idx],
+                    metadatas=metadatas[i:end_idx]
+                )
+                
+                print(f"Indexed batch {i//batch_size + 1}/{(len(changed)-1)//batch_size + 1}")
+        
+        self.backend.commit()
+        if summary["added"] or summary["updated"] or summary["removed"]:
+            self.bump_index_version()
+        if not self.lexical_index.matches(self.index_version):
+            self.lexical_index.build(documents, self.index_version)
             
-        print(f"✓ Successfully indexed {len(documents)} documents")
+        print(
+            f"✓ Index up to date: {summary['added']} added, {summary['updated']} updated, "
+            f"{summary['removed']} removed, {summary['unchanged']} unchanged"
+        )
+        return summary
         
     def search(
         self,
@@ -72,52 +226,147 @@ class VectorIndexer:
         filter_metadata: Dict[str, Any] = None
     ) -> List[Dict[str, Any]]:
         """Search for relevant documents using semantic similarity"""
-        # Generate query embedding
-        query_embedding = self.embedder.encode([query])[0].tolist()
-        
-        # Search in ChromaDB
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results,
-            where=filter_metadata if filter_metadata else None
-        )
+        return self.search_many([query], n_results=n_results, filter_metadata=filter_metadata)[0]
+    
+    def search_many(
+        self,
+        queries: List[str],
+        n_results: int = 5,
+        filter_metadata: Dict[str, Any] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries at once
         
-        # Format results
-        formatted_results = []
-        if results["documents"] and len(results["documents"]) > 0:
-            for i in range(len(results["documents"][0])):
-                formatted_results.append({
-                    "id": results["ids"][0][i],
-                    "text": results["documents"][0][i],
-                    "metadata": results["metadatas"][0][i],
-                    "distance": results["distances"][0][i] if "distances" in results else None
-                })
-                
-        return formatted_results
+        All queries are embedded in one batched forward pass and sent to
+        the backend as a single multi-vector query.
+        
+        Returns:
+            One result list per query, in the same order as `queries`
+        """
+        if not queries:
+            return []
+            
+        # Generate query embeddings
+        with metrics.stage("embed"):
+            query_embeddings = self.embed(queries)
+        where = filter_metadata if filter_metadata else None
+        
+        version = self.index_version
+        if version != self._loaded_version:
+            self._reload(version)
+        if not (self.hybrid_search and self._lexical_in_sync(version)):
+            with metrics.stage("search"):
+                return self.backend.query(query_embeddings, n_results=n_results, where=where)
+        
+        # Hybrid: fuse a deeper dense candidate list with the BM25 ranking
+        depth = max(n_results * 4, 20)
+        with metrics.stage("search"):
+            dense = self.backend.query(query_embeddings, n_results=depth, where=where)
+        with metrics.stage("lexical"):
+            lexical = self.lexical_index.query_many(queries, n_results=depth, where=where)
+            return [
+                self._fuse(dense[q], lexical[q], query_embeddings[q], n_results)
+                for q in range(len(queries))
+            ]
+    
+    def _fuse(
+        self,
+        dense: List[Dict[str, Any]],
+        lexical: List[tuple],
+        query_embedding: np.ndarray,
+        n_results: int,
+        rrf_k: int = 60
+    ) -> List[Dict[str, Any]]:
+        """Reciprocal-rank fusion of dense results and (id, score) BM25 hits"""
+        scores: Dict[str, float] = {}
+        for ranking in ([doc["id"] for doc in dense], [doc_id for doc_id, _ in lexical]):
+            for rank, doc_id in enumerate(ranking):
+                scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+        top = sorted(scores, key=scores.get, reverse=True)[:n_results]
+        
+        # Lexical-only hits are fetched so they carry a real embedding distance
+        documents = {doc["id"]: doc for doc in dense}
+        missing = [doc_id for doc_id in top if doc_id not in documents]
+        if missing:
+            documents.update((doc["id"], doc) for doc in self.backend.get_by_ids(missing, query_embedding))
+        return [documents[doc_id] for doc_id in top if doc_id in documents]
+    
+    def _reload(self, version: str) -> None:
+        """Load an index another process has rebuilt since this one loaded it"""
+        with self._reload_lock:
+            if version == self._loaded_version:
+                return
+            self.backend.reload()
+            self.lexical_index.refresh()
+            self._loaded_version = version
+            print(f"✓ Index changed on disk (version {version[:8]}), reloaded")
+    
+    def _lexical_in_sync(self, version: str) -> bool:
+        """True if the BM25 index matches `version`; warns once per version when it does not"""
+        if self.lexical_index.matches(version):
+            return True
+        # The other process may still be writing it
+        self.lexical_index.refresh()
+        if self.lexical_index.matches(version):
+            return True
+        if version and self._warned_lexical_version != version:
+            self._warned_lexical_version = version
+            print(
+                f"✗ Warning: lexical index is at version {self.lexical_index.version}, vector index at "
+                f"{version or None}; hybrid search is off until it is rebuilt (python vector_indexer.py)"
+            )
+        return False
+    
+    def rebuild_lexical_index(self) -> None:
+        """Rebuild the BM25 index from the documents currently in the backend"""
+        documents = itertools.chain.from_iterable(self.backend.iter_documents())
+        self.lexical_index.build(documents, self.index_version)
+    
+    def bump_index_version(self) -> None:
+        """Record that the index contents changed (invalidates answer caches)"""
+        version = uuid.uuid4().hex
+        self._version_path.write_text(version)
+        self._loaded_version = version
+    
+    @property
+    def index_version(self) -> str:
+        """Opaque token that changes every time a build modifies the index"""
+        try:
+            return self._version_path.read_text().strip()
+        except FileNotFoundError:
+            return ""
     
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the indexed collection"""
-        count = self.collection.count()
+        count = self.backend.count()
         
         return {
             "total_documents": count,
             "embedding_model": self.embedding_model_name,
-            "collection_name": self.collection.name,
-            "db_path": str(self.db_path)
+            "embedding_backend": self.embedding_backend,
+            "backend": self.backend.name,
+            **self.backend.stats(),
+            "db_path": str(self.db_path),
+            "index_version": self.index_version,
+            "hybrid_search": self.hybrid_search,
+            "lexical_index": self.lexical_index.stats(),
+            "embedding_cache": self.embedding_cache.stats()
         }
     
     def clear_collection(self) -> None:
         """Clear all documents from the collection"""
         print("Clearing collection...")
-        self.client.delete_collection(name="nisr_rwanda_data")
-        self.collection = self.client.get_or_create_collection(
-            name="nisr_rwanda_data",
-            metadata={"description": "NISR Rwanda nutrition and survey data"}
-        )
+        self.backend.clear()
+        self.lexical_index.clear()
+        self.bump_index_version()
         print("✓ Collection cleared")
 
 
-def build_index():
+def build_index(
+    incremental: bool = True,
+    backend: Optional[str] = None,
+    processes: Optional[int] = None
+):
     """Build the vector index from NISR datasets"""
     print("=== Building NISR Data Vector Index ===\n")
     
@@ -131,13 +380,11 @@ def build_index():
         return
     
     # Create vector index
-    indexer = VectorIndexer()
-    
-    # Clear existing data (optional - comment out to keep existing index)
-    # indexer.clear_collection()
+    indexer = VectorIndexer(backend=backend, embed_processes=processes)
     
-    # Index documents
-    indexer.index_documents(documents)
+    # Index documents (only new or changed documents are re-embedded)
+    indexer.index_documents(documents, incremental=incremental)
+    indexer.close()
     
     # Print stats
     stats = indexer.get_collection_stats()
@@ -160,4 +407,22 @@ def build_index():
 
 
 if __name__ == "__main__":
-    build_index()
+    parser = argparse.ArgumentParser(description="Build the NISR data vector index")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Clear the collection and re-embed every document"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["chroma", "numpy"],
+        help="Retrieval backend to build (default: VECTOR_BACKEND or chroma)"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        help="Embedding processes for large builds (default: EMBED_PROCESSES or 1)"
+    )
+    args = parser.parse_args()
+    
+    build_index(incremental=not args.full, backend=args.backend, processes=args.processes)
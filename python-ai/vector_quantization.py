@@ -0,0 +1,177 @@
+"""
+Vector Quantization for Ubuzima Hub AI System
+Compact int8 and binary codes that pre-rank candidates for the NumPy backend
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+QUANTIZATIONS = ("none", "int8", "binary")
+
+# Candidates kept per requested result before exact float rescoring
+RESCORE_FACTORS = {"int8": 4, "binary": 16}
+
+# Rows scored per block, so the float32 scratch space stays small
+_BLOCK_ROWS = 8192
+
+# Rows sampled (evenly spaced) into the fingerprint that ties saved codes to their vectors
+_FINGERPRINT_ROWS = 256
+
+# Set bits per byte value, for numpy versions without bitwise_count
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+class Int8Codes:
+    """
+    Scalar quantization: each dimension scaled by its largest magnitude to int8
+
+    4x smaller than float32. Approximate scores are dot products of the
+    codes with the query scaled per dimension.
+    """
+
+    name = "int8"
+
+    def __init__(self, codes: np.ndarray, scale: np.ndarray):
+        self.codes = codes
+        self.scale = scale
+
+    @classmethod
+    def build(cls, matrix: np.ndarray) -> "Int8Codes":
+        matrix = np.asarray(matrix, dtype=np.float32)
+        scale = np.abs(matrix).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        codes = np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8)
+        return cls(codes, scale.astype(np.float32))
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Approximate cosine similarity of every query with every row"""
+        scaled = (queries * self.scale).T
+        scores = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        for start in range(0, len(self.codes), _BLOCK_ROWS):
+            block = self.codes[start:start + _BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = (block @ scaled).T
+        return scores
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + self.scale.nbytes)
+
+    def save(self, index_dir: Path) -> None:
+        _save(index_dir / "codes_int8.npy", self.codes)
+        _save(index_dir / "codes_int8_scale.npy", self.scale)
+
+    @classmethod
+    def load(cls, index_dir: Path, rows: int) -> Optional["Int8Codes"]:
+        codes = _load(index_dir / "codes_int8.npy", rows)
+        scale_path = index_dir / "codes_int8_scale.npy"
+        if codes is None or not scale_path.exists():
+            return None
+        return cls(codes, np.load(scale_path))
+
+
+class BinaryCodes:
+    """
+    1-bit quantization: the sign of each dimension, packed 8 per byte
+
+    32x smaller than float32. Candidates are ranked by Hamming distance
+    to the query's sign bits.
+    """
+
+    name = "binary"
+
+    def __init__(self, codes: np.ndarray):
+        self.codes = codes
+
+    @classmethod
+    def build(cls, matrix: np.ndarray) -> "BinaryCodes":
+        return cls(np.packbits(np.asarray(matrix) > 0, axis=1))
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Negated Hamming distance of every query with every row (higher is closer)"""
+        bits = np.packbits(queries > 0, axis=1)
+        scores = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        for q, query_bits in enumerate(bits):
+            differing = np.bitwise_xor(self.codes, query_bits)
+            if hasattr(np, "bitwise_count"):
+                distance = np.bitwise_count(differing).sum(axis=1, dtype=np.int32)
+            else:
+                distance = _POPCOUNT[differing].sum(axis=1, dtype=np.int32)
+            scores[q] = -distance
+        return scores
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes)
+
+    def save(self, index_dir: Path) -> None:
+        _save(index_dir / "codes_binary.npy", self.codes)
+
+    @classmethod
+    def load(cls, index_dir: Path, rows: int) -> Optional["BinaryCodes"]:
+        codes = _load(index_dir / "codes_binary.npy", rows)
+        return None if codes is None else cls(codes)
+
+
+CODES = {Int8Codes.name: Int8Codes, BinaryCodes.name: BinaryCodes}
+
+
+def _save(path: Path, array: np.ndarray) -> None:
+    """Write an .npy file atomically"""
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _load(path: Path, rows: int) -> Optional[np.ndarray]:
+    """Memory-map codes saved by `_save`; None if missing or for a different index"""
+    if not path.exists():
+        return None
+    codes = np.load(path, mmap_mode="r")
+    return codes if codes.shape[0] == rows else None
+
+
+def fingerprint(matrix: np.ndarray, generation: int = 0) -> str:
+    """
+    Identifies the vectors codes were built from
+
+    Covers the index generation, the matrix shape and a sample of its rows,
+    so codes saved for an earlier build with the same row count (after a
+    compaction or a rebuild in place) are not mistaken for current ones.
+    """
+    rows = len(matrix)
+    sample = np.unique(np.linspace(0, rows - 1, num=min(rows, _FINGERPRINT_ROWS)).astype(np.int64))
+    digest = hashlib.sha1(f"{generation}:{tuple(matrix.shape)}".encode("utf-8"))
+    if rows:
+        digest.update(np.ascontiguousarray(matrix[sample], dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def remove_codes(index_dir: Path) -> None:
+    """Delete every saved code file (they are rebuilt from the vectors on load)"""
+    for path in index_dir.glob("codes_*"):
+        path.unlink()
+
+
+def load_or_build_codes(quantization: str, index_dir: Path, matrix: np.ndarray, generation: int = 0):
+    """Codes for `matrix`: loaded if saved for these exact vectors, otherwise built and saved"""
+    codes_class = CODES[quantization]
+    stamp_path = index_dir / f"codes_{quantization}.json"
+    stamp = fingerprint(matrix, generation)
+
+    codes = None
+    if stamp_path.exists() and json.loads(stamp_path.read_text()).get("fingerprint") == stamp:
+        codes = codes_class.load(index_dir, len(matrix))
+    if codes is None:
+        codes = codes_class.build(matrix)
+        codes.save(index_dir)
+        # Written last: a stamp always describes codes that are fully on disk
+        stamp_tmp = stamp_path.with_name(stamp_path.name + ".tmp")
+        stamp_tmp.write_text(json.dumps({"fingerprint": stamp, "rows": len(matrix)}))
+        os.replace(stamp_tmp, stamp_path)
+    return codes